@@ -0,0 +1,256 @@
+"""
+增量备份存储：把数据库快照按页对齐切块，以内容哈希去重并压缩保存
+
+目录结构：
+    <root>/objects/ab/abcdef...   zlib 压缩后的数据块，文件名为原始数据的 sha256
+    <root>/snapshots/<name>.json  快照清单：按顺序记录组成该快照的数据块哈希
+
+未变化的数据块在多个快照之间共享，每次备份只写入发生变化的块。
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+# SQLite 默认页大小为 4096，每块 16 页；页大小不同时按数据库实际页大小对齐
+PAGES_PER_CHUNK = 16
+DEFAULT_PAGE_SIZE = 4096
+COMPRESS_LEVEL = 6
+
+logger = logging.getLogger(__name__)
+# 垃圾回收不删除比这更新的文件：其他机器的快照可能只同步了数据块、清单还没到，
+# 或者本机的 add_snapshot 已写入数据块、清单还没重命名到位
+GC_GRACE_SECONDS = 24 * 3600
+
+
+def _read_page_size(path: str) -> int:
+    """从 SQLite 文件头读取页大小（偏移 16 处的 2 字节大端整数，1 表示 65536）"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(100)
+        if len(header) < 18 or not header.startswith(b"SQLite format 3\x00"):
+            return DEFAULT_PAGE_SIZE
+        value = int.from_bytes(header[16:18], "big")
+        return 65536 if value == 1 else (value or DEFAULT_PAGE_SIZE)
+    except OSError:
+        return DEFAULT_PAGE_SIZE
+
+
+def _write_atomic(path: str, data: bytes):
+    """先写临时文件再重命名，避免留下写了一半的文件"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class BackupStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+
+    def _ensure_dirs(self):
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.snapshots_dir, f"{name}.json")
+
+    def has_snapshot(self, name: str) -> bool:
+        return os.path.exists(self._manifest_path(name))
+
+    def add_snapshot(self, source_path: str, name: str) -> dict:
+        """把数据库文件保存为名为 name 的快照，返回快照清单
+
+        清单中的 bytes_written 为本次实际新写入的（压缩后）字节数。
+        """
+        self._ensure_dirs()
+        chunk_size = _read_page_size(source_path) * PAGES_PER_CHUNK
+        chunks = []
+        file_digest = hashlib.sha256()
+        size = 0
+        bytes_written = 0
+        new_chunks = 0
+        with open(source_path, "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                size += len(data)
+                file_digest.update(data)
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+                object_path = self._object_path(digest)
+                if os.path.exists(object_path):
+                    continue
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                compressed = zlib.compress(data, COMPRESS_LEVEL)
+                _write_atomic(object_path, compressed)
+                bytes_written += len(compressed)
+                new_chunks += 1
+
+        manifest = {
+            "name": name,
+            "created_at": datetime.now().isoformat(),
+            "size": size,
+            "sha256": file_digest.hexdigest(),
+            "chunk_size": chunk_size,
+            "chunks": chunks,
+            "new_chunks": new_chunks,
+            "bytes_written": bytes_written,
+        }
+        # 清单最后写入：清单存在即说明所有数据块都已落盘
+        _write_atomic(self._manifest_path(name), json.dumps(manifest).encode("utf-8"))
+        return manifest
+
+    def list_snapshots(self) -> List[dict]:
+        """按创建时间从新到旧返回所有快照清单（损坏或正在同步中的清单忽略）"""
+        return self._read_manifests()[0]
+
+    def _read_manifests(self) -> tuple:
+        """(可解析的清单列表, 无法读取的清单和临时文件列表)"""
+        if not os.path.isdir(self.snapshots_dir):
+            return [], []
+        manifests = []
+        incomplete = []
+        for file_name in os.listdir(self.snapshots_dir):
+            path = os.path.join(self.snapshots_dir, file_name)
+            if file_name.endswith(".tmp"):
+                # 正在写入（或同步客户端正在下载）的清单
+                incomplete.append(path)
+                continue
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifests.append(json.load(f))
+            except Exception:
+                incomplete.append(path)
+        manifests.sort(key=lambda m: m.get("created_at", ""), reverse=True)
+        return manifests, incomplete
+
+    def latest_snapshot(self) -> Optional[dict]:
+        snapshots = self.list_snapshots()
+        return snapshots[0] if snapshots else None
+
+    def restore(self, name: str, target_path: str):
+        """逐块解压写回，校验后原子重命名为 target_path"""
+        with open(self._manifest_path(name), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        temp_path = f"{target_path}.{os.getpid()}.tmp"
+        digest = hashlib.sha256()
+        try:
+            with open(temp_path, "wb") as out:
+                for chunk_digest in manifest["chunks"]:
+                    with open(self._object_path(chunk_digest), "rb") as f:
+                        data = zlib.decompress(f.read())
+                    if hashlib.sha256(data).hexdigest() != chunk_digest:
+                        raise ValueError(f"备份数据块已损坏: {chunk_digest}")
+                    digest.update(data)
+                    out.write(data)
+            if manifest.get("sha256") and digest.hexdigest() != manifest["sha256"]:
+                raise ValueError(f"快照校验失败: {name}")
+            os.replace(temp_path, target_path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _object_size(self, digest: str) -> int:
+        try:
+            return os.path.getsize(self._object_path(digest))
+        except OSError:
+            return 0
+
+    def total_size(self, snapshots: List[dict] = None) -> int:
+        """给定快照（默认全部）引用的数据块占用的磁盘字节数（共享块只计一次）"""
+        if snapshots is None:
+            snapshots = self.list_snapshots()
+        digests = {d for m in snapshots for d in m["chunks"]}
+        return sum(self._object_size(d) for d in digests)
+
+    def apply_retention(self, keep_count: int = 7, max_age_days: int = None,
+                        max_total_bytes: int = None) -> List[str]:
+        """按数量、时间和总大小清理旧快照，返回被删除的快照名称；最新快照总会保留"""
+        snapshots = self.list_snapshots()
+        keep = snapshots[:max(keep_count, 1)]
+        if max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+            keep = keep[:1] + [m for m in keep[1:] if m.get("created_at", "") >= cutoff]
+        if max_total_bytes is not None:
+            while len(keep) > 1 and self.total_size(keep) > max_total_bytes:
+                keep.pop()
+
+        kept_names = {m["name"] for m in keep}
+        removed = []
+        for manifest in snapshots:
+            if manifest["name"] in kept_names:
+                continue
+            try:
+                os.remove(self._manifest_path(manifest["name"]))
+                removed.append(manifest["name"])
+            except OSError:
+                pass
+        if removed:
+            self.collect_garbage()
+        return removed
+
+    def collect_garbage(self, grace_seconds: float = GC_GRACE_SECONDS) -> int:
+        """删除不再被任何快照引用的数据块，返回释放的字节数
+
+        存在无法解析的清单或清单临时文件时不回收：它们可能正在同步或写入，引用的数据块无从得知。
+        超过 grace_seconds 仍是如此的不会再完成：临时文件是中断的写入留下的，直接删除；
+        损坏的清单重命名为 .bad 隔离（保留以便排查），之后照常回收。
+        """
+        if not os.path.isdir(self.objects_dir):
+            return 0
+        manifests, incomplete = self._read_manifests()
+        cutoff = time.time() - grace_seconds
+        for path in incomplete:
+            if not self._changed_before(path, cutoff):
+                return 0
+            try:
+                if path.endswith(".tmp"):
+                    os.remove(path)
+                else:
+                    os.replace(path, path + ".bad")
+                    logger.warning("备份清单无法解析，已隔离为 %s.bad", path)
+            except OSError:
+                return 0
+        referenced = {d for m in manifests for d in m["chunks"]}
+        freed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for digest in os.listdir(prefix_dir):
+                if digest in referenced:
+                    continue
+                path = os.path.join(prefix_dir, digest)
+                try:
+                    if not self._changed_before(path, cutoff):
+                        continue
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    pass
+        return freed
+
+    @staticmethod
+    def _changed_before(path: str, cutoff: float) -> bool:
+        """文件在 cutoff 之前写入；同步客户端会保留原 mtime，所以同时看本机的 ctime（到达时间）"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return max(st.st_mtime, st.st_ctime) < cutoff
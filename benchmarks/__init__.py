@@ -0,0 +1,3 @@
+"""
+性能测试脚本和测试数据生成工具（不随应用打包），在项目根目录下用 python -m benchmarks.xxx 运行
+"""
@@ -0,0 +1,91 @@
+"""
+归档库测试：生成包含多年历史的数据库，比较历史项目移入归档库前后主库文件的大小和热点读取的耗时
+
+    python -m benchmarks.archive_benchmark                       # 5 年历史，约 10 万个任务
+    python -m benchmarks.archive_benchmark --years 5 --projects 50000 --mode yearly
+
+移动使用 Database.archive_history（与每天第一次启动时后台执行的相同）。移出后主库不 VACUUM，
+空闲页留给之后的写入复用，文件大小不变；"main free MB" 为其中的空闲空间。
+耗时为多次调用（每次前清空对象缓存）的中位数。
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.workload import WorkloadSpec, generate_database
+from database import Database
+
+
+def _median_ms(db: Database, call, repeat: int) -> float:
+    call()  # 预热
+    times = []
+    for _ in range(repeat):
+        db._cache.clear()
+        start = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def measure(db: Database, repeat: int) -> dict:
+    main_size = os.path.getsize(db.db_path)
+    conn = db._connect(read_only=True)
+    free_bytes = (conn.execute("PRAGMA freelist_count").fetchone()[0]
+                  * conn.execute("PRAGMA page_size").fetchone()[0])
+    return {
+        "main MB": main_size / 1024 / 1024,
+        "main free MB": free_bytes / 1024 / 1024,
+        "archive MB": sum(os.path.getsize(path) for path in db.get_archive_files()) / 1024 / 1024,
+        "get_overview_snapshot ms": _median_ms(db, db.get_overview_snapshot, repeat),
+        "get_all_projects ms": _median_ms(db, db.get_all_projects, repeat),
+        "get_history_projects_page ms": _median_ms(
+            db, lambda: db.get_history_projects_page("completed", 50), repeat),
+        "get_statistics(history) ms": _median_ms(db, lambda: db.get_statistics(include_history=True), repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5, help="历史跨越的年数")
+    parser.add_argument("--projects", type=int, default=5000)
+    parser.add_argument("--tasks-per-project", type=int, default=20)
+    parser.add_argument("--history-share", type=float, default=0.9, help="历史项目占全部项目的比例")
+    parser.add_argument("--mode", choices=("single", "yearly"), default="single")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    spec = WorkloadSpec(projects=args.projects, tasks_per_project=args.tasks_per_project,
+                        history_share=args.history_share, history_days=365 * args.years)
+    work_dir = tempfile.mkdtemp(prefix="pt-archive-")
+    path = os.path.join(work_dir, "archive_bench.db")
+    print(f"生成 {spec.projects} 个项目，{spec.tasks} 个任务，{args.years} 年历史 ...")
+    generate_database(path, spec)
+    # 生成时使用 WAL；应用的数据库使用默认的回滚日志（跨主库和归档库的事务原子提交）
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+
+    # 不启动后台备份（它会在第一次启动时自动移动历史项目）
+    db = Database(path, defer_migration=True)
+    db.init_database()
+    db.archive_mode = args.mode
+    try:
+        before = measure(db, args.repeat)
+        start = time.perf_counter()
+        moved = db.archive_history()
+        elapsed = time.perf_counter() - start
+        after = measure(db, args.repeat)
+    finally:
+        db.close()
+
+    print(f"移动 {moved} 个历史项目到 {len(db.get_archive_files())} 个归档库，耗时 {elapsed:.1f} s")
+    print(f"  {'':<30}{'before':>10}{'after':>10}")
+    for key in before:
+        print(f"  {key:<30}{before[key]:>10.1f}{after[key]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
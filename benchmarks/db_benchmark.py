@@ -0,0 +1,247 @@
+"""
+Database 方法耗时测试：按 workload.SCALES 生成数据库，多次调用热点方法并统计耗时分位数，
+结果可以保存为 JSON 基线，之后的运行与基线比较
+
+    python -m benchmarks.db_benchmark --scale 1k 10k 100k       # 运行并与已有基线比较
+    python -m benchmarks.db_benchmark --scale 100k --save        # 把本次结果保存为基线
+    python -m benchmarks.db_benchmark --scale 1m --cache-dir ~/pt-bench   # 复用生成的数据库
+
+耗时与机器有关，比较前先在同一台机器上用 --save 生成基线。p50 超过基线的 --threshold 倍
+时视为退化并以非 0 退出。生成参数（WorkloadSpec）与基线不同时不做比较。
+
+__init__ 为当天已有备份时的启动耗时；__init__+backup 为当天第一次启动、等待后台备份
+（增量，数据块已在备份存储中）结束的耗时。
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+
+import migrations
+from benchmarks.workload import SCALES, WorkloadSpec, generate_database
+from database import Database
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+PERCENTILES = (50, 90, 99)
+
+
+def baseline_path(scale: str, baseline_dir: str = BASELINE_DIR) -> str:
+    return os.path.join(baseline_dir, f"db_benchmark_{scale}.json")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """线性插值的分位数，sorted_values 已排序且非空"""
+    position = (len(sorted_values) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def summarize(samples_ms: list) -> dict:
+    values = sorted(samples_ms)
+    summary = {"n": len(values), "min": values[0]}
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = percentile(values, pct)
+    summary["max"] = values[-1]
+    summary["mean"] = sum(values) / len(values)
+    return {key: round(value, 4) for key, value in summary.items()}
+
+
+def _timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return (time.perf_counter() - start) * 1000
+
+
+def prepare_database(spec: WorkloadSpec, cache_dir: str = None, work_dir: str = None) -> str:
+    """生成（或从 cache_dir 复制）spec 对应的数据库到 work_dir，返回路径
+
+    缓存文件名包含 spec 和结构版本的摘要，修改生成参数或增加迁移步骤后自动重新生成。
+    """
+    key = json.dumps([asdict(spec), migrations.MIGRATIONS[-1][0]], sort_keys=True)
+    name = f"workload_{hashlib.sha1(key.encode()).hexdigest()[:12]}.db"
+    path = os.path.join(work_dir, name)
+    if cache_dir is None:
+        generate_database(path, spec)
+        return path
+    cached = os.path.join(cache_dir, name)
+    if not os.path.exists(cached):
+        os.makedirs(cache_dir, exist_ok=True)
+        generate_database(cached + ".tmp", spec)
+        os.replace(cached + ".tmp", cached)
+    shutil.copyfile(cached, path)
+    return path
+
+
+def bench_startup(path: str, repeat: int) -> dict:
+    """启动耗时：当天已有备份 / 当天第一次启动（等待备份结束）"""
+    # 先完成一次全量备份，之后每次删除当天的快照清单，备份只写入变化的数据块
+    db = Database(path)
+    db.wait_for_backup()
+    store = db.get_backup_store()
+    db.close()
+    snapshot = f"PT_{datetime.now().strftime('%Y%m%d')}"
+
+    init_ms, backup_ms = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db = Database(path)
+        init_ms.append((time.perf_counter() - start) * 1000)
+        db.wait_for_backup()
+        db.close()
+
+        os.remove(store._manifest_path(snapshot))
+        start = time.perf_counter()
+        db = Database(path)
+        db.wait_for_backup()
+        backup_ms.append((time.perf_counter() - start) * 1000)
+        db.close()
+        if not store.has_snapshot(snapshot):
+            raise RuntimeError("备份没有生成当天的快照")
+    return {"__init__": init_ms, "__init__+backup": backup_ms}
+
+
+def bench_methods(db: Database, repeat: int, seed: int = 0) -> dict:
+    """各方法的耗时样本（毫秒）；读方法每次调用前清空对象缓存，测量的是查询本身"""
+    rng = random.Random(seed)
+    conn = db._connect()
+    active_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM projects WHERE status IN ('planned', 'in_progress') ORDER BY id")]
+    if not active_ids:
+        raise RuntimeError("数据库中没有进行中的项目")
+    today = date.today()
+    samples = {}
+
+    def sample(name, call, clear_cache=True):
+        call()  # 预热
+        times = []
+        for _ in range(repeat):
+            if clear_cache:
+                db._cache.clear()
+            times.append(_timed(call))
+        samples[name] = times
+
+    sample("get_today_tasks", db.get_today_tasks)
+    project_ids = iter(rng.choice(active_ids) for _ in range(repeat + 1))
+    sample("get_tasks_by_project", lambda: db.get_tasks_by_project(next(project_ids)))
+    sample("update_task_status_auto", db.update_task_status_auto)
+
+    def create_task():
+        start = today + timedelta(days=rng.randint(-7, 7))
+        db.create_task(rng.choice(active_ids), "新任务", start.isoformat(),
+                       (start + timedelta(days=rng.randint(0, 14))).isoformat(), "任务描述", "备注")
+    sample("create_task", create_task, clear_cache=False)
+
+    # 每次完成一个不同的项目；放在最后，不影响其他方法看到的数据
+    completing = iter(rng.sample(active_ids, min(repeat + 1, len(active_ids))))
+    times = []
+    for project_id in completing:
+        times.append(_timed(lambda: db.complete_project(project_id)))
+    samples["complete_project"] = times[1:] or times
+    return samples
+
+
+def run_scale(spec: WorkloadSpec, repeat: int, startup_repeat: int, cache_dir: str = None) -> dict:
+    work_dir = tempfile.mkdtemp(prefix="pt-bench-")
+    try:
+        path = prepare_database(spec, cache_dir, work_dir)
+        samples = bench_startup(path, startup_repeat)
+        db = Database(path)
+        db.wait_for_backup()
+        try:
+            samples.update(bench_methods(db, repeat, spec.seed))
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {name: summarize(times) for name, times in samples.items()}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """打印与基线的对比，返回 p50 退化超过 threshold 倍的方法名"""
+    regressions = []
+    print(f"  {'method':<26}{'base p50':>10}{'p50':>10}{'ratio':>8}{'base p99':>10}{'p99':>10}")
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<26}{'-':>10}{stats['p50']:>10.3f}")
+            continue
+        ratio = stats["p50"] / base["p50"] if base["p50"] > 0 else 1.0
+        flag = ""
+        # 亚毫秒级的差异多为计时噪声，不算退化
+        if ratio > threshold and stats["p50"] - base["p50"] > 0.05:
+            regressions.append(name)
+            flag = "  << 退化"
+        print(f"  {name:<26}{base['p50']:>10.3f}{stats['p50']:>10.3f}{ratio:>8.2f}"
+              f"{base['p99']:>10.3f}{stats['p99']:>10.3f}{flag}")
+    return regressions
+
+
+def _print_results(results: dict):
+    columns = ["min"] + [f"p{pct}" for pct in PERCENTILES] + ["max"]
+    print(f"  {'method (ms)':<26}" + "".join(f"{c:>10}" for c in columns) + f"{'n':>6}")
+    for name, stats in results.items():
+        print(f"  {name:<26}" + "".join(f"{stats[c]:>10.3f}" for c in columns) + f"{stats['n']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), nargs="+", default=["1k", "10k"])
+    parser.add_argument("--repeat", type=int, default=50, help="每个方法的调用次数")
+    parser.add_argument("--startup-repeat", type=int, default=5)
+    parser.add_argument("--save", action="store_true", help="把结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=1.5, help="p50 超过基线多少倍算退化")
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR)
+    parser.add_argument("--cache-dir", help="保存生成的数据库，下次运行直接复用")
+    args = parser.parse_args(argv)
+
+    failed = []
+    for scale in args.scale:
+        spec = SCALES[scale]
+        print(f"== {scale}: {spec.projects} 个项目，{spec.tasks} 个任务")
+        results = run_scale(spec, args.repeat, args.startup_repeat, args.cache_dir)
+        _print_results(results)
+
+        path = baseline_path(scale, args.baseline_dir)
+        if args.save:
+            os.makedirs(args.baseline_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "scale": scale,
+                    "spec": asdict(spec),
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "sqlite": sqlite3.sqlite_version,
+                    "platform": platform.platform(),
+                    "results": results,
+                }, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            print(f"  已保存基线 -> {path}")
+            continue
+        if not os.path.exists(path):
+            print(f"  基线不存在：{path}（用 --save 生成）")
+            continue
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("spec") != asdict(spec):
+            print("  生成参数与基线不同，跳过比较（用 --save 重新生成基线）")
+            continue
+        print(f"  与基线比较（{baseline.get('created_at')}，SQLite {baseline.get('sqlite')}）")
+        failed.extend(f"{scale} {name}" for name in compare(baseline["results"], results, args.threshold))
+
+    if failed:
+        print(f"\np50 退化超过 {args.threshold} 倍：{', '.join(failed)}", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+生成旧版本结构的数据库，用于测试迁移的正确性和耗时
+
+    pre_local_path  最早的结构：项目不支持归档，项目和任务都没有 local_path
+    pre_archived    项目有 local_path 但 CHECK 约束不含 archived，任务没有标签字段
+    pre_important   项目已支持归档，任务有 local_path 但没有 is_important/is_urgent
+"""
+import os
+import random
+import sqlite3
+import uuid
+from datetime import date, datetime, timedelta
+
+_PROJECTS_NO_ARCHIVED = """
+    CREATE TABLE projects (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed')),
+        {local_path}
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+"""
+
+_PROJECTS_ARCHIVED = """
+    CREATE TABLE projects (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'archived')),
+        local_path TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+"""
+
+_TASKS = """
+    CREATE TABLE tasks (
+        id TEXT PRIMARY KEY,
+        project_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        description TEXT,
+        notes TEXT,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'overdue')),
+        {local_path}
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+    )
+"""
+
+# 结构名称 -> (projects 建表语句, tasks 建表语句, 项目是否有 local_path, 任务是否有 local_path)
+LEGACY_SCHEMAS = {
+    "pre_local_path": (
+        _PROJECTS_NO_ARCHIVED.format(local_path=""),
+        _TASKS.format(local_path=""),
+        False, False,
+    ),
+    "pre_archived": (
+        _PROJECTS_NO_ARCHIVED.format(local_path="local_path TEXT,"),
+        _TASKS.format(local_path="local_path TEXT,"),
+        True, True,
+    ),
+    "pre_important": (
+        _PROJECTS_ARCHIVED,
+        _TASKS.format(local_path="local_path TEXT,"),
+        True, True,
+    ),
+}
+
+
+def create_legacy_database(path: str, schema: str = "pre_local_path", projects: int = 1000,
+                           tasks_per_project: int = 10, seed: int = 0) -> str:
+    """在 path 生成指定旧结构的数据库（已存在的文件会被覆盖），返回 path
+
+    任务状态按旧版本的做法持久化了 in_progress/overdue，用于验证状态还原步骤。
+    """
+    projects_sql, tasks_sql, project_has_path, task_has_path = LEGACY_SCHEMAS[schema]
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.now().isoformat()
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(projects_sql)
+        conn.execute(tasks_sql)
+
+        project_columns = "id, name, description, status, created_at, updated_at"
+        task_columns = ("id, project_id, name, description, notes, start_date, end_date, "
+                        "status, created_at, updated_at")
+        if project_has_path:
+            project_columns += ", local_path"
+        if task_has_path:
+            task_columns += ", local_path"
+
+        # 分批写入，生成百万行数据时内存占用保持稳定
+        batch = 10000
+        for offset in range(0, projects, batch):
+            project_rows = []
+            task_rows = []
+            for i in range(offset, min(offset + batch, projects)):
+                project_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                row = [project_id, f"项目 {i}", "描述" * 10,
+                       rng.choice(["planned", "in_progress", "completed"]), now, now]
+                if project_has_path:
+                    row.append(f"/data/project_{i}" if rng.random() < 0.3 else None)
+                project_rows.append(row)
+                for j in range(tasks_per_project):
+                    start = today + timedelta(days=rng.randint(-60, 30))
+                    end = start + timedelta(days=rng.randint(0, 30))
+                    task = [str(uuid.UUID(int=rng.getrandbits(128))), project_id, f"任务 {i}-{j}",
+                            "任务描述" * 5, "备注" * 5, start.isoformat(), end.isoformat(),
+                            rng.choice(["planned", "in_progress", "overdue", "completed"]), now, now]
+                    if task_has_path:
+                        task.append(None)
+                    task_rows.append(task)
+            conn.executemany(
+                f"INSERT INTO projects ({project_columns}) VALUES "
+                f"({', '.join('?' * len(project_rows[0]))})",
+                project_rows,
+            )
+            if task_rows:
+                conn.executemany(
+                    f"INSERT INTO tasks ({task_columns}) VALUES "
+                    f"({', '.join('?' * len(task_rows[0]))})",
+                    task_rows,
+                )
+            conn.commit()
+    finally:
+        conn.close()
+    return path
@@ -0,0 +1,94 @@
+"""
+迁移耗时测试：为每种旧结构生成不同规模的数据库并执行迁移
+
+    python -m benchmarks.migration_benchmark --rows 10000 100000 1000000
+
+rows 为项目行数，每个项目生成 --tasks-per-project 个任务。输出总耗时、批次数，
+以及最长的单个批次耗时（即迁移期间写锁的最长占用时间）。
+--check-resume 会在迁移进行到一半时中断，再次运行迁移并检查数据是否完整。
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import migrations
+from benchmarks.legacy_fixtures import LEGACY_SCHEMAS, create_legacy_database
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _counts(path: str) -> tuple:
+    conn = sqlite3.connect(path)
+    try:
+        return (conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0],
+                conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def run_migration(path: str, interrupt_after: int = None) -> dict:
+    """对 path 执行迁移，返回耗时统计；interrupt_after 指定在第几个批次后模拟中断"""
+    batch_times = []
+    last = time.perf_counter()
+
+    def progress(description, done, total):
+        nonlocal last
+        now = time.perf_counter()
+        batch_times.append(now - last)
+        last = now
+        if interrupt_after is not None and len(batch_times) >= interrupt_after:
+            raise _Interrupted()
+
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    try:
+        migrations.migrate(conn, progress)
+    finally:
+        conn.close()
+    return {
+        "seconds": time.perf_counter() - start,
+        "batches": len(batch_times),
+        "max_batch_ms": max(batch_times) * 1000 if batch_times else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--schema", choices=sorted(LEGACY_SCHEMAS), nargs="+", default=sorted(LEGACY_SCHEMAS))
+    parser.add_argument("--tasks-per-project", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=migrations.BATCH_SIZE)
+    parser.add_argument("--check-resume", action="store_true")
+    args = parser.parse_args(argv)
+
+    migrations.BATCH_SIZE = args.batch_size
+    work_dir = tempfile.mkdtemp(prefix="pt-migration-")
+    print(f"{'schema':<16}{'rows':>10}{'total s':>10}{'batches':>9}{'max batch ms':>14}")
+    for rows in args.rows:
+        for schema in args.schema:
+            path = os.path.join(work_dir, f"{schema}_{rows}.db")
+            create_legacy_database(path, schema, projects=rows, tasks_per_project=args.tasks_per_project)
+            expected = _counts(path)
+
+            resumed = ""
+            if args.check_resume:
+                try:
+                    run_migration(path, interrupt_after=max(rows // args.batch_size // 2, 1))
+                except _Interrupted:
+                    resumed = "  (interrupted, resumed)"
+            stats = run_migration(path)
+
+            actual = _counts(path)
+            if actual != expected:
+                raise SystemExit(f"{schema} {rows}: row counts changed {expected} -> {actual}")
+            print(f"{schema:<16}{rows:>10}{stats['seconds']:>10.2f}{stats['batches']:>9}"
+                  f"{stats['max_batch_ms']:>14.1f}{resumed}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+查询计划检查：对 Database 的每个方法执行一次，记录它发出的每条 SQL 的 EXPLAIN QUERY PLAN，
+检查热点路径上没有全表扫描/临时排序，并与保存的基线比较
+
+    python -m benchmarks.query_plans            # 检查，计划变化或违反规则时以非 0 退出并打印差异
+    python -m benchmarks.query_plans --update   # 有意修改查询或索引后更新基线
+    python -m benchmarks.query_plans --verbose  # 打印所有语句和计划
+
+种子数据库先执行 ANALYZE，查询计划与真实数据库上的一致；历史项目在打开时被移入归档库，
+归档库连接上的语句和 ATTACH 归档库后执行的语句同样记录。计划与 SQLite 版本有关，
+升级 SQLite 后如有变化，确认无误后用 --update 更新基线。
+"""
+import argparse
+import difflib
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from benchmarks.workload import WorkloadSpec, generate_database
+from database import Database
+from db_metrics import normalize_sql
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "query_plans.json")
+
+# 全表扫描（不带 USING INDEX 的 SCAN）；虚拟表和子查询的 SCAN 带有其他说明，不会匹配。
+# sqlite_master 很小，查询表结构时扫描它是正常的
+FULL_SCAN = re.compile(r"^SCAN (?!sqlite_)\w+$")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+# 允许全表扫描的方法：不在界面中使用，或本身就需要读取全部行
+ALLOW_FULL_SCAN = {"get_all_projects(include_archived=True)", "get_history_projects",
+                   "get_statistics(include_history=True)", "check_task_counters"}
+# 排序应该由索引提供的方法
+NO_TEMP_SORT = {"get_all_projects", "get_history_projects_page", "get_tasks_by_project",
+                "get_tasks_page", "get_today_tasks", "get_today_tasks(include_history=True)"}
+
+
+# 大部分项目和任务已完成，与长期使用后的数据库相似
+PLAN_WORKLOAD = WorkloadSpec(projects=500, tasks_per_project=20, history_share=0.7, archived_share=0.15,
+                             done_share=0.7, history_days=1500)
+
+
+def seed_database(path: str, spec: WorkloadSpec = PLAN_WORKLOAD) -> Database:
+    """按 spec 生成带有代表性数据的数据库（已执行 ANALYZE），返回已打开的 Database"""
+    generate_database(path, spec)
+    db = Database(path)
+    db.wait_for_backup()
+    # 归档默认关闭；检查时开启，归档库连接上的查询同样被覆盖
+    db.archive_mode = "single"
+    db.archive_history()
+    return db
+
+
+def method_calls(db: Database) -> list:
+    """(名称, 调用) 列表，覆盖 Database 中所有执行 SQL 的公开方法；写操作放在最后"""
+    conn = db._connect()
+    active_id = conn.execute("SELECT id FROM projects WHERE status = 'in_progress' LIMIT 1").fetchone()[0]
+    task_id = conn.execute("SELECT id FROM tasks WHERE project_id = ? LIMIT 1", (active_id,)).fetchone()[0]
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    first_page = db.get_history_projects_page("completed", 50)
+    history_id = first_page.items[0].id
+    first_tasks = db.get_tasks_page(active_id, 5)
+
+    def rollover():
+        # 先把任务计数退回到昨天，日期变化时的计数滚动语句也被记录
+        db._roll_task_counters(yesterday.isoformat())
+        db.apply_date_rollover(today.isoformat())
+
+    def create_and_delete_task():
+        new_id = db.create_task(active_id, "新任务", today.isoformat(), today.isoformat(), "描述", "备注", "/tmp")
+        db.update_task(new_id, name="新任务2", notes="新备注", local_path="/tmp/2")
+        db.delete_task(new_id)
+
+    def project_lifecycle():
+        new_id = db.create_project("新项目", "描述", "/tmp")
+        db.update_project(new_id, name="新项目2", local_path="/tmp/2")
+        db.create_task(new_id, "任务", today.isoformat(), today.isoformat())
+        db.complete_project(new_id)
+        db.archive_project(new_id)
+        db.restore_project(new_id)
+        db.delete_project(new_id)
+
+    return [
+        ("get_all_projects", lambda: db.get_all_projects()),
+        ("get_all_projects(include_archived=True)", lambda: db.get_all_projects(include_archived=True)),
+        ("get_history_projects", lambda: db.get_history_projects()),
+        ("get_history_projects_page", lambda: db.get_history_projects_page("completed", 50, first_page.next_cursor)),
+        ("count_history_projects", lambda: db.count_history_projects()),
+        ("get_project", lambda: db.get_project(active_id)),
+        ("get_tasks_by_project", lambda: db.get_tasks_by_project(history_id)),
+        ("get_task_descriptions", lambda: db.get_task_descriptions(active_id)),
+        ("get_tasks_page", lambda: db.get_tasks_page(active_id, 5, first_tasks.next_cursor)),
+        ("count_tasks", lambda: db.count_tasks(active_id)),
+        ("get_task", lambda: db.get_task(task_id)),
+        ("apply_date_rollover", rollover),
+        ("get_today_tasks", lambda: db.get_today_tasks()),
+        ("get_today_tasks(include_history=True)", lambda: db.get_today_tasks(include_history=True)),
+        ("get_overview_snapshot", lambda: db.get_overview_snapshot()),
+        ("get_statistics", lambda: db.get_statistics()),
+        ("get_statistics(include_history=True)", lambda: db.get_statistics(include_history=True)),
+        ("get_project_progress", lambda: db.get_project_progress()),
+        ("check_task_counters", lambda: db.check_task_counters()),
+        ("search", lambda: db.search("任务描述 1-1")),
+        ("search(scope=projects)", lambda: db.search("项目描述", scope="projects")),
+        ("search(short)", lambda: db.search("项目")),
+        ("update_task(status)", lambda: db.update_task(task_id, status="completed")),
+        ("create_task/update_task/delete_task", create_and_delete_task),
+        ("project lifecycle", project_lifecycle),
+        ("archive_history", lambda: db.archive_history()),
+    ]
+
+
+def _plan_lines(conn: sqlite3.Connection, sql: str) -> list:
+    """EXPLAIN QUERY PLAN 的结果，按层级缩进"""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall():
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def _traced_connections(db: Database) -> list:
+    """主库和各归档库的读写连接"""
+    connections = [db._connect(), db._connect(read_only=True)]
+    for path in db.get_archive_files():
+        connections += [db._archive_connect(path), db._archive_connect(path, read_only=True)]
+    return connections
+
+
+def collect_plans(db: Database) -> dict:
+    """{方法名: [{"sql": 规范化的语句, "plan": [计划行]}]}"""
+    statements = []
+    # 语句在执行它的连接上 EXPLAIN；引用 archive.* 的语句在 ATTACH 了归档库的独立连接上 EXPLAIN
+    connections = _traced_connections(db)
+    for traced in connections:
+        traced.set_trace_callback(lambda sql, traced=traced: statements.append((traced, sql)))
+    attached = sqlite3.connect(db.db_path)
+    for path in db.get_archive_files()[:1]:
+        attached.execute("ATTACH DATABASE ? AS archive", (path,))
+    result = {}
+    try:
+        for name, call in method_calls(db):
+            db._cache.clear()
+            statements.clear()
+            call()
+            entries = {}
+            for traced, sql in list(statements):
+                # 触发器内的语句以 "-- TRIGGER" 注释形式出现；事务控制和 PRAGMA 没有查询计划
+                if not re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", sql, re.IGNORECASE):
+                    continue
+                # FTS5 读写自身影子表（search_index_config 等）的内部语句
+                if re.search(r"search_index_\w+", sql):
+                    continue
+                key = normalize_sql(sql)
+                if key not in entries:
+                    entries[key] = _plan_lines(attached if "archive." in sql else traced, sql)
+            result[name] = [{"sql": key, "plan": plan} for key, plan in entries.items()]
+    finally:
+        for traced in connections:
+            traced.set_trace_callback(None)
+        attached.close()
+    return result
+
+
+def check_rules(plans: dict) -> list:
+    """返回违反规则的说明列表"""
+    problems = []
+    for name, entries in plans.items():
+        for entry in entries:
+            for line in entry["plan"]:
+                detail = line.strip()
+                if FULL_SCAN.match(detail) and name not in ALLOW_FULL_SCAN:
+                    problems.append(f"{name}: 全表扫描 [{detail}]\n    {entry['sql']}")
+                if detail == TEMP_SORT and name in NO_TEMP_SORT:
+                    problems.append(f"{name}: 临时排序 [{detail}]\n    {entry['sql']}")
+    return problems
+
+
+def _render(entries: list) -> list:
+    lines = []
+    for entry in entries:
+        lines.append(entry["sql"])
+        lines.extend("    " + line for line in entry["plan"])
+    return lines
+
+
+def diff_plans(baseline: dict, current: dict) -> list:
+    """与基线不同的方法的 unified diff 文本"""
+    diffs = []
+    for name in sorted(set(baseline) | set(current)):
+        before = _render(baseline.get(name, []))
+        after = _render(current.get(name, []))
+        if before != after:
+            diffs.append("\n".join(difflib.unified_diff(
+                before, after, f"baseline: {name}", f"current: {name}", lineterm="")))
+    return diffs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="用当前计划覆盖基线")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="pt-plans-")
+    db = seed_database(os.path.join(work_dir, "plans.db"))
+    try:
+        plans = collect_plans(db)
+    finally:
+        db.close()
+
+    if args.verbose:
+        for name, entries in plans.items():
+            print(f"== {name}")
+            print("\n".join(_render(entries)))
+
+    statement_count = sum(len(entries) for entries in plans.values())
+    problems = check_rules(plans)
+    if args.update:
+        if problems:
+            print("\n".join(problems))
+            raise SystemExit("计划违反规则，未更新基线")
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(plans, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"已更新基线：{len(plans)} 个方法，{statement_count} 条语句 -> {args.baseline}")
+        return
+
+    diffs = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            diffs = diff_plans(json.load(f), plans)
+    else:
+        print(f"基线不存在：{args.baseline}（用 --update 生成）")
+    for problem in problems:
+        print(problem)
+    for diff in diffs:
+        print(diff)
+    if problems or diffs:
+        print(f"\n{len(problems)} 处违反规则，{len(diffs)} 个方法的计划与基线不同", file=sys.stderr)
+        raise SystemExit(1)
+    print(f"{len(plans)} 个方法，{statement_count} 条语句的查询计划与基线一致")
+
+
+if __name__ == "__main__":
+    main()
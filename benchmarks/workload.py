@@ -0,0 +1,186 @@
+"""
+生成具有代表性数据分布的当前结构数据库，供性能测试和查询计划检查使用
+
+    python -m benchmarks.workload out.db --scale 100k
+
+SCALES 按任务总数给出 1k/10k/100k/1m 四种规模，WorkloadSpec 的各项比例和日期分布
+可以单独调整。相同的 WorkloadSpec（包括 seed）总是生成相同的数据。
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+
+import migrations
+from utils.platform_utils import get_machine_name
+
+
+@dataclass(frozen=True)
+class WorkloadSpec:
+    projects: int = 50
+    tasks_per_project: int = 20
+    # 历史项目（已完成 + 已归档）占全部项目的比例，以及其中已归档的比例
+    history_share: float = 0.6
+    archived_share: float = 0.3
+    # 进行中项目里已完成任务的比例；历史项目的任务全部已完成
+    done_share: float = 0.5
+    pinned_share: float = 0.05
+    # 日期分布：历史项目的任务分布在过去 history_days 天内；进行中项目的任务从
+    # 最近 active_days 天开始，最晚到未来 future_days 天；任务持续 0 ~ max_duration_days 天
+    history_days: int = 730
+    active_days: int = 60
+    future_days: int = 30
+    max_duration_days: int = 30
+    # 本地路径：machines 台电脑（包括当前电脑），path_share 的项目/任务设置了路径，
+    # 每台电脑以 machine_path_share 的概率有该项目/任务的路径
+    machines: int = 3
+    path_share: float = 0.3
+    machine_path_share: float = 0.7
+    seed: int = 0
+
+    @property
+    def tasks(self) -> int:
+        return self.projects * self.tasks_per_project
+
+
+SCALES = {
+    "1k": WorkloadSpec(projects=50, tasks_per_project=20),
+    "10k": WorkloadSpec(projects=500, tasks_per_project=20),
+    "100k": WorkloadSpec(projects=5000, tasks_per_project=20),
+    "1m": WorkloadSpec(projects=50000, tasks_per_project=20),
+}
+
+# 每批生成的项目数，生成百万行数据时内存占用保持稳定
+_PROJECT_BATCH = 2000
+
+
+def machine_names(spec: WorkloadSpec) -> list:
+    """路径表中出现的电脑名称，第一个是当前电脑（查询只连接当前电脑的路径）"""
+    current = get_machine_name() or "unknown-machine"
+    return [current] + [f"bench-machine-{k}" for k in range(1, spec.machines)]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+
+def _project_rows(spec: WorkloadSpec, rng: random.Random, index: int, today: date, machines: list):
+    """生成一个项目及其任务、路径的行"""
+    project_id = _uuid(rng)
+    if rng.random() < spec.history_share:
+        status = "archived" if rng.random() < spec.archived_share else "completed"
+        first_day = today - timedelta(days=rng.randint(spec.max_duration_days + 1, spec.history_days))
+        last_day = min(first_day + timedelta(days=spec.active_days), today - timedelta(days=1))
+    else:
+        status = "in_progress" if rng.random() < 0.7 else "planned"
+        first_day = today - timedelta(days=rng.randint(0, spec.active_days))
+        last_day = today + timedelta(days=spec.future_days)
+    history = status in ("completed", "archived")
+    span = max((last_day - first_day).days, 0)
+    created = datetime.combine(first_day, datetime.min.time())
+    update_days = (min(last_day, today) - first_day).days
+    updated = min(created + timedelta(days=rng.randint(0, update_days), seconds=rng.randint(0, 86399)),
+                  datetime.now())
+
+    project = (project_id, f"项目 {index}", "项目描述" * 10, status, created.isoformat(),
+               updated.isoformat(), int(rng.random() < spec.pinned_share))
+    tasks, paths = [], _path_rows(spec, rng, "project", project_id, f"project_{index}", machines)
+    for j in range(spec.tasks_per_project):
+        task_id = _uuid(rng)
+        start = first_day + timedelta(days=rng.randint(0, span))
+        end = start + timedelta(days=rng.randint(0, spec.max_duration_days))
+        done = history or rng.random() < spec.done_share
+        tasks.append((task_id, project_id, f"任务 {index}-{j}", "任务描述" * 5, "备注" * 5,
+                      start.isoformat(), end.isoformat(), "completed" if done else "planned",
+                      int(rng.random() < 0.3), int(rng.random() < 0.3),
+                      created.isoformat(), updated.isoformat()))
+        paths.extend(_path_rows(spec, rng, "task", task_id, f"task_{index}_{j}", machines))
+    return project, tasks, paths
+
+
+def _path_rows(spec: WorkloadSpec, rng: random.Random, entity_type: str, entity_id: str,
+               name: str, machines: list) -> list:
+    if rng.random() >= spec.path_share:
+        return []
+    return [(machine, entity_type, entity_id, f"/data/{machine}/{name}")
+            for machine in machines if rng.random() < spec.machine_path_share]
+
+
+def generate_database(path: str, spec: WorkloadSpec = SCALES["1k"], progress=None) -> dict:
+    """在 path 生成最新结构、按 spec 分布的数据库（已存在的文件会被覆盖），返回各表行数
+
+    progress(done, total) 在每批项目写入后调用。
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(spec.seed)
+    today = date.today()
+    machines = machine_names(spec)
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrations.migrate(conn)
+        # 逐行经过全文索引和任务计数触发器写入很慢：先去掉触发器批量写入，
+        # 再执行一次对应的迁移步骤，重新创建触发器、回填索引并重新计数
+        trigger_names = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND (name LIKE 'trg\\_%\\_search\\_%' ESCAPE '\\' OR name LIKE 'trg\\_tasks\\_counters\\_%' ESCAPE '\\')")]
+        for name in trigger_names:
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.commit()
+
+        for offset in range(0, spec.projects, _PROJECT_BATCH):
+            project_rows, task_rows, path_rows = [], [], []
+            for i in range(offset, min(offset + _PROJECT_BATCH, spec.projects)):
+                project, tasks, paths = _project_rows(spec, rng, i, today, machines)
+                project_rows.append(project)
+                task_rows.extend(tasks)
+                path_rows.extend(paths)
+            conn.executemany(
+                "INSERT INTO projects (id, name, description, status, created_at, updated_at, is_pinned) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", project_rows)
+            conn.executemany(
+                "INSERT INTO tasks (id, project_id, name, description, notes, start_date, end_date, status, "
+                "is_important, is_urgent, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                task_rows)
+            conn.executemany(
+                "INSERT INTO entity_paths (machine, entity_type, entity_id, path) VALUES (?, ?, ?, ?)", path_rows)
+            conn.commit()
+            if progress:
+                progress(min(offset + _PROJECT_BATCH, spec.projects), spec.projects)
+
+        if trigger_names:
+            for _ in migrations._create_search_index(conn):
+                conn.commit()
+            migrations._create_task_counters(conn)
+            conn.commit()
+        # 与应用关闭时的 PRAGMA optimize 一样，让查询计划基于真实的数据分布
+        conn.execute("ANALYZE")
+        conn.commit()
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("projects", "tasks", "entity_paths")}
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    spec = replace(SCALES[args.scale], seed=args.seed)
+    start = time.perf_counter()
+    counts = generate_database(args.path, spec)
+    print(f"{args.path}: {counts}，用时 {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,327 @@
-import json
 import sqlite3
 import uuid
 import os
 import shutil
 import glob
-from datetime import datetime
-from typing import List, Optional
-from models import Project, Task, Status, ProjectStatus
-from utils.config import get_db_path, set_db_path, get_default_db_path
+import threading
+import functools
+import inspect
+import logging
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from models import (Project, Task, TaskSummary, Status, ProjectStatus, OverviewSnapshot, Page, SearchHit,
+                    ProjectProgress, Statistics)
+from backup_store import BackupStore
+from db_metrics import DatabaseMetrics, TracedConnection
+import migrations
+from utils.config import (get_db_path, set_db_path, get_default_db_path, get_log_dir, get_slow_query_ms,
+                          is_sql_trace_enabled, get_archive_mode)
 from utils.platform_utils import get_machine_name
+from utils.app_logging import timed_phase, format_fields
+
+logger = logging.getLogger(__name__)
+
+# 按值查找 Status，避免每行调用 Status(value) 的开销
+_STATUS_BY_VALUE = {status.value: status for status in Status}
+
+
+def _task_status(value) -> Status:
+    # 未知的旧状态值按 planned 处理
+    return _STATUS_BY_VALUE.get(value, Status.PLANNED)
+
+
+def _like_pattern(term: str) -> str:
+    """LIKE 子串匹配的模式（转义 % 和 _，配合 ESCAPE '\\' 使用）"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _like_condition(columns, terms) -> tuple:
+    """每个关键词至少出现在 columns 的一列中，返回 (WHERE 条件, 参数列表)"""
+    clause = "(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in columns) + ")"
+    params = [_like_pattern(term) for term in terms for _ in columns]
+    return " AND ".join([clause] * len(terms)), params
+
+
+def _preview_text(value) -> str:
+    """列表查询取 PREVIEW_CHARS + 1 个字符，超出 PREVIEW_CHARS 说明原文被截断"""
+    if not value:
+        return ""
+    if len(value) > Database.PREVIEW_CHARS:
+        return value[:Database.PREVIEW_CHARS] + "…"
+    return value
+
+
+class ConnectionManager:
+    """数据库连接管理：每个线程复用一个长连接，PRAGMA 只在建立连接时设置一次"""
+
+    # PRAGMA optimize 运行 ANALYZE 时每个索引最多采样的行数
+    ANALYSIS_LIMIT = 1000
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000,
+                 cache_size_kb: int = 8192, cached_statements: int = 256,
+                 metrics: DatabaseMetrics = None, read_only: bool = False):
+        self.db_path = db_path
+        # read_only=True 时所有连接都以 mode=ro 打开，写操作会失败
+        self.read_only = read_only
+        # 指定时连接记录每条语句的耗时
+        self.metrics = metrics
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        # 数据库文件被替换后递增，各线程在下次取连接时重新打开
+        self._generation = 0
+
+    def get(self, read_only: bool = False) -> sqlite3.Connection:
+        """获取当前线程的连接，不存在时创建；read_only=True 时返回只读连接"""
+        attr = "ro_conn" if read_only or self.read_only else "conn"
+        conn = getattr(self._local, attr, None)
+        if conn is not None and getattr(self._local, attr + "_gen", None) != self._generation:
+            self._discard(conn)
+            conn = None
+        if conn is None:
+            conn = self._open(read_only)
+            setattr(self._local, attr, conn)
+            setattr(self._local, attr + "_gen", self._generation)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def invalidate(self):
+        """数据库文件被替换（例如同步客户端整体覆盖）后调用，使所有线程重新打开连接"""
+        self._generation += 1
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _open(self, read_only: bool = False) -> sqlite3.Connection:
+        read_only = read_only or self.read_only
+        if read_only:
+            # 只读连接不会获取写锁，也不会触发同步客户端上传
+            target = f"file:{urllib.request.pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+        else:
+            target = self.db_path
+        # check_same_thread=False 仅用于关闭时跨线程 close，连接本身不会被多个线程共享
+        conn = sqlite3.connect(
+            target,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            uri=read_only,
+            factory=TracedConnection if self.metrics is not None else sqlite3.Connection,
+        )
+        if self.metrics is not None:
+            conn.attach(self.metrics)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        # 负数表示以 KiB 为单位
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        return conn
+
+    def close_current(self):
+        """关闭当前线程的连接（工作线程结束前调用）"""
+        for attr in ("conn", "ro_conn"):
+            conn = getattr(self._local, attr, None)
+            if conn is not None:
+                self._discard(conn)
+                setattr(self._local, attr, None)
+
+    def close_all(self):
+        """关闭所有线程打开的连接（程序退出时调用）"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            # 根据本连接执行过的查询更新统计信息（只读连接上会失败，忽略）
+            try:
+                conn.execute(f"PRAGMA analysis_limit = {self.ANALYSIS_LIMIT}")
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+class EntityCache:
+    """已解析的 Project/Task 对象缓存（LRU 淘汰，线程安全）
+
+    键的形式为 ('project', id)、('task', id)、('project_tasks', project_id)。
+    任务状态与日期相关，跨天后整个缓存失效。
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._date = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """命中时返回缓存值，未命中返回 None"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            if self._date != today:
+                self._entries.clear()
+                self._date = today
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def invalidate_project_tree(self, project_id: str):
+        """使项目、项目任务列表以及该项目下所有已缓存任务失效"""
+        with self._lock:
+            stale = [key for key, value in self._entries.items()
+                     if (key[0] == 'task' and value.project_id == project_id)
+                     or (key[0] in ('project', 'project_tasks') and key[1] == project_id)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
 
 class Database:
-    LEGACY_PATH_KEY = "__default__"
+    LEGACY_PATH_KEY = migrations.LEGACY_PATH_KEY
+    # 行工厂按位置读取列，列顺序与对应的 _row_to_* 方法一致
+    # 完整列只在 get_project / get_task（打开详情或编辑器时）读取
+    PROJECT_COLUMNS = "p.id, p.name, p.description, p.status, ep.path, p.created_at, p.updated_at, p.is_pinned"
+    TASK_COLUMNS = ("t.id, t.project_id, t.name, t.description, t.notes, t.start_date, t.end_date, "
+                    "t.status, ep.path, t.is_important, t.is_urgent, t.created_at, t.updated_at")
+    # 列表视图只需要预览文本：多取一个字符用于判断是否被截断（见 _preview_text）
+    PREVIEW_CHARS = 100
+    PROJECT_LIST_COLUMNS = (f"p.id, p.name, substr(p.description, 1, {PREVIEW_CHARS + 1}), p.status, NULL, "
+                            "p.created_at, p.updated_at, p.is_pinned")
+    TASK_LIST_COLUMNS = (f"t.id, t.project_id, t.name, substr(t.description, 1, {PREVIEW_CHARS + 1}), "
+                         f"substr(t.notes, 1, {PREVIEW_CHARS + 1}), t.start_date, t.end_date, "
+                         "t.status, ep.path, t.is_important, t.is_urgent, t.created_at, t.updated_at")
+    TASK_SUMMARY_COLUMNS = (f"t.id, t.project_id, t.name, substr(t.description, 1, {PREVIEW_CHARS + 1}), "
+                            "t.start_date, t.end_date, t.status, t.is_important, t.is_urgent")
+    # 查询时只连接当前电脑的本地路径（参数为电脑名）
+    PROJECT_PATH_JOIN = ("LEFT JOIN entity_paths ep ON ep.machine = ? "
+                         "AND ep.entity_type = 'project' AND ep.entity_id = p.id")
+    TASK_PATH_JOIN = ("LEFT JOIN entity_paths ep ON ep.machine = ? "
+                      "AND ep.entity_type = 'task' AND ep.entity_id = t.id")
+    # trigram 索引能匹配的最短关键词
+    SEARCH_MIN_TRIGRAM = 3
+    # 命中数超过该值时不再按相关度排序（需要为每个命中计算 bm25），改为最新的在前
+    SEARCH_RANK_LIMIT = 2000
+    SEARCH_SCOPES = {'all': ('project', 'task'), 'projects': ('project',), 'tasks': ('task',)}
+    # 在线备份每一步复制的页数，步与步之间释放锁，其他连接可以继续写入
+    BACKUP_PAGES_PER_STEP = 256
+    # 增量备份存储与每日备份文件一样放在数据库所在目录（通常是同步目录），随数据库同步到其他电脑，
+    # 本机损坏或丢失时可以从其他电脑恢复；数据块按内容寻址，每次只有新写入的块需要上传
+    BACKUP_STORE_DIR = "PT_backups"
+    BACKUP_KEEP_COUNT = 7
+    # 归档库与主库在同一目录：<主库名>_archive.db，按年归档时为 <主库名>_archive_<年份>.db；
+    # 各归档库的增量备份保存在 PT_backups/archives/<归档库文件名> 下
+    ARCHIVE_SUFFIX = "_archive"
+    ARCHIVE_BACKUP_DIR = "archives"
+    # 把主库中已有的历史项目移入归档库时，每个事务移动的项目数
+    ARCHIVE_BATCH = 50
 
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, defer_migration: bool = False, read_only: bool = False):
+        """read_only=True 时只读打开（mode=ro）：不恢复、不备份、不升级结构，也不写入任务计数等派生数据，
+        读取不获取写锁、不会触发同步客户端上传；写方法会抛出 sqlite3.OperationalError。"""
+        # 启动各阶段的耗时（毫秒）：config、restore、migration，以及后台线程中的 backup、backup_cleanup、
+        # counter_roll、archive、counter_check、archive_backup
+        self.startup_phases = {}
         self.machine_name = get_machine_name() or "unknown-machine"
 
+        with timed_phase(self.startup_phases, "config"):
+            self.db_path = self._resolve_db_path(db_path)
+            # 完成/归档的项目移入的归档库：off、single 或 yearly（见 utils.config.ARCHIVE_MODES）
+            self.archive_mode = get_archive_mode()
+            # 方法和语句的耗时统计；超过阈值的写入日志目录下的慢查询日志
+            self.metrics = DatabaseMetrics(get_slow_query_ms(), get_log_dir(), tracing=is_sql_trace_enabled())
+        self.read_only = read_only
+        self._connections = ConnectionManager(self.db_path, metrics=self.metrics, read_only=read_only)
+        # 本进程内的写入次数，与 data_version、文件状态一起组成变化标识
+        self._write_counter = 0
+        self._file_id = None
+        # 已解析对象缓存；写操作按实体失效，检测到外部修改时整体失效
+        self._cache = EntityCache()
+        self._thread_state = threading.local()
+        # 各库（主库、归档库）是否有全文索引，按文件路径缓存
+        self._search_index_exists = {}
+        # task_counters 已确认滚动到的日期，同一天内读取统计时不再检查
+        self._counters_as_of = None
+        # 归档库路径 -> ConnectionManager，第一次读写该归档库时创建
+        self._archives = {}
+        self._archives_lock = threading.Lock()
+        # 已存在的归档库文件列表，None 表示需要重新扫描目录
+        self._archive_files = None
+        # 归档库路径 -> 文件的 (st_dev, st_ino)，用于发现被整体替换的归档库
+        self._archive_file_ids = {}
+        
+        # 先处理备份和恢复
+        self._backup_thread = None
+        # 最近一次后台备份是否新建了快照（当天已有快照时为 False）
+        self.backup_created = None
+        if not self.read_only:
+            with timed_phase(self.startup_phases, "restore"):
+                self._handle_backup_and_restore()
+        if defer_migration:
+            # 由调用方在工作线程中执行 init_database()，完成后再调用 start_backup()
+            return
+        self.init_database()
+        # 备份在后台线程进行，不阻塞启动
+        self.start_backup()
+
+    @staticmethod
+    def _resolve_db_path(db_path=None) -> str:
+        """数据库文件的绝对路径（未指定时读取配置文件，没有配置时使用并保存默认路径），确保所在目录存在"""
         # 如果没有指定路径，从配置文件读取
         if db_path is None:
             config_path = get_db_path()
@@ -27,18 +333,18 @@ class Database:
                 db_dir = os.path.dirname(config_path)
                 if db_dir and not os.path.exists(db_dir):
                     os.makedirs(db_dir, exist_ok=True)
-                self.db_path = config_path
+                return config_path
             else:
                 # 使用默认路径（跨平台用户目录）
                 default_path = get_default_db_path()
                 default_dir = os.path.dirname(default_path)
                 if default_dir and not os.path.exists(default_dir):
                     os.makedirs(default_dir, exist_ok=True)
-                self.db_path = default_path
                 try:
-                    set_db_path(self.db_path)
+                    set_db_path(default_path)
                 except Exception:
                     pass
+                return default_path
         else:
             # 调用方传入自定义路径
             if not os.path.isabs(db_path):
@@ -46,12 +352,98 @@ class Database:
             db_dir = os.path.dirname(db_path)
             if db_dir and not os.path.exists(db_dir):
                 os.makedirs(db_dir, exist_ok=True)
-            self.db_path = db_path
-        
-        # 先处理备份和恢复
-        self._handle_backup_and_restore()
-        self.init_database()
+            return db_path
     
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """获取当前线程的长连接（可用作 with 语句管理事务）"""
+        return self._connections.get(read_only)
+
+    def close(self):
+        """关闭所有数据库连接（包括归档库）"""
+        self._connections.close_all()
+        for manager in list(self._archives.values()):
+            manager.close_all()
+
+    def close_thread_connections(self):
+        """关闭当前线程的数据库连接，供临时工作线程退出前调用"""
+        self._connections.close_current()
+        for manager in list(self._archives.values()):
+            manager.close_current()
+
+    def get_change_token(self) -> tuple:
+        """获取数据库变化标识，标识不变说明自上次读取以来数据没有变化
+
+        由四部分组成：SQLite 的 data_version（其他连接/进程的提交）、数据库文件的
+        mtime 和大小（其他电脑通过同步目录修改）、本进程的写入计数，以及各归档库文件的状态。
+        """
+        try:
+            st = os.stat(self.db_path)
+            file_id = (st.st_dev, st.st_ino)
+            file_state = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            file_id = None
+            file_state = (0, 0)
+        # 同步客户端可能用新文件整体替换数据库，此时旧连接仍指向已删除的文件
+        if self._file_id is not None and file_id != self._file_id:
+            self._connections.invalidate()
+            self._cache.clear()
+            self._counters_as_of = None
+        self._file_id = file_id
+        self._check_external_change()
+        conn = self._connect(read_only=True)
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return (data_version, *file_state, self._write_counter, self._archive_state())
+
+    def _check_external_change(self):
+        """检测其他进程对数据库的修改，有则清空对象缓存
+
+        读写连接的 data_version 不受自身提交影响，只在其他连接提交后变化；写操作都在数据服务的
+        工作线程中执行，其他线程看到的变化大多来自本进程，写方法已按实体使缓存失效。
+        因此只有 data_version 变化、而本进程的写入计数没有变化时才认为是外部修改。
+        """
+        conn = self._connect()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        write_counter = self._write_counter
+        last = getattr(self._thread_state, "data_version", None)
+        if last is not None and version != last[0] and write_counter == last[1]:
+            self._cache.clear()
+        self._thread_state.data_version = (version, write_counter)
+
+    def cache_stats(self) -> dict:
+        """对象缓存的命中/未命中等统计"""
+        return self._cache.stats()
+
+    def set_sql_trace(self, enabled: bool):
+        """开启/关闭 SQL 跟踪日志，各线程在下次取连接时按新设置重新打开"""
+        self.metrics.tracing = enabled
+        self._connections.invalidate()
+
+    def dump_metrics(self, fmt: str = "json") -> str:
+        """导出方法/语句耗时指标和缓存统计，fmt 为 json 或 prometheus"""
+        cache = self.cache_stats()
+        if fmt == "prometheus":
+            return self.metrics.to_prometheus({
+                f"cache_{key}": value for key, value in cache.items()
+            })
+        if fmt != "json":
+            raise ValueError(f"不支持的格式: {fmt}")
+        return self.metrics.to_json({"db_path": self.db_path, "cache": cache})
+
+    def export_metrics(self, directory: str = None) -> List[str]:
+        """把指标写入 directory（默认为日志目录）下的 db_metrics.json 和 db_metrics.prom，返回文件路径"""
+        directory = directory or get_log_dir()
+        paths = []
+        for fmt, name in (("json", "db_metrics.json"), ("prometheus", "db_metrics.prom")):
+            path = os.path.join(directory, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.dump_metrics(fmt))
+            paths.append(path)
+        return paths
+
+    def _mark_changed(self):
+        """写操作完成后调用"""
+        self._write_counter += 1
+
     def get_db_directory(self) -> str:
         """获取数据库所在目录"""
         abs_path = os.path.abspath(self.db_path)
@@ -59,264 +451,165 @@ class Database:
         # 如果目录为空（当前目录），返回当前目录
         return db_dir if db_dir else os.getcwd()
     
-    def init_database(self):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS projects (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    description TEXT,
-                    status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'archived')),
-                    local_path TEXT,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    is_pinned INTEGER DEFAULT 0
-                )
-            """)
-            
-            # 迁移现有数据库：添加归档状态支持
-            # SQLite不支持直接修改CHECK约束，需要重建表
-            try:
-                # 检查表是否存在且需要迁移
-                cursor = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='projects'")
-                result = cursor.fetchone()
-                if result and 'archived' not in result[0]:
-                    # 需要迁移：重建表
-                    conn.execute("BEGIN TRANSACTION")
-                    # 创建新表
-                    # 检查是否需要添加 local_path 字段
-                    cursor = conn.execute("PRAGMA table_info(projects)")
-                    columns = [row[1] for row in cursor.fetchall()]
-                    has_local_path = 'local_path' in columns
-                    
-                    if has_local_path:
-                        # 如果已有 local_path 字段，直接重建表
-                        conn.execute("""
-                            CREATE TABLE projects_new (
-                                id TEXT PRIMARY KEY,
-                                name TEXT NOT NULL,
-                                description TEXT,
-                                status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'archived')),
-                                local_path TEXT,
-                                created_at TEXT NOT NULL,
-                                updated_at TEXT NOT NULL,
-                                is_pinned INTEGER DEFAULT 0
-                            )
-                        """)
-                        conn.execute("""
-                            INSERT INTO projects_new (id, name, description, status, local_path, created_at, updated_at)
-                            SELECT id, name, description, status, local_path, created_at, updated_at FROM projects
-                        """)
-                    else:
-                        # 如果没有 local_path 字段，需要添加
-                        conn.execute("""
-                            CREATE TABLE projects_new (
-                                id TEXT PRIMARY KEY,
-                                name TEXT NOT NULL,
-                                description TEXT,
-                                status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'archived')),
-                                local_path TEXT,
-                                created_at TEXT NOT NULL,
-                                updated_at TEXT NOT NULL,
-                                is_pinned INTEGER DEFAULT 0
-                            )
-                        """)
-                        conn.execute("""
-                            INSERT INTO projects_new (id, name, description, status, created_at, updated_at)
-                            SELECT id, name, description, status, created_at, updated_at FROM projects
-                        """)
-                    # 删除旧表
-                    conn.execute("DROP TABLE projects")
-                    # 重命名新表
-                    conn.execute("ALTER TABLE projects_new RENAME TO projects")
-                    conn.execute("COMMIT")
-            except Exception as e:
-                # 如果迁移失败，尝试回滚
-                try:
-                    conn.execute("ROLLBACK")
-                except:
-                    pass
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id TEXT PRIMARY KEY,
-                    project_id TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    description TEXT,
-                    notes TEXT,
-                    start_date TEXT NOT NULL,
-                    end_date TEXT NOT NULL,
-                    status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'overdue')),
-                    local_path TEXT,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
-                )
-            """)
-            
-            # 迁移 tasks 表：添加 local_path 字段
-            try:
-                cursor = conn.execute("PRAGMA table_info(tasks)")
-                columns = [row[1] for row in cursor.fetchall()]
-                if 'local_path' not in columns:
-                    conn.execute("ALTER TABLE tasks ADD COLUMN local_path TEXT")
-            except:
-                pass
-            
-            # 迁移 tasks 表：添加标签字段（兼容老数据库）
-            try:
-                cursor = conn.execute("PRAGMA table_info(tasks)")
-                columns = [row[1] for row in cursor.fetchall()]
-                if 'is_important' not in columns:
-                    conn.execute("ALTER TABLE tasks ADD COLUMN is_important INTEGER DEFAULT 0")
-                if 'is_urgent' not in columns:
-                    conn.execute("ALTER TABLE tasks ADD COLUMN is_urgent INTEGER DEFAULT 0")
-            except:
-                pass
-            
-            # 迁移现有数据库：更新 CHECK 约束（SQLite 不支持直接修改约束，需要重建表）
-            # 这里先检查是否需要迁移
-            try:
-                conn.execute("ALTER TABLE tasks ADD COLUMN temp_status TEXT")
-                conn.execute("UPDATE tasks SET temp_status = status")
-                conn.execute("UPDATE tasks SET status = 'overdue' WHERE status = 'planned' AND end_date < date('now')")
-                conn.execute("UPDATE tasks SET status = temp_status")
-                conn.execute("ALTER TABLE tasks DROP COLUMN temp_status")
-            except:
-                pass  # 如果表已存在新结构，忽略错误
-            
-            # 添加置顶字段（兼容老数据库）
-            try:
-                cursor = conn.execute("PRAGMA table_info(projects)")
-                columns = [row[1] for row in cursor.fetchall()]
-                if 'is_pinned' not in columns:
-                    conn.execute("ALTER TABLE projects ADD COLUMN is_pinned INTEGER DEFAULT 0")
-            except:
-                pass
-            
-            # 创建索引
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_project_id ON tasks(project_id)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_dates ON tasks(start_date, end_date)")
-    
-    def _load_path_map(self, raw_value) -> dict:
-        """将数据库中的 local_path 值解析为 {machine_name: path} 字典"""
-        if raw_value is None:
-            return {}
-        if isinstance(raw_value, bytes):
-            try:
-                raw_value = raw_value.decode("utf-8")
-            except Exception:
-                raw_value = raw_value.decode("utf-8", errors="ignore")
-        raw_value = str(raw_value).strip()
-        if not raw_value:
-            return {}
-        try:
-            data = json.loads(raw_value)
-            if isinstance(data, dict):
-                cleaned = {}
-                for key, value in data.items():
-                    if isinstance(key, str) and isinstance(value, str) and value.strip():
-                        cleaned[key] = value.strip()
-                return cleaned
-        except Exception:
-            pass
-        # 旧格式：直接保存一个字符串路径
-        return {self.LEGACY_PATH_KEY: raw_value}
-
-    def _serialize_path_map(self, path_map: dict) -> str:
-        """将路径字典序列化为 JSON 字符串"""
-        if not path_map:
-            return ""
-        return json.dumps(path_map, ensure_ascii=False)
-
-    def _get_local_path_for_current_machine(self, raw_value) -> str:
-        """获取当前电脑对应的本地路径，如果不存在则返回空字符串"""
-        path_map = self._load_path_map(raw_value)
-        return path_map.get(self.machine_name, "")
-
-    def _update_path_map_for_current_machine(self, raw_value, new_path: str) -> str:
-        """更新当前电脑的路径，并返回新的 JSON 字符串"""
-        path_map = self._load_path_map(raw_value)
-        sanitized_path = (new_path or "").strip()
-        if sanitized_path:
-            path_map[self.machine_name] = sanitized_path
-            # 更新后移除旧的默认路径，避免其他电脑误用
-            path_map.pop(self.LEGACY_PATH_KEY, None)
-        else:
-            path_map.pop(self.machine_name, None)
+    def schema_version(self) -> int:
+        """数据库结构的版本号（PRAGMA user_version）"""
+        return migrations.get_schema_version(self._connect(read_only=True))
 
-        # 保留其他机器的路径（包括 legacy）
-        path_map = {k: v for k, v in path_map.items() if v}
+    def needs_migration(self) -> bool:
+        """数据库结构是否需要升级"""
+        return migrations.needs_migration(self._connect())
 
-        return self._serialize_path_map(path_map)
+    def init_database(self, progress=None):
+        """按 PRAGMA user_version 执行尚未执行的迁移；已是最新版本时不做任何结构修改
 
-    def _ensure_path_map_for_new_entry(self, path: str) -> str:
-        """创建新数据库记录时，将路径包装为路径映射格式"""
+        progress(description, done, total) 在执行迁移的线程中调用。只读模式下不升级，结构不是最新时
+        抛出 sqlite3.OperationalError。
+        """
+        if self.read_only:
+            if self.needs_migration():
+                raise sqlite3.OperationalError("数据库结构需要升级，只读模式下无法打开，请先以正常模式启动一次")
+            return
+        with timed_phase(self.startup_phases, "migration"):
+            migrations.migrate(self._connect(), progress)
+    
+    def _set_entity_path(self, conn: sqlite3.Connection, entity_type: str, entity_id: str, path: str):
+        """设置当前电脑的本地路径（单行 upsert），路径为空时删除"""
         sanitized_path = (path or "").strip()
-        if not sanitized_path:
-            return ""
-        return self._serialize_path_map({self.machine_name: sanitized_path})
+        if sanitized_path:
+            conn.execute("""
+                INSERT INTO entity_paths (machine, entity_type, entity_id, path) VALUES (?, ?, ?, ?)
+                ON CONFLICT(machine, entity_type, entity_id) DO UPDATE SET path = excluded.path
+            """, (self.machine_name, entity_type, entity_id, sanitized_path))
+            # 更新后移除旧的默认路径，避免其他电脑误用
+            conn.execute(
+                "DELETE FROM entity_paths WHERE machine = ? AND entity_type = ? AND entity_id = ?",
+                (self.LEGACY_PATH_KEY, entity_type, entity_id)
+            )
+        else:
+            conn.execute(
+                "DELETE FROM entity_paths WHERE machine = ? AND entity_type = ? AND entity_id = ?",
+                (self.machine_name, entity_type, entity_id)
+            )
 
     # 项目操作方法
     def create_project(self, name: str, description: str = "", local_path: str = "") -> str:
         project_id = str(uuid.uuid4())
         now = datetime.now().isoformat()
-        stored_path = self._ensure_path_map_for_new_entry(local_path)
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute(
-                "INSERT INTO projects (id, name, description, status, local_path, created_at, updated_at, is_pinned) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                (project_id, name, description, "planned", stored_path, now, now, 0)
+                "INSERT INTO projects (id, name, description, status, created_at, updated_at, is_pinned) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (project_id, name, description, "planned", now, now, 0)
             )
+            self._set_entity_path(conn, 'project', project_id, local_path)
+        self._mark_changed()
         return project_id
     
     def get_all_projects(self, include_archived=False) -> List[Project]:
-        """获取所有项目，默认不包括已归档和已完成的"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            if include_archived:
-                rows = conn.execute("SELECT * FROM projects ORDER BY updated_at DESC").fetchall()
-            else:
-                rows = conn.execute(
-                    "SELECT * FROM projects WHERE status NOT IN ('completed', 'archived') ORDER BY updated_at DESC"
-                ).fetchall()
-            return [self._row_to_project(row) for row in rows]
+        """获取所有项目（预览对象），置顶的在前、按更新时间倒序；默认不包括已归档和已完成的
+
+        include_archived=True 时包括归档库中的项目，全部按更新时间倒序。
+        """
+        if include_archived:
+            projects = []
+            for conn in self._all_read_connections():
+                projects.extend(self._query(
+                    conn, self._row_to_project_preview,
+                    f"SELECT {self.PROJECT_LIST_COLUMNS} FROM projects p ORDER BY p.updated_at DESC"
+                ))
+            projects.sort(key=lambda p: p.updated_at, reverse=True)
+            return projects
+        with self._connect(read_only=True) as conn:
+            return self._query(
+                conn, self._row_to_project_preview,
+                f"SELECT {self.PROJECT_LIST_COLUMNS} FROM projects p "
+                "WHERE p.status NOT IN ('completed', 'archived') "
+                "ORDER BY p.is_pinned DESC, p.updated_at DESC"
+            ).fetchall()
     
     def get_history_projects(self) -> List[Project]:
-        """获取历史项目（已完成和已归档的）"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute(
-                "SELECT * FROM projects WHERE status IN ('completed', 'archived') ORDER BY updated_at DESC"
-            ).fetchall()
-            return [self._row_to_project(row) for row in rows]
+        """获取历史项目（已完成和已归档的，预览对象），包括归档库中的"""
+        projects = []
+        for conn in self._all_read_connections():
+            projects.extend(self._query(
+                conn, self._row_to_project_preview,
+                f"SELECT {self.PROJECT_LIST_COLUMNS} FROM projects p "
+                "WHERE p.status IN ('completed', 'archived') ORDER BY p.updated_at DESC"
+            ))
+        projects.sort(key=lambda p: p.updated_at, reverse=True)
+        return projects
     
+    def get_history_projects_page(self, status: str, limit: int = 50, after: tuple = None) -> Page:
+        """按 (updated_at, id) 倒序分页获取某一状态的历史项目（预览对象）
+
+        after 为上一页返回的 next_cursor。翻页按键集定位，耗时与已经翻过的页数无关。
+        主库和每个归档库各取一页，合并后取前 limit 个。
+        """
+        sql = f"SELECT {self.PROJECT_LIST_COLUMNS} FROM projects p WHERE p.status = ?"
+        params = [status]
+        if after is not None:
+            sql += " AND (p.updated_at, p.id) < (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY p.updated_at DESC, p.id DESC LIMIT ?"
+        params.append(limit + 1)
+        projects = []
+        for conn in self._all_read_connections():
+            projects.extend(self._query(conn, self._row_to_project_preview, sql, params))
+        projects.sort(key=lambda p: (p.updated_at, p.id), reverse=True)
+        return self._make_page(projects[:limit + 1], limit, lambda p: (p.updated_at, p.id))
+
+    def count_history_projects(self) -> dict:
+        """历史项目数量 {'completed': n, 'archived': n}（只扫描索引），包括归档库中的"""
+        counts = {'completed': 0, 'archived': 0}
+        for conn in self._all_read_connections():
+            for status, count in conn.execute(
+                "SELECT status, COUNT(*) FROM projects "
+                "WHERE status IN ('completed', 'archived') GROUP BY status"
+            ):
+                counts[status] += count
+        return counts
+
     def get_project(self, project_id: str) -> Optional[Project]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            row = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
-            return self._row_to_project(row) if row else None
+        """获取单个项目的完整数据（打开详情时调用），主库中没有时在归档库中查找"""
+        cached = self._cache.get(('project', project_id))
+        if cached is not None:
+            return cached
+        for conn in self._all_read_connections():
+            project = self._query(
+                conn, self._row_to_project,
+                f"SELECT {self.PROJECT_COLUMNS} FROM projects p {self.PROJECT_PATH_JOIN} WHERE p.id = ?",
+                (self.machine_name, project_id)
+            ).fetchone()
+            if project is not None:
+                break
+        else:
+            return None
+        self._cache.put(('project', project_id), project)
+        return project
     
     def update_project(self, project_id: str, **kwargs):
         now = datetime.now().isoformat()
         kwargs['updated_at'] = now
-        with sqlite3.connect(self.db_path) as conn:
+        # 历史项目可能已移入归档库，直接修改所在的库
+        with self._write_connect_for_project(project_id) as conn:
             if 'local_path' in kwargs:
-                cursor = conn.execute(
-                    "SELECT local_path FROM projects WHERE id = ?",
-                    (project_id,)
-                )
-                row = cursor.fetchone()
-                raw_value = row[0] if row else ""
-                kwargs['local_path'] = self._update_path_map_for_current_machine(raw_value, kwargs['local_path'])
+                self._set_entity_path(conn, 'project', project_id, kwargs.pop('local_path'))
 
             set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
             values = list(kwargs.values()) + [project_id]
             conn.execute(f"UPDATE projects SET {set_clause} WHERE id = ?", values)
+        self._cache.invalidate(('project', project_id))
+        self._mark_changed()
     
     def delete_project(self, project_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM projects WHERE id = ?", (project_id,)).rowcount
+        if not deleted:
+            archive_path = self._find_archive(project_id)
+            if archive_path is not None:
+                with self._archive_connect(archive_path) as conn:
+                    conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        self._cache.invalidate_project_tree(project_id)
+        self._mark_changed()
     
     # 任务操作方法
     def create_task(self, project_id: str, name: str, start_date: str, end_date: str, 
@@ -324,94 +617,375 @@ class Database:
                     is_important: bool = False, is_urgent: bool = False) -> str:
         task_id = str(uuid.uuid4())
         now = datetime.now().isoformat()
-        stored_path = self._ensure_path_map_for_new_entry(local_path)
-        with sqlite3.connect(self.db_path) as conn:
+        with self._write_connect_for_project(project_id) as conn:
             conn.execute(
-                "INSERT INTO tasks (id, project_id, name, description, notes, start_date, end_date, status, local_path, is_important, is_urgent, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                "INSERT INTO tasks (id, project_id, name, description, notes, start_date, end_date, status, is_important, is_urgent, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
                 (task_id, project_id, name, description, notes, start_date, end_date, 
-                 Status.PLANNED.value, stored_path, 1 if is_important else 0, 1 if is_urgent else 0, now, now)
+                 Status.PLANNED.value, 1 if is_important else 0, 1 if is_urgent else 0, now, now)
             )
+            self._set_entity_path(conn, 'task', task_id, local_path)
+        self._cache.invalidate(('project_tasks', project_id))
+        self._mark_changed()
         return task_id
     
     def get_tasks_by_project(self, project_id: str) -> List[Task]:
-        """获取项目的所有任务，并自动更新状态"""
-        # 先自动更新任务状态
-        self.update_task_status_auto()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        """获取项目的所有任务（预览对象，状态在读取时根据日期计算）"""
+        cached = self._cache.get(('project_tasks', project_id))
+        if cached is not None:
+            return list(cached)
+        with self._connect_for_project(project_id) as conn:
+            tasks = self._query(
+                conn, self._row_to_task_preview,
+                f"SELECT {self.TASK_LIST_COLUMNS} FROM tasks_view t {self.TASK_PATH_JOIN} "
+                "WHERE t.project_id = ? ORDER BY t.start_date",
+                (self.machine_name, project_id)
+            ).fetchall()
+        self._cache.put(('project_tasks', project_id), tasks)
+        return list(tasks)
+
+    def get_task_descriptions(self, project_id: str) -> Dict[str, str]:
+        """项目中描述超过预览长度（列表查询返回的已截断）的任务的完整描述 {task_id: 描述}，一次查询"""
+        with self._connect_for_project(project_id) as conn:
             rows = conn.execute(
-                "SELECT * FROM tasks WHERE project_id = ? ORDER BY start_date", 
-                (project_id,)
+                "SELECT id, description FROM tasks WHERE project_id = ? AND length(description) > ?",
+                (project_id, self.PREVIEW_CHARS)
             ).fetchall()
-            return [self._row_to_task(row) for row in rows]
+        return {row[0]: row[1] for row in rows}
+
+    def get_tasks_page(self, project_id: str, limit: int = 100, after: tuple = None) -> Page:
+        """按 (start_date, id) 分页获取项目的任务（预览对象），after 为上一页返回的 next_cursor"""
+        sql = (f"SELECT {self.TASK_LIST_COLUMNS} FROM tasks_view t {self.TASK_PATH_JOIN} "
+               "WHERE t.project_id = ?")
+        params = [self.machine_name, project_id]
+        if after is not None:
+            sql += " AND (t.start_date, t.id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY t.start_date, t.id LIMIT ?"
+        params.append(limit + 1)
+        with self._connect_for_project(project_id) as conn:
+            tasks = self._query(conn, self._row_to_task_preview, sql, params).fetchall()
+        return self._make_page(tasks, limit, lambda t: (t.start_date, t.id))
+
+    def count_tasks(self, project_id: str) -> int:
+        with self._connect_for_project(project_id) as conn:
+            return conn.execute("SELECT COUNT(*) FROM tasks WHERE project_id = ?", (project_id,)).fetchone()[0]
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        """获取单个任务的完整数据（打开编辑器时调用），主库中没有时在归档库中查找"""
+        cached = self._cache.get(('task', task_id))
+        if cached is not None:
+            return cached
+        for conn in self._all_read_connections():
+            task = self._query(
+                conn, self._row_to_task,
+                f"SELECT {self.TASK_COLUMNS} FROM tasks_view t {self.TASK_PATH_JOIN} WHERE t.id = ?",
+                (self.machine_name, task_id)
+            ).fetchone()
+            if task is not None:
+                break
+        else:
+            return None
+        self._cache.put(('task', task_id), task)
+        return task
     
     def update_task_status_auto(self):
-        """根据时间自动更新任务状态"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        now_iso = datetime.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            # 更新已超时的任务（截止日期已过且未完成）
-            conn.execute("""
-                UPDATE tasks 
-                SET status = 'overdue', updated_at = ?
-                WHERE status != 'completed' 
-                AND status != 'overdue'
-                AND end_date < ?
-            """, (now_iso, today))
-            
-            # 更新应该进行中的任务（开始日期已到，截止日期未到，且不是已完成或已超时）
-            conn.execute("""
-                UPDATE tasks 
-                SET status = 'in_progress', updated_at = ?
-                WHERE status IN ('planned', 'overdue')
-                AND start_date <= ?
-                AND end_date >= ?
-            """, (now_iso, today, today))
-
-            # 更新尚未开始的任务为计划中（开始日期在未来）
-            conn.execute("""
-                UPDATE tasks
-                SET status = 'planned', updated_at = ?
-                WHERE status != 'completed'
-                AND start_date > ?
-            """, (now_iso, today))
+        """兼容旧接口：任务的时间状态已在读取时计算，不再需要写回数据库"""
+        return
+
+    def apply_date_rollover(self, current_date: str):
+        """日期变化时调用：把 task_counters 滚动到 current_date（YYYY-MM-DD），只有开始/截止日期边界
+        被跨越的任务的计数移到新状态。时钟回拨时 current_date 可能早于计数表的日期，同样处理。
+        任务状态在读取时按日期计算，各页面日期变化后强制刷新即可。
+        只读模式下不修改计数表，统计在下次读取时按新日期重新计数。
+        """
+        if not self.read_only:
+            self._roll_task_counters(current_date)
     
     def get_today_tasks(self, include_history=False) -> List[Task]:
-        """获取今日任务（包括已超时的任务），默认不包括历史项目的任务"""
-        # 先自动更新任务状态
-        self.update_task_status_auto()
-        
-        today = datetime.now().strftime("%Y-%m-%d")
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            if include_history:
-                # 包括所有项目
-                rows = conn.execute("""
-                    SELECT t.* FROM tasks t 
-                    JOIN projects p ON t.project_id = p.id
-                    WHERE ((t.start_date <= ? AND t.end_date >= ?)
-                       OR (t.end_date < ? AND t.status = 'overdue'))
-                    AND t.status != 'completed'
-                    ORDER BY 
-                        CASE WHEN t.status = 'overdue' THEN 0 ELSE 1 END,
-                        t.end_date
-                """, (today, today, today)).fetchall()
-            else:
-                # 不包括已完成和已归档的项目
-                rows = conn.execute("""
-                    SELECT t.* FROM tasks t 
-                    JOIN projects p ON t.project_id = p.id
-                    WHERE ((t.start_date <= ? AND t.end_date >= ?)
-                       OR (t.end_date < ? AND t.status = 'overdue'))
-                    AND t.status != 'completed'
-                    AND p.status NOT IN ('completed', 'archived')
-                    ORDER BY 
-                        CASE WHEN t.status = 'overdue' THEN 0 ELSE 1 END,
-                        t.end_date
-                """, (today, today, today)).fetchall()
-            return [self._row_to_task(row) for row in rows]
+        """获取今日任务（包括已超时的任务），默认不包括历史项目的任务
+
+        include_history=True 时包括归档库中项目的任务，全部按截止日期排序。
+        """
+        if not include_history:
+            with self._connect(read_only=True) as conn:
+                return self._query_today_tasks(conn)
+        tasks = []
+        for conn in self._all_read_connections():
+            tasks.extend(self._query_today_tasks(conn, include_history=True))
+        tasks.sort(key=lambda t: t.end_date)
+        return tasks
+
+    def _query_today_tasks(self, conn: sqlite3.Connection, include_history=False,
+                           summary=False) -> list:
+        """summary=True 时返回 TaskSummary（不读取备注和本地路径）"""
+        if summary:
+            columns, path_join, params = self.TASK_SUMMARY_COLUMNS, "", ()
+            row_factory = self._row_to_task_summary
+        else:
+            columns, path_join, params = self.TASK_LIST_COLUMNS, self.TASK_PATH_JOIN, (self.machine_name,)
+            row_factory = self._row_to_task_preview
+        # 今日任务即进行中（开始日期已到、截止日期未到）和已超时的任务；
+        # 已超时任务的截止日期在今天之前，按截止日期排序即排在进行中的任务前面。
+        # stored_status 条件让查询使用未完成任务的部分索引 idx_tasks_open_end
+        if include_history:
+            # 包括所有项目
+            return self._query(conn, row_factory, f"""
+                SELECT {columns} FROM tasks_view t 
+                JOIN projects p ON t.project_id = p.id
+                {path_join}
+                WHERE t.stored_status != 'completed' AND t.status IN ('in_progress', 'overdue')
+                ORDER BY t.end_date
+            """, params).fetchall()
+        else:
+            # 不包括已完成和已归档的项目
+            return self._query(conn, row_factory, f"""
+                SELECT {columns} FROM tasks_view t 
+                JOIN projects p ON t.project_id = p.id
+                {path_join}
+                WHERE t.stored_status != 'completed' AND t.status IN ('in_progress', 'overdue')
+                AND p.status NOT IN ('completed', 'archived')
+                ORDER BY t.end_date
+            """, params).fetchall()
+
+    def get_overview_snapshot(self) -> OverviewSnapshot:
+        """获取总览页面数据：项目、按象限分组的任务、今日任务和统计数据来自同一个读事务"""
+        self._ensure_task_counters_current()
+        conn = self._connect(read_only=True)
+        conn.execute("BEGIN")
+        try:
+            projects = self._query(
+                conn, self._row_to_project_preview,
+                f"SELECT {self.PROJECT_LIST_COLUMNS} FROM projects p "
+                "WHERE p.status NOT IN ('completed', 'archived') ORDER BY p.updated_at DESC"
+            ).fetchall()
+
+            status_counts = self._merge_counts(self._count_tasks_by_quadrant(conn).values())
+
+            # 总览只展示进行中和已超时的任务，按项目更新时间、任务开始日期排序
+            tasks = self._query(conn, self._row_to_task_summary, f"""
+                SELECT {self.TASK_SUMMARY_COLUMNS} FROM tasks_view t
+                JOIN projects p ON t.project_id = p.id
+                WHERE p.status NOT IN ('completed', 'archived')
+                AND t.stored_status != 'completed' AND t.status IN ('in_progress', 'overdue')
+                ORDER BY p.updated_at DESC, t.start_date
+            """).fetchall()
+
+            today_tasks = self._query_today_tasks(conn, summary=True)
+        finally:
+            conn.commit()
+
+        quadrant_tasks = {
+            (True, True): [],
+            (False, True): [],
+            (True, False): [],
+            (False, False): [],
+        }
+        for task in tasks:
+            quadrant_tasks[(task.is_important, task.is_urgent)].append(task)
+
+        stats = {
+            'total_projects': len(projects),
+            'active_projects': sum(1 for p in projects if p.status == 'in_progress'),
+            'total_tasks': sum(status_counts.values()),
+            'active_tasks': status_counts.get('in_progress', 0),
+            'overdue_tasks': status_counts.get('overdue', 0),
+            'today_tasks': len(today_tasks),
+        }
+        return OverviewSnapshot(
+            projects=projects,
+            quadrant_tasks=quadrant_tasks,
+            today_tasks=today_tasks,
+            stats=stats,
+        )
     
+    def get_statistics(self, include_history=False) -> Statistics:
+        """项目数、按状态/象限的任务数和各项目的进度，全部在 SQL 中聚合（同一个读事务）
+
+        默认只统计未完成的项目及其任务，include_history=True 时包括已完成和已归档的项目。
+        任务数读取 task_counters（每个项目最多 16 行），不扫描任务表。
+        """
+        self._ensure_task_counters_current()
+        conn = self._connect(read_only=True)
+        conn.execute("BEGIN")
+        try:
+            project_filter = "" if include_history else "WHERE status NOT IN ('completed', 'archived')"
+            projects_by_status = dict(conn.execute(
+                f"SELECT status, COUNT(*) FROM projects {project_filter} GROUP BY status"
+            ).fetchall())
+            tasks_by_quadrant = self._count_tasks_by_quadrant(conn, include_history)
+            project_progress = self._query_project_progress(conn, include_history)
+        finally:
+            conn.commit()
+        if include_history:
+            self._add_archive_statistics(projects_by_status, tasks_by_quadrant, project_progress)
+        return Statistics(
+            projects_by_status=projects_by_status,
+            tasks_by_status=self._merge_counts(tasks_by_quadrant.values()),
+            tasks_by_quadrant=tasks_by_quadrant,
+            project_progress=project_progress,
+        )
+
+    def get_project_progress(self, include_history=False) -> Dict[str, ProjectProgress]:
+        """各项目的进度 {project_id: ProjectProgress}，默认只包括未完成的项目"""
+        if include_history:
+            return self.get_statistics(include_history=True).project_progress
+        self._ensure_task_counters_current()
+        with self._connect(read_only=True) as conn:
+            return self._query_project_progress(conn, include_history)
+
+    def _count_tasks_by_quadrant(self, conn: sqlite3.Connection, include_history=False) -> dict:
+        """{(is_important, is_urgent): {任务状态: 任务数}}，四个象限总是存在"""
+        counts = {(True, True): {}, (False, True): {}, (True, False): {}, (False, False): {}}
+        if include_history:
+            rows = conn.execute("""
+                SELECT c.is_important, c.is_urgent, c.status, SUM(c.count) FROM task_counters c
+                GROUP BY c.is_important, c.is_urgent, c.status
+            """)
+        else:
+            # CROSS JOIN 固定连接顺序：先用 idx_projects_active 找出未完成的项目，
+            # 再按主键前缀取这些项目的计数行
+            rows = conn.execute("""
+                SELECT c.is_important, c.is_urgent, c.status, SUM(c.count) FROM projects p
+                CROSS JOIN task_counters c ON c.project_id = p.id
+                WHERE p.status NOT IN ('completed', 'archived')
+                GROUP BY c.is_important, c.is_urgent, c.status
+            """)
+        for is_important, is_urgent, status, count in rows:
+            counts[(bool(is_important), bool(is_urgent))][status] = count
+        return counts
+
+    def _add_archive_statistics(self, projects_by_status: dict, tasks_by_quadrant: dict, project_progress: dict):
+        """把归档库中的项目和任务计入统计；只在包括历史项目的统计中使用
+
+        归档库的计数表不随日期滚动（避免每天写入很少变化的归档库）：已完成任务的计数与日期无关，
+        直接读取计数表，未完成的任务（归档项目中的少量任务）按今天重新计数。
+        """
+        today = date.today().isoformat()
+        for conn in self._archive_read_connections():
+            for status, count in conn.execute("SELECT status, COUNT(*) FROM projects GROUP BY status"):
+                projects_by_status[status] = projects_by_status.get(status, 0) + count
+            for (project_id,) in conn.execute("SELECT id FROM projects"):
+                project_progress.setdefault(project_id, ProjectProgress(project_id))
+            counters = {tuple(row[:4]): row[4] for row in conn.execute(
+                "SELECT project_id, is_important, is_urgent, status, count FROM task_counters"
+                " WHERE status = 'completed'")}
+            counters.update(migrations.compute_task_counters(conn, today, open_only=True))
+            for key, count in counters.items():
+                project_id, is_important, is_urgent, status = key
+                quadrant = tasks_by_quadrant[(bool(is_important), bool(is_urgent))]
+                quadrant[status] = quadrant.get(status, 0) + count
+                progress = project_progress.setdefault(project_id, ProjectProgress(project_id))
+                progress.total += count
+                if status == 'completed':
+                    progress.completed += count
+                elif status == 'overdue':
+                    progress.overdue += count
+
+    @staticmethod
+    def _merge_counts(counts_list) -> dict:
+        merged = {}
+        for counts in counts_list:
+            for key, count in counts.items():
+                merged[key] = merged.get(key, 0) + count
+        return merged
+
+    def _query_project_progress(self, conn: sqlite3.Connection, include_history=False) -> dict:
+        # LEFT JOIN：没有任务的项目同样返回（进度为 0/0）
+        project_filter = "" if include_history else "WHERE p.status NOT IN ('completed', 'archived')"
+        rows = conn.execute(f"""
+            SELECT p.id, COALESCE(SUM(c.count), 0),
+                   COALESCE(SUM(CASE WHEN c.status = 'completed' THEN c.count END), 0),
+                   COALESCE(SUM(CASE WHEN c.status = 'overdue' THEN c.count END), 0)
+            FROM projects p LEFT JOIN task_counters c ON c.project_id = p.id
+            {project_filter}
+            GROUP BY p.id
+        """)
+        return {row[0]: ProjectProgress(*row) for row in rows}
+
+    def _ensure_task_counters_current(self):
+        """task_counters 的状态按 as_of 这一天计算。读取路径不写入：as_of 不是今天时（跨过午夜，
+        或上次在之前的日期运行，滚动尚未在工作线程中完成）按今天重新计数到临时表。
+        计数表滚动到今天之后同一天内不再检查"""
+        today = date.today().isoformat()
+        if self._counters_as_of == today and getattr(self._thread_state, 'temp_counters', None) is None:
+            return
+        conn = self._connect(read_only=True)
+        row = conn.execute("SELECT as_of FROM main.task_counters_state WHERE id = 1").fetchone()
+        if row is not None and row[0] == today:
+            self._drop_temp_task_counters(conn)
+            self._counters_as_of = today
+            return
+        self._ensure_temp_task_counters(conn, today)
+
+    def _ensure_temp_task_counters(self, conn: sqlite3.Connection, as_of: str):
+        """保存的计数不是 as_of 这一天的（只读模式，或滚动尚未完成）时，在当前线程的只读连接上
+        按 as_of 重新计数到同名的临时表（临时表遮盖主库中的表，统计查询不需要修改）。
+        data_version 变化（有写入提交）后重新计数"""
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        state = getattr(self._thread_state, 'temp_counters', None)
+        if state is not None and state[0] is conn and state[1:] == (as_of, data_version):
+            return
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS temp.task_counters")
+            conn.execute("""
+                CREATE TEMP TABLE task_counters (
+                    project_id TEXT NOT NULL, is_important INTEGER NOT NULL, is_urgent INTEGER NOT NULL,
+                    status TEXT NOT NULL, count INTEGER NOT NULL,
+                    PRIMARY KEY (project_id, is_important, is_urgent, status)
+                ) WITHOUT ROWID
+            """)
+            conn.executemany("INSERT INTO temp.task_counters VALUES (?, ?, ?, ?, ?)", [
+                key + (count,) for key, count in migrations.compute_task_counters(conn, as_of).items()])
+        self._thread_state.temp_counters = (conn, as_of, data_version)
+
+    def _drop_temp_task_counters(self, conn: sqlite3.Connection):
+        """计数表已滚动到今天：删除当前线程的临时计数表，之后直接读取主库中的计数表"""
+        state = getattr(self._thread_state, 'temp_counters', None)
+        if state is None:
+            return
+        if state[0] is conn:
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS temp.task_counters")
+        self._thread_state.temp_counters = None
+
+    def _roll_task_counters(self, as_of: str):
+        conn = self._connect()
+        # 写锁在事务开始时获取，其他进程已经滚动过时 roll_task_counters 不做任何修改
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            migrations.roll_task_counters(conn, as_of)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._counters_as_of = as_of
+
+    def check_task_counters(self, repair: bool = False) -> dict:
+        """从任务表重新计数并与 task_counters 比较
+
+        返回 {'as_of': 日期, 'drift': [(project_id, is_important, is_urgent, status, 计数表中的值, 实际值)],
+        'repaired': bool}；repair=True 且存在偏差时重建计数表（只读模式下不重建）。
+        计数表与保存的 as_of 比较，不需要先滚动到今天。
+        """
+        conn = self._connect(read_only=True)
+        conn.execute("BEGIN")
+        try:
+            as_of = conn.execute("SELECT as_of FROM task_counters_state WHERE id = 1").fetchone()[0]
+            stored = {tuple(row[:4]): row[4] for row in conn.execute(
+                "SELECT project_id, is_important, is_urgent, status, count FROM main.task_counters")}
+            expected = migrations.compute_task_counters(conn, as_of)
+        finally:
+            conn.commit()
+        drift = [key + (stored.get(key, 0), expected.get(key, 0))
+                 for key in sorted(stored.keys() | expected.keys())
+                 if stored.get(key, 0) != expected.get(key, 0)]
+        repaired = False
+        if drift and repair and not self.read_only:
+            with self._connect() as write_conn:
+                migrations.rebuild_task_counters(write_conn, as_of)
+            repaired = True
+        return {'as_of': as_of, 'drift': drift, 'repaired': repaired}
+
     def update_task(self, task_id: str, **kwargs):
         now = datetime.now().isoformat()
         kwargs['updated_at'] = now
@@ -423,133 +997,433 @@ class Database:
             kwargs['is_urgent'] = 1 if kwargs['is_urgent'] else 0
         if 'is_pinned' in kwargs:
             kwargs['is_pinned'] = 1 if kwargs['is_pinned'] else 0
+        # 只持久化 completed，其余时间状态在读取时计算
+        if 'status' in kwargs and kwargs['status'] != Status.COMPLETED.value:
+            kwargs['status'] = Status.PLANNED.value
         
-        with sqlite3.connect(self.db_path) as conn:
+        project_id, archive_path = self._find_task(task_id)
+        with self._write_connect_for_archive(archive_path) as conn:
             if 'local_path' in kwargs:
-                cursor = conn.execute(
-                    "SELECT local_path FROM tasks WHERE id = ?",
-                    (task_id,)
-                )
-                row = cursor.fetchone()
-                raw_value = row[0] if row else ""
-                kwargs['local_path'] = self._update_path_map_for_current_machine(raw_value, kwargs['local_path'])
+                self._set_entity_path(conn, 'task', task_id, kwargs.pop('local_path'))
 
             set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
             values = list(kwargs.values()) + [task_id]
             conn.execute(f"UPDATE tasks SET {set_clause} WHERE id = ?", values)
+        self._cache.invalidate(('task', task_id), ('project_tasks', project_id),
+                               ('project_tasks', kwargs.get('project_id')))
+        self._mark_changed()
     
     def delete_task(self, task_id: str):
-        with sqlite3.connect(self.db_path) as conn:
+        project_id, archive_path = self._find_task(task_id)
+        with self._write_connect_for_archive(archive_path) as conn:
             conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        self._cache.invalidate(('task', task_id), ('project_tasks', project_id))
+        self._mark_changed()
     
+    # 搜索
+    def search(self, query: str, limit: int = 50, scope: str = 'all') -> List[SearchHit]:
+        """在项目名称/描述、任务名称/描述/备注中搜索，按相关度返回最多 limit 条结果
+
+        query 按空白拆分为多个关键词，结果需包含所有关键词（子串匹配，不区分英文大小写）。
+        scope 为 'all'、'projects' 或 'tasks'。关键词都短于 3 个字符时无法使用全文索引，
+        只匹配名称。
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        entity_types = self.SEARCH_SCOPES[scope]
+        long_terms = [term for term in terms if len(term) >= self.SEARCH_MIN_TRIGRAM]
+        # 先搜索主库，结果不足 limit 条时再依次搜索归档库
+        hits = []
+        for path, conn in self._read_connections_by_path():
+            remaining = limit - len(hits)
+            if remaining <= 0:
+                break
+            if not long_terms:
+                hits.extend(self._search_like(conn, terms, remaining, entity_types, names_only=True))
+            elif not self._has_search_index(path, conn):
+                hits.extend(self._search_like(conn, terms, remaining, entity_types))
+            else:
+                hits.extend(self._search_fts(conn, terms, long_terms, remaining, entity_types))
+        return hits
+
+    def _has_search_index(self, path: str, conn: sqlite3.Connection) -> bool:
+        # SQLite 不支持 FTS5/trigram 时迁移不会创建全文索引；归档库可能由其他版本的 SQLite 创建
+        exists = self._search_index_exists.get(path)
+        if exists is None:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+            ).fetchone() is not None
+            self._search_index_exists[path] = exists
+        return exists
+
+    def _search_fts(self, conn, terms, long_terms, limit, entity_types) -> List[SearchHit]:
+        # 每个关键词作为一个短语，短语之间为 AND
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+        where = ["search_index MATCH ?"]
+        params = [match]
+        # 短关键词在全文索引命中的行中再用 LIKE 过滤
+        short_terms = [term for term in terms if len(term) < self.SEARCH_MIN_TRIGRAM]
+        if short_terms:
+            condition, like_params = _like_condition(
+                ("search_index.name", "search_index.description", "search_index.notes"), short_terms)
+            where.append(condition)
+            params.extend(like_params)
+        if len(entity_types) == 1:
+            where.append("d.entity_type = ?")
+            params.append(entity_types[0])
+
+        # 命中过多时计算全部 bm25 的开销与命中数成正比，改为按 rowid 倒序（最新的在前）
+        matched = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM search_index WHERE search_index MATCH ? LIMIT ?)",
+            (match, self.SEARCH_RANK_LIMIT + 1)
+        ).fetchone()[0]
+        order = "search_index.rank" if matched <= self.SEARCH_RANK_LIMIT else "search_index.rowid DESC"
+        rows = conn.execute(f"""
+            SELECT d.entity_type, d.entity_id, p.id, p.name, p.status, search_index.name,
+                   snippet(search_index, -1, '【', '】', '…', 16)
+            FROM search_index
+            JOIN search_docs d ON d.docid = search_index.rowid
+            LEFT JOIN tasks t ON d.entity_type = 'task' AND t.id = d.entity_id
+            JOIN projects p ON p.id = COALESCE(t.project_id, d.entity_id)
+            WHERE {' AND '.join(where)}
+            ORDER BY {order} LIMIT ?
+        """, params + [limit]).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def _search_like(self, conn, terms, limit, entity_types, names_only=False) -> List[SearchHit]:
+        """不使用全文索引的搜索（逐行 LIKE 匹配），项目在前
+
+        names_only 时只扫描名称索引（比扫描整张表小得多），用于短关键词。
+        """
+        hits = []
+        if 'project' in entity_types:
+            columns = ("name",) if names_only else ("name", "description")
+            condition, params = _like_condition(columns, terms)
+            hits.extend(SearchHit(*row) for row in conn.execute(f"""
+                SELECT 'project', p.id, p.id, p.name, p.status, p.name, ''
+                FROM projects p
+                WHERE p.rowid IN (SELECT rowid FROM projects WHERE {condition} LIMIT ?)
+            """, params + [limit]))
+        if 'task' in entity_types and len(hits) < limit:
+            columns = ("name",) if names_only else ("name", "description", "notes")
+            condition, params = _like_condition(columns, terms)
+            hits.extend(SearchHit(*row) for row in conn.execute(f"""
+                SELECT 'task', t.id, p.id, p.name, p.status, t.name, ''
+                FROM tasks t JOIN projects p ON p.id = t.project_id
+                WHERE t.rowid IN (SELECT rowid FROM tasks WHERE {condition} LIMIT ?)
+            """, params + [limit - len(hits)]))
+        return hits
+
     # 辅助方法
-    def _row_to_project(self, row) -> Project:
-        # sqlite3.Row 不支持 get 方法，需要检查列是否存在
-        try:
-            raw_local_path = row['local_path']
-        except (KeyError, IndexError):
-            raw_local_path = ""
-        
-        path_map = self._load_path_map(raw_local_path)
-        local_path = path_map.get(self.machine_name, "")
-        
-        try:
-            is_pinned = bool(row['is_pinned']) if row['is_pinned'] is not None else False
-        except (KeyError, IndexError):
-            is_pinned = False
-        
+    def _query(self, conn: sqlite3.Connection, row_factory, sql: str, params=()) -> sqlite3.Cursor:
+        """执行查询，结果行直接由 row_factory(cursor, row) 转换为模型对象"""
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory
+        return cursor.execute(sql, params)
+
+    @staticmethod
+    def _make_page(items: list, limit: int, cursor_key) -> Page:
+        """分页查询多取一行：取到 limit + 1 行说明还有下一页，游标为本页最后一行的排序键"""
+        if len(items) > limit:
+            del items[limit:]
+            return Page(items, cursor_key(items[-1]))
+        return Page(items, None)
+
+    @staticmethod
+    def _row_to_project(cursor, row) -> Project:
+        # 列顺序见 PROJECT_COLUMNS
+        project_id, name, description, status, local_path, created_at, updated_at, is_pinned = row
         return Project(
-            id=row['id'],
-            name=row['name'],
-            description=row['description'] or "",
-            status=row['status'],  # 直接使用字符串
-            local_path=local_path,
-            created_at=row['created_at'],
-            updated_at=row['updated_at'],
-            is_pinned=is_pinned
+            project_id, name, description or "",
+            status,  # 直接使用字符串
+            local_path or "", created_at, updated_at, bool(is_pinned),
+        )
+
+    @staticmethod
+    def _row_to_project_preview(cursor, row) -> Project:
+        # 列顺序见 PROJECT_LIST_COLUMNS
+        project_id, name, description, status, _local_path, created_at, updated_at, is_pinned = row
+        return Project(
+            project_id, name, _preview_text(description), status, "",
+            created_at, updated_at, bool(is_pinned), True,
         )
-        project.local_path_map = dict(path_map)
-        return project
     
     def complete_project(self, project_id: str):
-        """完成项目：将所有任务标记为完成，项目状态设为已完成"""
-        now = datetime.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            # 更新项目状态
-            conn.execute(
-                "UPDATE projects SET status = 'completed', updated_at = ? WHERE id = ?",
-                (now, project_id)
-            )
-            # 更新所有任务状态为完成
-            conn.execute(
-                "UPDATE tasks SET status = 'completed', updated_at = ? WHERE project_id = ?",
-                (now, project_id)
-            )
+        """完成项目：将所有任务标记为完成，项目状态设为已完成；开启归档时连同任务移入归档库"""
+        self._move_to_history(project_id, 'completed', complete_tasks=True)
     
     def archive_project(self, project_id: str):
-        """归档项目"""
+        """归档项目；开启归档时连同任务移入归档库"""
+        self._move_to_history(project_id, 'archived')
+
+    def _move_to_history(self, project_id: str, status: str, complete_tasks: bool = False):
+        """把项目状态设为 status（completed 或 archived），在同一事务中移入归档库；
+        已在归档库中的项目就地修改"""
         now = datetime.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "UPDATE projects SET status = 'archived', updated_at = ? WHERE id = ?",
-                (now, project_id)
-            )
+        current_archive = self._find_archive(project_id)
+        archive_path = self._archive_path_for(now) if current_archive is None else None
+        with self._attached_archive(archive_path) as conn:
+            if current_archive is not None:
+                conn = self._archive_connect(current_archive)
+            with conn:
+                # 更新项目状态
+                conn.execute(
+                    "UPDATE projects SET status = ?, updated_at = ? WHERE id = ?",
+                    (status, now, project_id)
+                )
+                if complete_tasks:
+                    # 更新所有任务状态为完成
+                    conn.execute(
+                        "UPDATE tasks SET status = 'completed', updated_at = ? WHERE project_id = ?",
+                        (now, project_id)
+                    )
+                if archive_path is not None:
+                    self._transfer_project(conn, project_id, 'main', 'archive')
+        self._cache.invalidate_project_tree(project_id)
+        self._mark_changed()
     
     def restore_project(self, project_id: str):
-        """恢复项目：从历史恢复到进行中状态"""
+        """恢复项目：从历史恢复到进行中状态；项目在归档库中时先移回主库"""
         now = datetime.now().isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "UPDATE projects SET status = 'in_progress', updated_at = ? WHERE id = ?",
-                (now, project_id)
-            )
-    
-    def _row_to_task(self, row) -> Task:
-        # 处理可能的旧状态值
-        status_value = row['status']
-        try:
-            status = Status(status_value)
-        except ValueError:
-            # 如果状态值不在枚举中，默认为 planned
-            status = Status.PLANNED
-        
-        # sqlite3.Row 不支持 get 方法，需要检查列是否存在
-        try:
-            raw_local_path = row['local_path']
-        except (KeyError, IndexError):
-            raw_local_path = ""
-        
-        path_map = self._load_path_map(raw_local_path)
-        local_path = path_map.get(self.machine_name, "")
-        
-        # 读取标签字段（兼容老数据库，默认值为 False）
-        try:
-            is_important = bool(row['is_important']) if row['is_important'] is not None else False
-        except (KeyError, IndexError):
-            is_important = False
-        
+        archive_path = self._find_archive(project_id)
+        with self._attached_archive(archive_path) as conn:
+            with conn:
+                if archive_path is not None:
+                    self._transfer_project(conn, project_id, 'archive', 'main')
+                conn.execute(
+                    "UPDATE projects SET status = 'in_progress', updated_at = ? WHERE id = ?",
+                    (now, project_id)
+                )
+        self._cache.invalidate_project_tree(project_id)
+        self._mark_changed()
+
+    # 归档库：已完成和已归档的项目（连同任务、本地路径）保存在主库之外的归档库中，
+    # 主库只保留进行中的工作，同步客户端每次修改后重新上传的文件保持很小。
+    # 归档库与主库结构相同，读取时用各自的只读连接执行相同的查询；移入/移回时在主库的写连接上
+    # ATTACH 归档库，在一个事务中完成复制和删除
+    def get_archive_files(self) -> List[str]:
+        """已存在的归档库文件：单一归档库在前，按年的归档库按年份倒序"""
+        files = self._archive_files
+        if files is None:
+            stem, ext = os.path.splitext(self.db_path)
+            single = self._archive_path()
+            yearly = glob.glob(f"{glob.escape(stem + self.ARCHIVE_SUFFIX)}_[0-9][0-9][0-9][0-9]{glob.escape(ext)}")
+            files = ([single] if os.path.exists(single) else []) + sorted(yearly, reverse=True)
+            self._archive_files = files
+        return list(files)
+
+    def _archive_path(self, year: str = None) -> str:
+        stem, ext = os.path.splitext(self.db_path)
+        return f"{stem}{self.ARCHIVE_SUFFIX}{'_' + year if year else ''}{ext}"
+
+    def _archive_path_for(self, timestamp: str) -> Optional[str]:
+        """在 timestamp（ISO 格式）完成/归档的项目应移入的归档库，归档关闭时为 None"""
+        if self.archive_mode == 'off':
+            return None
+        return self._archive_path(timestamp[:4] if self.archive_mode == 'yearly' else None)
+
+    def _archive_state(self) -> tuple:
+        """各归档库文件的 (路径, mtime, 大小)；文件被整体替换时使该归档库的连接重新打开"""
+        self._archive_files = None
+        state = []
+        for path in self.get_archive_files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            file_id = (st.st_dev, st.st_ino)
+            if self._archive_file_ids.get(path, file_id) != file_id and path in self._archives:
+                self._archives[path].invalidate()
+            self._archive_file_ids[path] = file_id
+            state.append((path, st.st_mtime_ns, st.st_size))
+        return tuple(state)
+
+    def _archive_connect(self, path: str, read_only: bool = False) -> sqlite3.Connection:
+        """当前线程到归档库的连接；第一次使用时创建文件（不存在时）并升级到当前结构（只读模式下不升级）"""
+        manager = self._archives.get(path)
+        if manager is None:
+            with self._archives_lock:
+                manager = self._archives.get(path)
+                if manager is None:
+                    manager = ConnectionManager(path, metrics=self.metrics, read_only=self.read_only)
+                    if not self.read_only:
+                        migrations.migrate(manager.get())
+                    self._archives[path] = manager
+                    self._archive_files = None
+        return manager.get(read_only)
+
+    def _all_read_connections(self):
+        """主库和各归档库的只读连接（归档库在第一次需要时才打开）"""
+        for _, conn in self._read_connections_by_path():
+            yield conn
+
+    def _read_connections_by_path(self):
+        """(文件路径, 只读连接)：主库在前，之后是各归档库"""
+        yield self.db_path, self._connect(read_only=True)
+        for path in self.get_archive_files():
+            yield path, self._archive_connect(path, read_only=True)
+
+    def _archive_read_connections(self):
+        for path in self.get_archive_files():
+            yield self._archive_connect(path, read_only=True)
+
+    def _find_archive(self, project_id: str) -> Optional[str]:
+        """项目所在的归档库路径；项目在主库中（或不存在）时为 None"""
+        archive_files = self.get_archive_files()
+        if not archive_files:
+            return None
+        sql = "SELECT 1 FROM projects WHERE id = ?"
+        if self._connect(read_only=True).execute(sql, (project_id,)).fetchone() is not None:
+            return None
+        for path in archive_files:
+            if self._archive_connect(path, read_only=True).execute(sql, (project_id,)).fetchone() is not None:
+                return path
+        return None
+
+    def _find_task(self, task_id: str) -> tuple:
+        """(任务所属项目, 所在归档库路径)；任务在主库中时路径为 None，任务不存在时为 (None, None)"""
+        sql = "SELECT project_id FROM tasks WHERE id = ?"
+        row = self._connect(read_only=True).execute(sql, (task_id,)).fetchone()
+        if row is not None:
+            return row[0], None
+        for path in self.get_archive_files():
+            row = self._archive_connect(path, read_only=True).execute(sql, (task_id,)).fetchone()
+            if row is not None:
+                return row[0], path
+        return None, None
+
+    def _connect_for_project(self, project_id: str) -> sqlite3.Connection:
+        """项目所在库的只读连接"""
+        archive_path = self._find_archive(project_id)
+        if archive_path is None:
+            return self._connect(read_only=True)
+        return self._archive_connect(archive_path, read_only=True)
+
+    def _write_connect_for_project(self, project_id: str) -> sqlite3.Connection:
+        """项目所在库的写连接：历史项目在归档库中时直接修改归档库，不移回主库"""
+        return self._write_connect_for_archive(self._find_archive(project_id))
+
+    def _write_connect_for_archive(self, archive_path: Optional[str]) -> sqlite3.Connection:
+        return self._connect() if archive_path is None else self._archive_connect(archive_path)
+
+    @contextmanager
+    def _attached_archive(self, archive_path: Optional[str]):
+        """主库的写连接；archive_path 不为 None 时在其上 ATTACH 该归档库（别名 archive），退出时 DETACH
+
+        主库使用回滚日志，同时修改主库和归档库的事务在两个文件上原子提交。
+        """
+        conn = self._connect()
+        if archive_path is None:
+            yield conn
+            return
+        # 不存在时创建归档库并建立结构
+        self._archive_connect(archive_path)
+        conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
         try:
-            is_urgent = bool(row['is_urgent']) if row['is_urgent'] is not None else False
-        except (KeyError, IndexError):
-            is_urgent = False
-        
+            yield conn
+        finally:
+            conn.execute("DETACH DATABASE archive")
+
+    def _transfer_project(self, conn: sqlite3.Connection, project_id: str, source: str, target: str):
+        """在 conn 的当前事务中把项目及其任务、本地路径从 source 库复制到 target 库（main 或 archive），
+        再从 source 删除。全文索引、任务计数和路径由两边的触发器维护；target 中已有该项目
+        （例如上次移动中断）时先删除"""
+        conn.execute(f"DELETE FROM {target}.projects WHERE id = ?", (project_id,))
+        columns = {table: self._common_columns(conn, table, source, target)
+                   for table in ("projects", "tasks", "entity_paths")}
+        conn.execute(f"""
+            INSERT INTO {target}.projects ({columns['projects']})
+            SELECT {columns['projects']} FROM {source}.projects WHERE id = ?
+        """, (project_id,))
+        conn.execute(f"""
+            INSERT INTO {target}.tasks ({columns['tasks']})
+            SELECT {columns['tasks']} FROM {source}.tasks WHERE project_id = ?
+        """, (project_id,))
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {target}.entity_paths ({columns['entity_paths']})
+            SELECT {columns['entity_paths']} FROM {source}.entity_paths
+            WHERE entity_type = 'project' AND entity_id = ?
+            UNION ALL
+            SELECT {columns['entity_paths']} FROM {source}.entity_paths
+            WHERE entity_type = 'task' AND entity_id IN (SELECT id FROM {source}.tasks WHERE project_id = ?)
+        """, (project_id, project_id))
+        # 任务随外键级联删除
+        conn.execute(f"DELETE FROM {source}.projects WHERE id = ?", (project_id,))
+
+    @staticmethod
+    def _common_columns(conn: sqlite3.Connection, table: str, source: str, target: str) -> str:
+        """两个库中同一张表都有的列（老数据库升级后的列顺序可能不同，按列名复制）"""
+        source_columns = {row[1] for row in conn.execute(f"PRAGMA {source}.table_info({table})")}
+        return ", ".join(row[1] for row in conn.execute(f"PRAGMA {target}.table_info({table})")
+                         if row[1] in source_columns)
+
+    def archive_history(self, progress=None) -> int:
+        """把主库中的历史项目（已完成和已归档的）移入归档库，返回移动的项目数；归档关闭时不做任何操作
+
+        开启归档前已有的历史项目由后台备份线程每天调用一次迁移。每个事务移动 ARCHIVE_BATCH 个项目，
+        写锁每次只占用很短的时间；progress(已移动数) 在每个事务提交后调用。
+        移出后主库中的空闲页留给之后的写入复用，不执行 VACUUM：VACUUM 在整个重写期间独占数据库，
+        并且改写每一页，同步客户端会重新上传整个文件。
+        """
+        if self.archive_mode == 'off' or self.read_only:
+            return 0
+        moved = 0
+        while True:
+            rows = self._connect(read_only=True).execute(
+                "SELECT id, updated_at FROM projects WHERE status IN ('completed', 'archived') LIMIT ?",
+                (self.ARCHIVE_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            batches = {}
+            for project_id, updated_at in rows:
+                batches.setdefault(self._archive_path_for(updated_at), []).append(project_id)
+            for archive_path, project_ids in batches.items():
+                with self._attached_archive(archive_path) as conn:
+                    with conn:
+                        for project_id in project_ids:
+                            self._transfer_project(conn, project_id, 'main', 'archive')
+                for project_id in project_ids:
+                    self._cache.invalidate_project_tree(project_id)
+            moved += len(rows)
+            if progress:
+                progress(moved)
+        if moved:
+            self._mark_changed()
+        return moved
+    
+    @staticmethod
+    def _row_to_task(cursor, row) -> Task:
+        # 列顺序见 TASK_COLUMNS；标签字段为 NULL（老数据）时视为 False
+        (task_id, project_id, name, description, notes, start_date, end_date, status,
+         local_path, is_important, is_urgent, created_at, updated_at) = row
         return Task(
-            id=row['id'],
-            project_id=row['project_id'],
-            name=row['name'],
-            description=row['description'] or "",
-            notes=row['notes'] or "",
-            start_date=row['start_date'],
-            end_date=row['end_date'],
-            status=status,
-            local_path=local_path,
-            is_important=is_important,
-            is_urgent=is_urgent,
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
+            task_id, project_id, name, description or "", notes or "", start_date, end_date,
+            _task_status(status), local_path or "", bool(is_important), bool(is_urgent),
+            created_at, updated_at,
+        )
+
+    @staticmethod
+    def _row_to_task_preview(cursor, row) -> Task:
+        # 列顺序见 TASK_LIST_COLUMNS
+        (task_id, project_id, name, description, notes, start_date, end_date, status,
+         local_path, is_important, is_urgent, created_at, updated_at) = row
+        return Task(
+            task_id, project_id, name, _preview_text(description), _preview_text(notes),
+            start_date, end_date, _task_status(status), local_path or "",
+            bool(is_important), bool(is_urgent), created_at, updated_at, True,
+        )
+
+    @staticmethod
+    def _row_to_task_summary(cursor, row) -> TaskSummary:
+        # 列顺序见 TASK_SUMMARY_COLUMNS
+        (task_id, project_id, name, description, start_date, end_date, status,
+         is_important, is_urgent) = row
+        return TaskSummary(
+            task_id, project_id, name, _preview_text(description), start_date, end_date,
+            _task_status(status), bool(is_important), bool(is_urgent),
         )
-        task.local_path_map = dict(path_map)
-        return task
     
     def _handle_backup_and_restore(self):
         """处理数据库备份和恢复"""
@@ -559,12 +1433,74 @@ class Database:
         if not default_db_exists:
             # 如果默认数据库不存在，尝试从最新备份恢复
             self._restore_from_latest_backup()
-        
+        # 有备份但文件不存在的归档库同样从最新备份恢复
+        self._restore_missing_archives()
+
+    def start_backup(self, progress=None) -> threading.Thread:
+        """在后台线程中执行今日备份并清理旧备份
+
+        progress(status, remaining, total) 会在备份工作线程中被调用。只读模式下不备份，返回 None。
+        """
+        if self.read_only:
+            return None
+        self._backup_thread = threading.Thread(
+            target=self._run_backup, args=(progress,), name="db-backup", daemon=True
+        )
+        self._backup_thread.start()
+        return self._backup_thread
+
+    def wait_for_backup(self, timeout: float = None) -> bool:
+        """等待后台备份结束，返回是否已结束"""
+        if self._backup_thread is None:
+            return True
+        self._backup_thread.join(timeout)
+        return not self._backup_thread.is_alive()
+
+    def _run_backup(self, progress=None):
         # 执行备份操作
-        self._backup_database()
+        with timed_phase(self.startup_phases, "backup"):
+            self.backup_created = self._backup_database(progress)
         
         # 清理旧备份，只保留最新的7个
-        self._cleanup_old_backups()
+        with timed_phase(self.startup_phases, "backup_cleanup"):
+            self._cleanup_old_backups()
+
+        try:
+            # 上次运行在之前的日期时把任务计数滚动到今天（读取路径不写入，滚动完成前的统计在临时表中重新计数）
+            try:
+                with timed_phase(self.startup_phases, "counter_roll"):
+                    today = date.today().isoformat()
+                    row = self._connect(read_only=True).execute(
+                        "SELECT as_of FROM main.task_counters_state WHERE id = 1").fetchone()
+                    if row is None or row[0] != today:
+                        self._roll_task_counters(today)
+            except sqlite3.Error:
+                logger.exception("滚动任务计数失败")
+            # 每天第一次启动时把主库中的历史项目移入归档库，检查任务计数表（有偏差时记录日志并重建），
+            # 再备份各归档库
+            if not self.backup_created:
+                return
+            try:
+                with timed_phase(self.startup_phases, "archive"):
+                    moved = self.archive_history()
+                if moved:
+                    logger.info("已将历史项目移入归档库 %s", format_fields(
+                        projects=moved, mode=self.archive_mode))
+            except sqlite3.Error:
+                logger.exception("移动历史项目到归档库失败")
+            try:
+                with timed_phase(self.startup_phases, "counter_check"):
+                    report = self.check_task_counters(repair=True)
+                if report['drift']:
+                    logger.warning("任务计数与任务表不一致，已重建 %s", format_fields(
+                        as_of=report['as_of'], drifted_keys=len(report['drift']),
+                        first=report['drift'][0]))
+            except sqlite3.Error:
+                logger.exception("检查任务计数失败")
+            with timed_phase(self.startup_phases, "archive_backup"):
+                self._backup_archives()
+        finally:
+            self.close_thread_connections()
     
     def _get_backup_filename(self, date_str: str = None) -> str:
         """获取备份文件名（完整路径）"""
@@ -575,28 +1511,110 @@ class Database:
         db_dir = self.get_db_directory()
         return os.path.join(db_dir, backup_name)
     
-    def _backup_database(self):
-        """备份数据库"""
+    def get_backup_store(self) -> BackupStore:
+        """增量备份存储，位于数据库目录下的 PT_backups"""
+        return BackupStore(os.path.join(self.get_db_directory(), self.BACKUP_STORE_DIR))
+
+    def _backup_database(self, progress=None) -> bool:
+        """备份数据库，成功时返回 True
+
+        使用 SQLite 在线备份 API 分步复制，得到的始终是一致的快照（不会因其他进程或
+        同步客户端同时写入而得到损坏的文件）。快照先写入临时文件并用 quick_check 校验，
+        通过后按块去重压缩存入备份存储，每天只新增发生变化的数据块。
+        """
         if not os.path.exists(self.db_path):
-            return
+            return False
         
-        # 获取今日备份文件名
-        today_backup = self._get_backup_filename()
+        store = self.get_backup_store()
+        snapshot_name = f"PT_{datetime.now().strftime('%Y%m%d')}"
         
-        # 如果今日备份已存在，跳过
-        if os.path.exists(today_backup):
-            return
+        # 如果今日备份已存在（包括旧版的整库备份文件），跳过
+        if store.has_snapshot(snapshot_name) or os.path.exists(self._get_backup_filename()):
+            return False
         
+        return self._snapshot_file(self.db_path, store, snapshot_name, progress)
+
+    def _snapshot_file(self, path: str, store: BackupStore, snapshot_name: str, progress=None) -> bool:
+        """用在线备份 API 复制 path 的一致快照，校验后存入 store，成功时返回 True"""
+        temp_backup = f"{path}.{os.getpid()}.backup.tmp"
         try:
-            # 复制数据库文件作为备份
-            shutil.copy2(self.db_path, today_backup)
+            source = sqlite3.connect(path, timeout=self._connections.busy_timeout_ms / 1000)
+            try:
+                target = sqlite3.connect(temp_backup)
+                try:
+                    source.backup(target, pages=self.BACKUP_PAGES_PER_STEP, progress=progress)
+                    result = target.execute("PRAGMA quick_check").fetchone()
+                finally:
+                    target.close()
+            finally:
+                source.close()
+            if not result or result[0] != "ok":
+                raise sqlite3.DatabaseError(f"备份校验失败: {result[0] if result else None}")
+            store.add_snapshot(temp_backup, snapshot_name)
+            return True
         except Exception as e:
             # 备份失败时静默处理，不影响主程序运行
-            pass
+            return False
+        finally:
+            try:
+                os.remove(temp_backup)
+            except OSError:
+                pass
     
+    def _get_archive_backup_store(self, archive_path: str) -> BackupStore:
+        """归档库的增量备份存储，位于 PT_backups/archives/<归档库文件名>"""
+        return BackupStore(os.path.join(self.get_db_directory(), self.BACKUP_STORE_DIR,
+                                        self.ARCHIVE_BACKUP_DIR, os.path.basename(archive_path)))
+
+    def _backup_archives(self):
+        """备份各归档库（每天一个快照，只新增变化的数据块）并清理旧快照"""
+        snapshot_name = f"PT_{datetime.now().strftime('%Y%m%d')}"
+        for archive_path in self.get_archive_files():
+            store = self._get_archive_backup_store(archive_path)
+            if not store.has_snapshot(snapshot_name):
+                if not self._snapshot_file(archive_path, store, snapshot_name):
+                    logger.warning("归档库备份失败 %s", format_fields(path=archive_path))
+                    continue
+            try:
+                store.apply_retention(keep_count=self.BACKUP_KEEP_COUNT)
+            except Exception:
+                pass
+
+    def _restore_missing_archives(self):
+        """从备份恢复不存在的归档库（例如与主库一起被删除或未同步到本机）"""
+        backup_dir = os.path.join(self.get_db_directory(), self.BACKUP_STORE_DIR, self.ARCHIVE_BACKUP_DIR)
+        prefix = os.path.splitext(os.path.basename(self._archive_path()))[0]
+        try:
+            names = [name for name in os.listdir(backup_dir) if name.startswith(prefix)]
+        except OSError:
+            return
+        for name in names:
+            archive_path = os.path.join(self.get_db_directory(), name)
+            if os.path.exists(archive_path):
+                continue
+            store = self._get_archive_backup_store(archive_path)
+            for snapshot in store.list_snapshots():
+                try:
+                    store.restore(snapshot["name"], archive_path)
+                    self._archive_files = None
+                    break
+                except Exception:
+                    # 快照损坏时尝试更早的快照
+                    continue
+
     def _restore_from_latest_backup(self):
         """从最新备份恢复数据库"""
-        # 在数据库目录中查找所有备份文件
+        # 优先从增量备份存储恢复
+        store = self.get_backup_store()
+        for snapshot in store.list_snapshots():
+            try:
+                store.restore(snapshot["name"], self.db_path)
+                return
+            except Exception as e:
+                # 快照损坏（例如数据块尚未同步完成）时尝试更早的快照
+                continue
+        
+        # 兼容旧版：在数据库目录中查找整库备份文件
         db_dir = self.get_db_directory()
         backup_pattern = os.path.join(db_dir, "PT_*.db")
         backup_files = glob.glob(backup_pattern)
@@ -609,31 +1627,63 @@ class Database:
         backup_files.sort(key=os.path.getmtime, reverse=True)
         latest_backup = backup_files[0]
         
+        temp_path = f"{self.db_path}.{os.getpid()}.tmp"
         try:
-            # 复制最新备份为默认数据库
-            shutil.copy2(latest_backup, self.db_path)
+            # 先复制到临时文件再原子重命名，避免留下不完整的数据库文件
+            shutil.copy2(latest_backup, temp_path)
+            os.replace(temp_path, self.db_path)
         except Exception as e:
             # 恢复失败时静默处理
-            pass
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
     
     def _cleanup_old_backups(self):
         """清理旧备份，只保留最新的7个"""
-        # 在数据库目录中查找所有备份文件
+        store = self.get_backup_store()
+        try:
+            store.apply_retention(keep_count=self.BACKUP_KEEP_COUNT)
+        except Exception as e:
+            # 清理失败时静默处理
+            pass
+        
+        # 旧版的整库备份文件与增量快照合计保留7个
+        keep_count = max(self.BACKUP_KEEP_COUNT - len(store.list_snapshots()), 0)
         db_dir = self.get_db_directory()
         backup_pattern = os.path.join(db_dir, "PT_*.db")
         backup_files = glob.glob(backup_pattern)
         
-        if len(backup_files) <= 7:
-            # 备份数量不超过7个，不需要清理
+        if len(backup_files) <= keep_count:
+            # 备份数量未超出，不需要清理
             return
         
         # 按修改时间排序
         backup_files.sort(key=os.path.getmtime, reverse=True)
         
-        # 删除最旧的备份（保留最新的7个）
-        for old_backup in backup_files[7:]:
+        # 删除最旧的备份
+        for old_backup in backup_files[keep_count:]:
             try:
                 os.remove(old_backup)
             except Exception as e:
                 # 删除失败时静默处理
-                pass
\ No newline at end of file
+                pass
+
+
+# 不计入方法耗时指标的公开方法：等待后台线程、关闭连接和读取指标本身
+_UNTIMED_METHODS = {
+    'close', 'close_thread_connections', 'start_backup', 'wait_for_backup', 'get_backup_store',
+    'get_db_directory', 'get_archive_files', 'cache_stats', 'set_sql_trace', 'dump_metrics', 'export_metrics',
+}
+
+
+def _timed_method(name, func):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return self.metrics.call(name, func, self, *args, **kwargs)
+    return wrapper
+
+
+for _name, _member in list(vars(Database).items()):
+    if inspect.isfunction(_member) and not _name.startswith('_') and _name not in _UNTIMED_METHODS:
+        setattr(Database, _name, _timed_method(_name, _member))
@@ -0,0 +1,357 @@
+"""
+数据库性能指标：各公开方法的耗时直方图和调用次数、各 SQL 语句的耗时统计和最近执行的语句；
+超过阈值的慢语句和慢方法写入滚动日志，指标可以导出为 JSON 或 Prometheus 文本格式
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from threading import get_ident
+from typing import Optional
+from utils.app_logging import has_file_handler, rotating_file_handler
+
+# 直方图各桶的上界（毫秒），最后还有一个 +Inf 桶
+BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0)
+SLOW_LOG_NAME = "slow_queries.log"
+TRACE_LOG_NAME = "sql_trace.log"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+PROMETHEUS_PREFIX = "project_tracing_db"
+
+
+def normalize_sql(sql: str) -> str:
+    """去掉字面量和多余空白，同一条语句每次执行得到相同的文本"""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(\.\d+)?\b", "?", sql)
+    return " ".join(sql.split())
+
+
+class LatencyHistogram:
+    """固定桶的耗时直方图（毫秒）"""
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: "LatencyHistogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def quantile(self, q: float) -> float:
+        """分位数的估计值：所在桶的上界（不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5), 3),
+            "p90_ms": round(self.quantile(0.9), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class _ThreadStats:
+    """单个线程的统计和当前方法；只由该线程写入，记录时不需要加锁"""
+    __slots__ = ("name", "method", "start", "statements", "methods", "sql", "slow_statements", "slow_methods")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.method = None
+        self.start = None
+        self.statements = None
+        self.methods = {}
+        self.sql = {}
+        self.slow_statements = 0
+        self.slow_methods = 0
+
+
+class DatabaseMetrics:
+    """Database 的性能指标，线程安全
+
+    语句耗时为 execute/executemany 的耗时：写语句是完整的执行时间，查询是得到第一行的时间，
+    取行和转换对象的时间计入所在方法的耗时。慢方法的日志中列出该方法执行的语句及其耗时。
+
+    开启 SQL 跟踪（tracing）后，连接通过 set_trace_callback 把 SQLite 实际执行的每条语句
+    （包括触发器和隐式的 BEGIN/COMMIT）连同距方法开始的时间写入跟踪日志；
+    每条语句都要经过 Python 回调，只在排查问题时开启。
+
+    每个线程的统计分开保存（threading.local 的属性访问和加锁都比一次语句记录本身更慢），
+    导出时合并。
+    """
+
+    RECENT_STATEMENTS = 200
+    # 每个线程的语句文本来自代码中的 SQL，种类有限；超出时合并计入 "(other)"
+    MAX_STATEMENT_KEYS = 500
+    # 慢方法日志中最多列出的语句数
+    MAX_METHOD_STATEMENTS = 50
+
+    def __init__(self, slow_query_ms: Optional[float] = None, log_dir: Optional[str] = None,
+                 tracing: bool = False):
+        self.slow_query_ms = slow_query_ms
+        self.log_dir = log_dir
+        self.tracing = tracing
+        self._loggers = {}
+        self._logger_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._threads = {}
+        # deque.append 是原子操作，各线程共用
+        self._recent = deque(maxlen=self.RECENT_STATEMENTS)
+
+    def _thread_stats(self) -> _ThreadStats:
+        ident = get_ident()
+        stats = self._threads.get(ident)
+        if stats is None:
+            stats = self._threads[ident] = _ThreadStats(threading.current_thread().name)
+        return stats
+
+    # 记录
+
+    def call(self, name: str, func, /, *args, **kwargs):
+        """执行 func 并记录为方法 name 的一次调用；嵌套调用时语句归入最内层的方法"""
+        stats = self._thread_stats()
+        outer = (stats.method, stats.start, stats.statements)
+        start = time.perf_counter()
+        stats.method, stats.start, stats.statements = name, start, []
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            statements = stats.statements
+            stats.method, stats.start, stats.statements = outer
+            histogram = stats.methods.get(name)
+            if histogram is None:
+                histogram = stats.methods[name] = LatencyHistogram()
+            histogram.observe(elapsed_ms)
+            if self.tracing:
+                self._log(TRACE_LOG_NAME, f"{stats.name} | {name} | 结束 {elapsed_ms:.3f} ms")
+            if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+                stats.slow_methods += 1
+                lines = [f"方法 {elapsed_ms:.1f} ms | {name} | {stats.name} | {len(statements)} 条语句"]
+                lines.extend(f"    {ms:8.3f} ms  {normalize_sql(sql)}" for sql, ms in statements)
+                self._log(SLOW_LOG_NAME, "\n".join(lines))
+
+    def on_trace(self, sql: str):
+        """set_trace_callback 的回调：把语句和距方法开始的时间写入跟踪日志"""
+        stats = self._thread_stats()
+        offset = f"+{(time.perf_counter() - stats.start) * 1000:.3f} ms" if stats.start is not None else "-"
+        self._log(TRACE_LOG_NAME, f"{stats.name} | {stats.method or '-'} | {offset} | {normalize_sql(sql)}")
+
+    def record_statement(self, sql: str, elapsed_ms: float, rows: int = 1):
+        stats = self._thread_stats()
+        if stats.statements is not None and len(stats.statements) < self.MAX_METHOD_STATEMENTS:
+            stats.statements.append((sql, elapsed_ms))
+        entry = stats.sql.get(sql)
+        if entry is None:
+            if len(stats.sql) >= self.MAX_STATEMENT_KEYS:
+                sql = "(other)"
+            entry = stats.sql.setdefault(sql, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed_ms
+        if elapsed_ms > entry[2]:
+            entry[2] = elapsed_ms
+        self._recent.append((time.time(), elapsed_ms, stats.method, sql, rows))
+        if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+            stats.slow_statements += 1
+            self._log(SLOW_LOG_NAME, f"SQL {elapsed_ms:.1f} ms | {stats.method or '-'} | {stats.name}"
+                                     f"{f' | {rows} 组参数' if rows != 1 else ''} | {normalize_sql(sql)}")
+
+    def _log(self, file_name: str, message: str):
+        if not self.log_dir:
+            return
+        try:
+            logger = self._loggers.get(file_name)
+            if logger is None:
+                with self._logger_lock:
+                    logger = _rotating_logger(f"project_tracing.{file_name}", os.path.join(self.log_dir, file_name))
+                    self._loggers[file_name] = logger
+            logger.info(message)
+        except Exception:
+            # 日志写入失败不影响数据库操作
+            pass
+
+    def _merged(self) -> tuple:
+        """合并各线程的统计：(方法直方图, 语句统计, 慢语句数, 慢方法数)"""
+        methods, statements = {}, {}
+        slow_statements = slow_methods = 0
+        for stats in list(self._threads.values()):
+            for name, histogram in list(stats.methods.items()):
+                methods.setdefault(name, LatencyHistogram()).merge(histogram)
+            for sql, (count, total, max_ms) in list(stats.sql.items()):
+                entry = statements.setdefault(sql, [0, 0.0, 0.0])
+                entry[0] += count
+                entry[1] += total
+                entry[2] = max(entry[2], max_ms)
+            slow_statements += stats.slow_statements
+            slow_methods += stats.slow_methods
+        return methods, statements, slow_statements, slow_methods
+
+    # 导出
+
+    def snapshot(self) -> dict:
+        histograms, statements, slow_statements, slow_methods = self._merged()
+        methods = {name: histogram.as_dict() for name, histogram in sorted(histograms.items())}
+        statements = sorted(statements.items(), key=lambda item: item[1][1], reverse=True)
+        recent = list(self._recent)
+        return {
+            "started_at": self.started_at,
+            "exported_at": datetime.now().isoformat(timespec="seconds"),
+            "slow_query_ms": self.slow_query_ms,
+            "slow_statements": slow_statements,
+            "slow_methods": slow_methods,
+            "methods": methods,
+            # 按累计耗时从高到低
+            "statements": [
+                {"sql": normalize_sql(sql), "count": count, "total_ms": round(total, 3),
+                 "mean_ms": round(total / count, 3), "max_ms": round(max_ms, 3)}
+                for sql, (count, total, max_ms) in statements
+            ],
+            "recent_statements": [
+                {"at": datetime.fromtimestamp(at).isoformat(timespec="milliseconds"),
+                 "ms": round(ms, 3), "method": method, "sql": normalize_sql(sql), "rows": rows}
+                for at, ms, method, sql, rows in recent
+            ],
+        }
+
+    def to_json(self, extra: dict = None) -> str:
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, gauges: dict = None) -> str:
+        """Prometheus 文本格式；gauges 为额外输出的 {名称: 数值}"""
+        name = f"{PROMETHEUS_PREFIX}_method_duration_seconds"
+        lines = [f"# HELP {name} Database 公开方法的耗时",
+                 f"# TYPE {name} histogram"]
+        histograms, statements, slow_statements, slow_methods = self._merged()
+        methods = sorted((method, histogram.as_dict()) for method, histogram in histograms.items())
+        statement_count = sum(entry[0] for entry in statements.values())
+        statement_seconds = sum(entry[1] for entry in statements.values()) / 1000
+        for method, data in methods:
+            for bound, count in data["buckets"].items():
+                le = bound if bound == "+Inf" else repr(float(bound) / 1000)
+                lines.append(f'{name}_bucket{{method="{method}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{method="{method}"}} {data["total_ms"] / 1000}')
+            lines.append(f'{name}_count{{method="{method}"}} {data["count"]}')
+        counters = [
+            ("statements_total", "执行的 SQL 语句数", statement_count),
+            ("statement_seconds_total", "SQL 语句的累计耗时", statement_seconds),
+            ("slow_statements_total", "超过慢查询阈值的语句数", slow_statements),
+            ("slow_methods_total", "超过慢查询阈值的方法调用数", slow_methods),
+        ]
+        for suffix, help_text, value in counters:
+            lines += [f"# HELP {PROMETHEUS_PREFIX}_{suffix} {help_text}",
+                      f"# TYPE {PROMETHEUS_PREFIX}_{suffix} counter",
+                      f"{PROMETHEUS_PREFIX}_{suffix} {value}"]
+        for gauge, value in (gauges or {}).items():
+            lines += [f"# TYPE {PROMETHEUS_PREFIX}_{gauge} gauge", f"{PROMETHEUS_PREFIX}_{gauge} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _rotating_logger(name: str, path: str) -> logging.Logger:
+    """只写入 path 的滚动日志（不传给根日志）；同一文件只添加一个 handler"""
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    if not has_file_handler(logger, path):
+        logger.addHandler(rotating_file_handler(path, "%(asctime)s %(message)s", LOG_MAX_BYTES, LOG_BACKUP_COUNT))
+    return logger
+
+
+class TracedCursor(sqlite3.Cursor):
+    """TracedConnection.cursor() 返回的游标：cursor.execute 同样记录耗时"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics = self.connection.metrics
+            if metrics is not None:
+                metrics.record_statement(sql, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics = self.connection.metrics
+            if metrics is not None:
+                metrics.record_statement(sql, (time.perf_counter() - start) * 1000,
+                                         len(seq_of_parameters))
+
+
+class TracedConnection(sqlite3.Connection):
+    """把每条语句的耗时记录到 DatabaseMetrics 的连接（sqlite3.connect 的 factory）
+
+    Connection.execute 和 cursor().execute（Database._query 使用）都会被记录；
+    Connection.execute 内部创建的是普通游标，同一条语句不会记录两次。
+    """
+
+    metrics = None
+
+    def attach(self, metrics: DatabaseMetrics):
+        self.metrics = metrics
+        self.set_trace_callback(metrics.on_trace if metrics.tracing else None)
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_statement(sql, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_statement(sql, (time.perf_counter() - start) * 1000,
+                                              len(seq_of_parameters))
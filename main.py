@@ -1,96 +1,158 @@
+import time
+# 尽早记录进程开始的时间，导入 PySide6 等模块的耗时也计入启动耗时
+_PROCESS_START = time.perf_counter()
+
 import sys
 import os
+import argparse
+import logging
+import platform
 import traceback
 from PySide6.QtWidgets import QApplication, QMessageBox
+from PySide6.QtCore import QObject, QEvent, QTimer
 from ui.main_window import MainWindow
+from ui.migration_runner import run_migrations_with_progress
+from database import Database
 from PySide6.QtGui import QIcon
 from utils.resource_path import resource_path
 from utils.platform_utils import get_platform_icon_paths, is_macos, get_high_quality_icon_paths
+from utils.app_logging import setup_logging, StartupTimer, StreamToLogger, format_fields
+
+logger = logging.getLogger("project_tracing.startup")
+
+# 启动汇总等待后台备份结束后输出（备份的耗时也在汇总中），最多等待的时间
+BACKUP_WAIT_MS = 60000
+BACKUP_POLL_MS = 200
+
+
+class FirstPaintWatcher(QObject):
+    """应用内第一次绘制事件发生时调用 callback，之后不再过滤事件"""
+
+    def __init__(self, app: QApplication, callback):
+        super().__init__(app)
+        self._app = app
+        self._callback = callback
+        app.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self._callback is not None:
+            callback, self._callback = self._callback, None
+            self._app.removeEventFilter(self)
+            # 绘制完成后再记录
+            QTimer.singleShot(0, callback)
+        return False
+
+
+def set_app_icon(app: QApplication):
+    """设置应用图标（系统任务栏和程序图标），macOS 上使用 .icns 文件，Windows 上使用 .ico 文件"""
+    for icon_path in get_high_quality_icon_paths():
+        try:
+            full_path = resource_path(icon_path)
+            if os.path.exists(full_path):
+                app.setWindowIcon(QIcon(full_path))
+                logger.debug("已设置应用图标 %s", format_fields(path=icon_path))
+                return
+        except Exception as e:
+            logger.warning("设置图标失败 %s", format_fields(path=icon_path, error=e))
+    logger.warning("未找到应用图标文件")
+
+
+def parse_args(argv):
+    """命令行参数；未识别的参数（Qt 自身的参数、macOS 的 -psn_ 等）原样交给 QApplication"""
+    parser = argparse.ArgumentParser(prog="project_tracing")
+    parser.add_argument("--read-only", action="store_true",
+                        help="只读打开数据库：不备份、不升级结构、不写入，禁用所有编辑操作")
+    return parser.parse_known_args(argv)
+
+
+def log_startup_summary(timer: StartupTimer, total_ms: float, db: Database, migrated: bool):
+    """等待后台备份结束（或超时）后输出一行启动汇总"""
+    waited = {"ms": 0}
+
+    def emit():
+        finished = db.wait_for_backup(0)
+        if not finished and waited["ms"] < BACKUP_WAIT_MS:
+            waited["ms"] += BACKUP_POLL_MS
+            QTimer.singleShot(BACKUP_POLL_MS, emit)
+            return
+        timer.add_all("db.", db.startup_phases)
+        logger.info("startup %s", timer.summary(
+            total_ms,
+            migrated=migrated,
+            read_only=db.read_only,
+            backup="created" if db.backup_created else ("running" if not finished else "skipped"),
+            schema_version=db.schema_version(),
+        ))
+
+    emit()
 
-def setup_logging():
-    """设置日志输出到文件（用于调试）"""
-    try:
-        # 获取日志文件路径（在用户主目录下）
-        home_dir = os.path.expanduser("~")
-        log_dir = os.path.join(home_dir, ".project_tracing")
-        os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, "error.log")
-        
-        # 重定向标准错误输出到文件
-        sys.stderr = open(log_file, 'a', encoding='utf-8')
-        print(f"日志文件: {log_file}", file=sys.stderr)
-        return log_file
-    except Exception:
-        pass
-    return None
 
 def main():
-    log_file = None
-    try:
-        # 在 macOS 上设置日志输出
+    timer = StartupTimer(_PROCESS_START)
+    timer.add("imports", timer.since_start_ms())
+    args, qt_args = parse_args(sys.argv[1:])
+    with timer.span("logging"):
+        log_file = setup_logging(console=not is_macos())
         if is_macos():
-            log_file = setup_logging()
-        
-        print("正在启动应用程序...", file=sys.stderr if log_file else sys.stdout)
-        
-        app = QApplication(sys.argv)
-        print("QApplication 创建成功", file=sys.stderr if log_file else sys.stdout)
-        
-        # 设置应用图标（系统任务栏和程序图标）
-        # macOS 上使用 .icns 文件，Windows 上使用 .ico 文件
-        icon_paths = get_high_quality_icon_paths()
-        icon_set = False
-        for icon_path in icon_paths:
-            try:
-                full_path = resource_path(icon_path)
-                if os.path.exists(full_path):
-                    app.setWindowIcon(QIcon(full_path))
-                    icon_set = True
-                    if is_macos():
-                        print(f"✓ 已设置应用图标: {icon_path} (macOS 使用 .icns)", file=sys.stderr if log_file else sys.stdout)
-                    else:
-                        print(f"✓ 已设置应用图标: {icon_path}", file=sys.stderr if log_file else sys.stdout)
-                    break
-            except Exception as e:
-                print(f"设置图标失败: {e}", file=sys.stderr if log_file else sys.stdout)
-        
-        if not icon_set:
-            print("⚠ 警告: 未找到应用图标文件", file=sys.stderr if log_file else sys.stdout)
-        
+            # 从 Finder 启动时没有终端，输出到 stderr 的错误信息同样写入日志
+            sys.stderr = StreamToLogger(logging.getLogger("project_tracing.stderr"), logging.ERROR)
+    logger.info("正在启动应用程序 %s", format_fields(
+        platform=platform.platform(), python=platform.python_version(), log=log_file, read_only=args.read_only))
+
+    try:
+        with timer.span("qapplication"):
+            app = QApplication(sys.argv[:1] + qt_args)
+        with timer.span("icon"):
+            set_app_icon(app)
+
         # 设置样式
         app.setStyle("Fusion")
-        print("样式设置完成", file=sys.stderr if log_file else sys.stdout)
-        
-        print("正在创建主窗口...", file=sys.stderr if log_file else sys.stdout)
-        window = MainWindow()
-        print("主窗口创建成功", file=sys.stderr if log_file else sys.stdout)
-        
+
+        # 打开数据库；结构升级在工作线程中进行，耗时较长时显示进度窗口。
+        # 只读模式不升级（结构不是最新时 init_database 抛出异常）也不备份
+        with timer.span("db_open"):
+            db = Database(defer_migration=True, read_only=args.read_only)
+        migrated = not db.read_only and db.needs_migration()
+        if db.read_only:
+            db.init_database()
+        elif migrated:
+            logger.info("正在升级数据库结构 %s", format_fields(
+                from_version=db.schema_version()))
+            with timer.span("migration"):
+                run_migrations_with_progress(db)
+            logger.info("数据库升级完成")
+        db.start_backup()
+
+        with timer.span("window"):
+            window = MainWindow(db)
+        timer.add_all("", window.startup_phases)
+
+        show_start = time.perf_counter()
+
+        def on_first_paint():
+            timer.add("first_paint", (time.perf_counter() - show_start) * 1000)
+            log_startup_summary(timer, timer.since_start_ms(), db, migrated)
+
+        FirstPaintWatcher(app, on_first_paint)
         window.show()
-        print("窗口显示成功，进入事件循环", file=sys.stderr if log_file else sys.stdout)
-        
+
         sys.exit(app.exec())
     except Exception as e:
-        error_msg = f"应用程序启动失败:\n{str(e)}\n\n详细错误信息:\n{traceback.format_exc()}"
-        print(error_msg, file=sys.stderr if log_file else sys.stdout)
-        
+        logger.exception("应用程序启动失败 %s", format_fields(
+            phases=",".join(timer.phases), elapsed_ms=timer.since_start_ms()))
+        error_msg = (f"应用程序启动失败:\n{str(e)}\n\n详细错误信息:\n{traceback.format_exc()}"
+                     f"\n错误日志已保存到: {log_file}")
+
         # 尝试显示错误对话框（如果 QApplication 已创建）
         try:
             if 'app' in locals():
                 QMessageBox.critical(None, "启动错误", error_msg)
-        except:
+        except Exception:
             pass
-        
-        # 在 macOS 上，如果日志文件存在，提示用户查看
-        if log_file:
-            print(f"\n错误日志已保存到: {log_file}", file=sys.stderr)
-        
+
         sys.exit(1)
     finally:
-        if log_file and hasattr(sys.stderr, 'close'):
-            try:
-                sys.stderr.close()
-            except:
-                pass
+        logging.shutdown()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
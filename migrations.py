@@ -0,0 +1,564 @@
+"""
+数据库结构迁移：按版本号顺序执行，已执行的版本记录在 PRAGMA user_version 中
+
+每个迁移步骤只会执行一次，并在单独的事务中完成；数据库已是最新版本时，
+启动只读取一次 user_version，不执行任何 DDL 或表扫描。
+需要处理大量数据的步骤写成生成器：每 yield (已完成, 总数) 一次就提交一个批次，
+并且必须能从中断处继续（例如借助 migration_checkpoints 表记录进度）。
+新增结构变更时在 MIGRATIONS 末尾追加步骤，不要修改已发布的步骤。
+"""
+import sqlite3
+import inspect
+from typing import Callable, List, Tuple
+
+# 分批迁移时每个事务处理的行数
+BATCH_SIZE = 5000
+# 旧版本直接保存一个路径字符串，不区分电脑，迁移后以此作为 entity_paths.machine
+LEGACY_PATH_KEY = "__default__"
+
+
+def _load_checkpoint(conn: sqlite3.Connection, name: str) -> Tuple[str, int]:
+    """读取分批迁移的检查点，返回 (最后处理的主键, 已处理行数)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_checkpoints (
+            name TEXT PRIMARY KEY,
+            last_key TEXT NOT NULL,
+            done INTEGER NOT NULL
+        )
+    """)
+    row = conn.execute(
+        "SELECT last_key, done FROM migration_checkpoints WHERE name = ?", (name,)
+    ).fetchone()
+    return (row[0], row[1]) if row else ("", 0)
+
+
+def _save_checkpoint(conn: sqlite3.Connection, name: str, last_key: str, done: int):
+    conn.execute(
+        "INSERT OR REPLACE INTO migration_checkpoints (name, last_key, done) VALUES (?, ?, ?)",
+        (name, last_key, done),
+    )
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _create_base_tables(conn: sqlite3.Connection):
+    """创建项目表和任务表（已存在时保持不变）"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS projects (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'archived')),
+            local_path TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            is_pinned INTEGER DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            project_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            notes TEXT,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'overdue')),
+            local_path TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def _rebuild_projects_for_archived(conn: sqlite3.Connection):
+    """老数据库的 projects 表 CHECK 约束不含 archived，SQLite 无法直接修改约束，需要重建表
+
+    按主键顺序分批复制到 projects_new，每批在单独的事务中提交并记录检查点；
+    中途退出后下次启动从检查点继续，全部复制完才删除旧表并重命名。
+    """
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='projects'").fetchone()
+    if not row or 'archived' in row[0]:
+        return
+
+    columns = _table_columns(conn, "projects")
+    # 老版本可能还没有 local_path 字段
+    copy_columns = ["id", "name", "description", "status", "created_at", "updated_at"]
+    if 'local_path' in columns:
+        copy_columns.insert(4, "local_path")
+    column_list = ", ".join(copy_columns)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS projects_new (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            status TEXT NOT NULL CHECK(status IN ('planned', 'in_progress', 'completed', 'archived')),
+            local_path TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            is_pinned INTEGER DEFAULT 0
+        )
+    """)
+    total = conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+    while True:
+        # 每批重新读取检查点：批次之间其他进程可能已经继续推进了迁移
+        last_id, copied = _load_checkpoint(conn, "projects_rebuild")
+        cursor = conn.execute(
+            f"INSERT INTO projects_new ({column_list}) "
+            f"SELECT {column_list} FROM projects WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, BATCH_SIZE),
+        )
+        if cursor.rowcount <= 0:
+            break
+        last_id = conn.execute("SELECT MAX(id) FROM projects_new").fetchone()[0]
+        _save_checkpoint(conn, "projects_rebuild", last_id, copied + cursor.rowcount)
+        yield copied + cursor.rowcount, total
+
+    conn.execute("DROP TABLE projects")
+    conn.execute("ALTER TABLE projects_new RENAME TO projects")
+    conn.execute("DELETE FROM migration_checkpoints WHERE name = 'projects_rebuild'")
+
+
+def _add_missing_columns(conn: sqlite3.Connection):
+    """补齐老数据库缺少的字段"""
+    task_columns = _table_columns(conn, "tasks")
+    if 'local_path' not in task_columns:
+        conn.execute("ALTER TABLE tasks ADD COLUMN local_path TEXT")
+    if 'is_important' not in task_columns:
+        conn.execute("ALTER TABLE tasks ADD COLUMN is_important INTEGER DEFAULT 0")
+    if 'is_urgent' not in task_columns:
+        conn.execute("ALTER TABLE tasks ADD COLUMN is_urgent INTEGER DEFAULT 0")
+
+    if 'is_pinned' not in _table_columns(conn, "projects"):
+        conn.execute("ALTER TABLE projects ADD COLUMN is_pinned INTEGER DEFAULT 0")
+
+
+def _create_indexes(conn: sqlite3.Connection):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_project_id ON tasks(project_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_dates ON tasks(start_date, end_date)")
+
+
+def _create_tasks_view(conn: sqlite3.Connection):
+    """任务的时间状态（计划中/进行中/已超时）在读取时根据当天日期计算，
+    tasks.status 只持久化用户设置的 completed，其余统一保存为 planned
+    """
+    conn.execute("DROP VIEW IF EXISTS tasks_view")
+    conn.execute("""
+        CREATE VIEW tasks_view AS
+        SELECT id, project_id, name, description, notes, start_date, end_date,
+               CASE
+                   WHEN status = 'completed' THEN 'completed'
+                   WHEN end_date < date('now', 'localtime') THEN 'overdue'
+                   WHEN start_date <= date('now', 'localtime') THEN 'in_progress'
+                   ELSE 'planned'
+               END AS status,
+               local_path, created_at, updated_at, is_important, is_urgent
+        FROM tasks
+    """)
+
+
+def _reset_persisted_time_status(conn: sqlite3.Connection):
+    """旧版本会把时间状态写回 tasks.status，这里统一还原为 planned（不改动 updated_at）
+
+    分批更新，每批单独提交；该操作可重复执行，中断后重新开始即可。
+    """
+    total = conn.execute(
+        "SELECT COUNT(*) FROM tasks WHERE status IN ('in_progress', 'overdue')"
+    ).fetchone()[0]
+    done = 0
+    while done < total:
+        cursor = conn.execute("""
+            UPDATE tasks SET status = 'planned'
+            WHERE rowid IN (
+                SELECT rowid FROM tasks WHERE status IN ('in_progress', 'overdue') LIMIT ?
+            )
+        """, (BATCH_SIZE,))
+        if cursor.rowcount <= 0:
+            break
+        done += cursor.rowcount
+        yield done, total
+
+
+def _create_entity_paths(conn: sqlite3.Connection):
+    """各电脑的本地路径改为保存在 entity_paths 表中，每台电脑每个项目/任务一行
+
+    主键以 machine 开头，查询时只连接当前电脑的路径；删除项目/任务时由触发器清理路径。
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS entity_paths (
+            machine TEXT NOT NULL,
+            entity_type TEXT NOT NULL CHECK(entity_type IN ('project', 'task')),
+            entity_id TEXT NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY (machine, entity_type, entity_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entity_paths_entity ON entity_paths(entity_type, entity_id)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_projects_delete_paths AFTER DELETE ON projects
+        BEGIN
+            DELETE FROM entity_paths WHERE entity_type = 'project' AND entity_id = OLD.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_delete_paths AFTER DELETE ON tasks
+        BEGIN
+            DELETE FROM entity_paths WHERE entity_type = 'task' AND entity_id = OLD.id;
+        END
+    """)
+
+
+def _migrate_local_path_json(conn: sqlite3.Connection):
+    """把 local_path 中的 JSON {machine_name: path} 拆分到 entity_paths
+
+    旧格式（直接保存的路径字符串）记为 LEGACY_PATH_KEY 这台"电脑"。
+    按 rowid 分批处理；使用 INSERT OR IGNORE，中断后重新执行不会产生重复数据。
+    local_path 列保留原值，不再读写。
+    """
+    for table, entity_type in (("projects", "project"), ("tasks", "task")):
+        max_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+        for low in range(0, max_rowid, BATCH_SIZE):
+            high = low + BATCH_SIZE
+            conn.execute(f"""
+                INSERT OR IGNORE INTO entity_paths (machine, entity_type, entity_id, path)
+                SELECT j.key, '{entity_type}', t.id, trim(j.value)
+                FROM {table} t, json_each(t.local_path) j
+                WHERE t.rowid > ? AND t.rowid <= ?
+                AND t.local_path != '' AND json_valid(t.local_path)
+                AND json_type(t.local_path) = 'object'
+                AND j.type = 'text' AND trim(j.value) != ''
+            """, (low, high))
+            conn.execute(f"""
+                INSERT OR IGNORE INTO entity_paths (machine, entity_type, entity_id, path)
+                SELECT ?, '{entity_type}', t.id, trim(t.local_path)
+                FROM {table} t
+                WHERE t.rowid > ? AND t.rowid <= ?
+                AND trim(t.local_path) != ''
+                AND NOT (json_valid(t.local_path) AND json_type(t.local_path) = 'object')
+            """, (LEGACY_PATH_KEY, low, high))
+            yield min(high, max_rowid), max_rowid
+
+
+def _create_pagination_indexes(conn: sqlite3.Connection):
+    """键集分页和计数查询使用的索引，排序列末尾加 id 保证顺序稳定"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_updated ON projects(status, updated_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_project_start ON tasks(project_id, start_date, id)")
+    # 被 idx_tasks_project_start 的前缀覆盖
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_project_id")
+
+
+def _create_search_index(conn: sqlite3.Connection):
+    """项目和任务的全文索引：search_index 为 trigram 分词的 FTS5 表（中文不依赖分词，
+    任意 3 个字符以上的子串都能走索引），rowid 对应 search_docs.docid；由触发器保持同步。
+
+    触发器先于数据回填创建，回填期间新增的行由触发器写入。按 rowid 分批回填，
+    已建立文档的行被 INSERT OR IGNORE 跳过，中断后重新执行不会重复索引。
+    SQLite 未编译 FTS5 或版本不支持 trigram 时跳过，搜索退化为 LIKE 扫描。
+    """
+    # 少于 3 个字符的关键词无法使用 trigram 索引，只扫描名称索引
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_name ON projects(name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_name ON tasks(name)")
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_index
+            USING fts5(name, description, notes, tokenize = 'trigram')
+        """)
+    except sqlite3.OperationalError:
+        return
+    # 名称命中的权重最高，其次是描述
+    conn.execute("INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(10.0, 3.0, 1.0)')")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS search_docs (
+            docid INTEGER PRIMARY KEY,
+            entity_type TEXT NOT NULL CHECK(entity_type IN ('project', 'task')),
+            entity_id TEXT NOT NULL,
+            UNIQUE (entity_type, entity_id)
+        )
+    """)
+    for table, entity_type, notes in (("projects", "project", "NULL"), ("tasks", "task", "NEW.notes")):
+        doc = f"(SELECT docid FROM search_docs WHERE entity_type = '{entity_type}' AND entity_id = {{}}.id)"
+        update_columns = "name, description" + (", notes" if entity_type == "task" else "")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO search_docs (entity_type, entity_id) VALUES ('{entity_type}', NEW.id);
+                INSERT INTO search_index (rowid, name, description, notes)
+                VALUES (last_insert_rowid(), NEW.name, NEW.description, {notes});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE OF {update_columns} ON {table}
+            BEGIN
+                UPDATE search_index SET name = NEW.name, description = NEW.description, notes = {notes}
+                WHERE rowid = {doc.format('NEW')};
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = {doc.format('OLD')};
+                DELETE FROM search_docs WHERE entity_type = '{entity_type}' AND entity_id = OLD.id;
+            END
+        """)
+
+    for table, entity_type, notes in (("projects", "project", "NULL"), ("tasks", "task", "t.notes")):
+        max_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+        for low in range(0, max_rowid, BATCH_SIZE):
+            high = low + BATCH_SIZE
+            # 新插入的 docid 都大于插入前的最大值；entity_type 前的 + 让 SQLite 按 docid 范围
+            # 查找，而不是用 (entity_type, entity_id) 索引每批都扫描全部已回填的文档
+            last_docid = conn.execute("SELECT COALESCE(MAX(docid), 0) FROM search_docs").fetchone()[0]
+            conn.execute(f"""
+                INSERT OR IGNORE INTO search_docs (entity_type, entity_id)
+                SELECT '{entity_type}', id FROM {table} WHERE rowid > ? AND rowid <= ?
+            """, (low, high))
+            conn.execute(f"""
+                INSERT INTO search_index (rowid, name, description, notes)
+                SELECT d.docid, t.name, t.description, {notes}
+                FROM search_docs d JOIN {table} t ON t.id = d.entity_id
+                WHERE d.docid > ? AND +d.entity_type = '{entity_type}'
+            """, (last_docid,))
+            yield min(high, max_rowid), max_rowid
+
+
+def _create_query_indexes(conn: sqlite3.Connection):
+    """按应用实际的查询设计的部分索引，并收集统计信息
+
+    tasks_view 的 status 由 CASE 计算，无法使用索引；视图增加 stored_status（持久化的
+    状态）列，查询同时写上 stored_status != 'completed'，即可使用只包含未完成任务的部分索引。
+    多年使用后绝大多数任务已完成，今日任务和日期变化检查只扫描未完成的少量任务。
+    """
+    conn.execute("DROP VIEW IF EXISTS tasks_view")
+    conn.execute("""
+        CREATE VIEW tasks_view AS
+        SELECT id, project_id, name, description, notes, start_date, end_date,
+               CASE
+                   WHEN status = 'completed' THEN 'completed'
+                   WHEN end_date < date('now', 'localtime') THEN 'overdue'
+                   WHEN start_date <= date('now', 'localtime') THEN 'in_progress'
+                   ELSE 'planned'
+               END AS status,
+               local_path, created_at, updated_at, is_important, is_urgent,
+               status AS stored_status
+        FROM tasks
+    """)
+    # 今日任务按截止日期排序（已超时的截止日期在今天之前，自然排在前面）
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_open_end ON tasks(end_date) WHERE status != 'completed'")
+    # 日期变化时按开始日期、截止日期两个范围查找状态变化的任务
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_open_start ON tasks(start_date) WHERE status != 'completed'")
+    # 项目列表：未完成的项目按置顶、更新时间排序
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_projects_active ON projects(is_pinned, updated_at)
+        WHERE status NOT IN ('completed', 'archived')
+    """)
+    # status 只有 planned/completed 两个值，索引没有选择性；日期索引被上面的部分索引取代
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_status")
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_dates")
+    # 每个索引最多采样 1000 行，大数据库上也能很快完成；之后由 PRAGMA optimize 维护
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("ANALYZE")
+
+
+def task_status_sql(alias: str, as_of: str) -> str:
+    """任务在 as_of 这一天的时间状态（SQL 表达式），与 tasks_view 的 status 规则相同"""
+    return (f"CASE WHEN {alias}.status = 'completed' THEN 'completed' "
+            f"WHEN {alias}.end_date < {as_of} THEN 'overdue' "
+            f"WHEN {alias}.start_date <= {as_of} THEN 'in_progress' ELSE 'planned' END")
+
+
+def _counter_key_sql(alias: str, as_of: str) -> str:
+    """task_counters 的键：项目、象限（取 0/1）和 as_of 这一天的状态"""
+    return (f"{alias}.project_id, ifnull({alias}.is_important, 0) != 0, ifnull({alias}.is_urgent, 0) != 0, "
+            f"{task_status_sql(alias, as_of)}")
+
+
+def compute_task_counters(conn: sqlite3.Connection, as_of: str, open_only: bool = False) -> dict:
+    """从 tasks 表重新计数，返回 {(project_id, is_important, is_urgent, status): 任务数}；
+    open_only=True 时只计未完成的任务，读取未完成任务的部分索引。
+    （归档库中该索引通常为空，ANALYZE 不记录空索引的统计信息，规划器会误以为它很大，因此显式指定）"""
+    source = "tasks t INDEXED BY idx_tasks_open_start WHERE t.status != 'completed'" if open_only else "tasks t"
+    rows = conn.execute(
+        f"SELECT {_counter_key_sql('t', ':as_of')}, COUNT(*) FROM {source} GROUP BY 1, 2, 3, 4",
+        {"as_of": as_of})
+    return {tuple(row[:4]): row[4] for row in rows}
+
+
+def rebuild_task_counters(conn: sqlite3.Connection, as_of: str = None):
+    """清空并重新计算 task_counters，as_of 默认为今天（本地日期）"""
+    if as_of is None:
+        as_of = conn.execute("SELECT date('now', 'localtime')").fetchone()[0]
+    conn.execute("DELETE FROM task_counters")
+    conn.execute(f"""
+        INSERT INTO task_counters (project_id, is_important, is_urgent, status, count)
+        SELECT {_counter_key_sql('t', ':as_of')}, COUNT(*) FROM tasks t GROUP BY 1, 2, 3, 4
+    """, {"as_of": as_of})
+    conn.execute("INSERT OR REPLACE INTO task_counters_state (id, as_of) VALUES (1, ?)", (as_of,))
+
+
+def roll_task_counters(conn: sqlite3.Connection, as_of: str):
+    """把 task_counters 从当前的 as_of 滚动到新日期：只有开始/截止日期边界被跨越的未完成任务
+    改变状态（使用未完成任务的部分索引），按变化调整计数。在调用方的写事务中执行"""
+    row = conn.execute("SELECT as_of FROM task_counters_state WHERE id = 1").fetchone()
+    if row is None:
+        rebuild_task_counters(conn, as_of)
+        return
+    previous = row[0]
+    if previous == as_of:
+        return
+    low, high = sorted((previous, as_of))
+    moved = conn.execute(f"""
+        SELECT {_counter_key_sql('t', ':previous')}, {task_status_sql('t', ':as_of')}, COUNT(*)
+        FROM tasks t
+        WHERE t.status != 'completed'
+        AND ((t.start_date > :low AND t.start_date <= :high) OR (t.end_date >= :low AND t.end_date < :high))
+        GROUP BY 1, 2, 3, 4, 5
+    """, {"previous": previous, "as_of": as_of, "low": low, "high": high}).fetchall()
+    deltas = {}
+    for project_id, is_important, is_urgent, old_status, new_status, count in moved:
+        if old_status == new_status:
+            continue
+        old_key = (project_id, is_important, is_urgent, old_status)
+        new_key = (project_id, is_important, is_urgent, new_status)
+        deltas[old_key] = deltas.get(old_key, 0) - count
+        deltas[new_key] = deltas.get(new_key, 0) + count
+    conn.executemany("""
+        INSERT INTO task_counters (project_id, is_important, is_urgent, status, count) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT DO UPDATE SET count = count + excluded.count
+    """, [key + (delta,) for key, delta in deltas.items() if delta])
+    conn.executemany("""
+        DELETE FROM task_counters
+        WHERE project_id = ? AND is_important = ? AND is_urgent = ? AND status = ? AND count <= 0
+    """, [key for key, delta in deltas.items() if delta < 0])
+    conn.execute("UPDATE task_counters_state SET as_of = ? WHERE id = 1", (as_of,))
+
+
+def _create_task_counters(conn: sqlite3.Connection):
+    """按 项目 × 象限 × 状态 计数的 task_counters 表，统计数据只读取 O(项目数) 行
+
+    计数中的状态按 task_counters_state.as_of 这一天计算，由 tasks 上的触发器维护；
+    日期变化后由 Database 把开始/截止日期边界被跨越的任务移到新状态，并更新 as_of。
+    计数为 0 的行被删除。
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS task_counters (
+            project_id TEXT NOT NULL,
+            is_important INTEGER NOT NULL,
+            is_urgent INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (project_id, is_important, is_urgent, status)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS task_counters_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            as_of TEXT NOT NULL
+        )
+    """)
+    as_of = "(SELECT as_of FROM task_counters_state WHERE id = 1)"
+    increment = f"""
+        INSERT INTO task_counters (project_id, is_important, is_urgent, status, count)
+        VALUES ({_counter_key_sql('NEW', as_of)}, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+    """
+    old_key = (f"project_id = OLD.project_id AND is_important = (ifnull(OLD.is_important, 0) != 0) "
+               f"AND is_urgent = (ifnull(OLD.is_urgent, 0) != 0) AND status = {task_status_sql('OLD', as_of)}")
+    decrement = f"""
+        UPDATE task_counters SET count = count - 1 WHERE {old_key};
+        DELETE FROM task_counters WHERE {old_key} AND count <= 0;
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_insert AFTER INSERT ON tasks
+        BEGIN {increment} END
+    """)
+    # 只修改名称、描述等不影响计数的列时不做任何操作
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_update
+        AFTER UPDATE OF project_id, status, start_date, end_date, is_important, is_urgent ON tasks
+        WHEN OLD.project_id IS NOT NEW.project_id OR OLD.status IS NOT NEW.status
+            OR OLD.start_date IS NOT NEW.start_date OR OLD.end_date IS NOT NEW.end_date
+            OR OLD.is_important IS NOT NEW.is_important OR OLD.is_urgent IS NOT NEW.is_urgent
+        BEGIN {decrement} {increment} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_delete AFTER DELETE ON tasks
+        BEGIN {decrement} END
+    """)
+    rebuild_task_counters(conn)
+
+
+# (版本号, 说明, 迁移函数)；版本号必须连续递增
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "创建项目表和任务表", _create_base_tables),
+    (2, "重建项目表以支持归档状态", _rebuild_projects_for_archived),
+    (3, "补齐老数据库缺少的字段", _add_missing_columns),
+    (4, "创建任务索引", _create_indexes),
+    (5, "创建按日期计算状态的任务视图", _create_tasks_view),
+    (6, "还原持久化的时间状态", _reset_persisted_time_status),
+    (7, "创建本地路径表", _create_entity_paths),
+    (8, "迁移本地路径数据", _migrate_local_path_json),
+    (9, "创建分页查询索引", _create_pagination_indexes),
+    (10, "创建全文搜索索引", _create_search_index),
+    (11, "创建查询索引并收集统计信息", _create_query_indexes),
+    (12, "创建任务计数表", _create_task_counters),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def needs_migration(conn: sqlite3.Connection) -> bool:
+    return get_schema_version(conn) < SCHEMA_VERSION
+
+
+def migrate(conn: sqlite3.Connection, progress=None) -> List[int]:
+    """把数据库迁移到最新版本，返回本次执行的版本号列表
+
+    progress(description, done, total) 在每个批次提交后调用（在执行迁移的线程中）。
+    某一步失败时回滚当前批次并抛出异常，已提交的步骤和批次保留，下次启动从中断处继续。
+    """
+    if not needs_migration(conn):
+        return []
+
+    applied = []
+    # 重建 projects 表时需临时关闭外键约束，避免 DROP TABLE 级联删除所有任务
+    # （foreign_keys 在事务中设置无效，必须在 BEGIN 之前）
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, description, step in MIGRATIONS:
+            # 写锁在事务开始时获取；等待期间其他进程可能已经完成了这一步
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if get_schema_version(conn) >= version:
+                    conn.commit()
+                    continue
+                if inspect.isgeneratorfunction(step):
+                    for done, total in step(conn):
+                        # 提交当前批次后立即开始下一个事务，让其他连接有机会读写
+                        conn.commit()
+                        if progress:
+                            progress(description, done, total)
+                        conn.execute("BEGIN IMMEDIATE")
+                else:
+                    step(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+            if progress:
+                progress(description, 1, 1)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    return applied
@@ -1,7 +1,7 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 class Status(Enum):
     PLANNED = "planned"
@@ -16,7 +16,8 @@ class ProjectStatus(Enum):
     COMPLETED = "completed"  # 已完成
     ARCHIVED = "archived"  # 已归档（失败的项目）
 
-@dataclass
+# slots=True：不创建实例 __dict__，列表页一次加载上万个对象时内存占用更小
+@dataclass(slots=True)
 class Project:
     id: str
     name: str
@@ -26,9 +27,10 @@ class Project:
     created_at: str
     updated_at: str
     is_pinned: bool = False
-    local_path_map: Dict[str, str] = field(default_factory=dict)
+    # 列表查询返回的预览对象：description 已截断、local_path 未加载，完整数据用 Database.get_project 获取
+    is_preview: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: str
     project_id: str
@@ -39,8 +41,85 @@ class Task:
     end_date: str
     status: Status
     local_path: str  # 本地文件夹路径
-    local_path_map: Dict[str, str] = field(default_factory=dict)
     is_important: bool = False  # 是否重要（默认不重要）
     is_urgent: bool = False  # 是否紧急（默认不紧急）
     created_at: str = ""
-    updated_at: str = ""
\ No newline at end of file
+    updated_at: str = ""
+    # 列表查询返回的预览对象：description/notes 已截断，完整数据用 Database.get_task 获取
+    is_preview: bool = False
+
+@dataclass(slots=True)
+class TaskSummary:
+    """列表视图使用的精简任务（description 为截断后的预览，不含备注、本地路径和时间戳），
+    完整信息通过 Database.get_task 获取"""
+    id: str
+    project_id: str
+    name: str
+    description: str
+    start_date: str
+    end_date: str
+    status: Status
+    is_important: bool = False
+    is_urgent: bool = False
+
+@dataclass(slots=True)
+class SearchHit:
+    """全文搜索结果；任务的结果同时带有所属项目，便于跳转"""
+    entity_type: str  # project 或 task
+    entity_id: str
+    project_id: str
+    project_name: str
+    project_status: str
+    name: str
+    # 命中位置附近的片段，命中词用【】标出；只按名称匹配的结果（短关键词）为空字符串
+    snippet: str
+
+@dataclass(slots=True)
+class ProjectProgress:
+    """项目进度：任务总数、已完成和已超时的任务数"""
+    project_id: str
+    total: int = 0
+    completed: int = 0
+    overdue: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """完成比例，没有任务时为 0"""
+        return self.completed / self.total if self.total else 0.0
+
+@dataclass
+class Statistics:
+    """聚合统计（Database.get_statistics）：计数都在 SQL 中完成，不读取任务对象"""
+    # 项目状态 -> 项目数
+    projects_by_status: Dict[str, int]
+    # 任务状态（planned/in_progress/overdue/completed）-> 任务数
+    tasks_by_status: Dict[str, int]
+    # (is_important, is_urgent) -> {任务状态: 任务数}
+    tasks_by_quadrant: Dict[Tuple[bool, bool], Dict[str, int]]
+    # project_id -> 进度（包括没有任务的项目）
+    project_progress: Dict[str, ProjectProgress]
+
+    @property
+    def total_projects(self) -> int:
+        return sum(self.projects_by_status.values())
+
+    @property
+    def total_tasks(self) -> int:
+        return sum(self.tasks_by_status.values())
+
+@dataclass
+class OverviewSnapshot:
+    """总览页面所需数据的一致性快照（同一个读事务内获取）"""
+    projects: List[Project]
+    # 按 (is_important, is_urgent) 分组的进行中/已超时任务
+    quadrant_tasks: Dict[Tuple[bool, bool], List[TaskSummary]]
+    today_tasks: List[TaskSummary]
+    # total_projects, active_projects, total_tasks, active_tasks, overdue_tasks, today_tasks
+    stats: Dict[str, int]
+
+@dataclass
+class Page:
+    """键集分页查询的一页结果"""
+    items: list
+    # 传给下一次查询的 after 参数；为 None 表示没有更多数据
+    next_cursor: Optional[tuple]
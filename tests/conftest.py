@@ -0,0 +1,22 @@
+"""
+测试公用设置：仓库根目录加入 sys.path；每个测试使用独立的应用数据目录（配置、日志、默认数据库）
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def isolate_app_data(monkeypatch, root):
+    """应用数据目录（utils.config）位于 root 下，不读写用户真实的配置"""
+    monkeypatch.setenv("HOME", os.path.join(root, "home"))
+    monkeypatch.setenv("APPDATA", os.path.join(root, "appdata"))
+
+
+@pytest.fixture(autouse=True)
+def app_data_dir(tmp_path, monkeypatch):
+    isolate_app_data(monkeypatch, str(tmp_path))
@@ -0,0 +1,29 @@
+"""旧版本结构的数据库升级到当前结构"""
+import sqlite3
+
+import pytest
+
+import migrations
+from benchmarks.legacy_fixtures import LEGACY_SCHEMAS, create_legacy_database
+from database import Database
+
+
+@pytest.mark.parametrize("schema", sorted(LEGACY_SCHEMAS))
+def test_legacy_database_migrates(tmp_path, schema):
+    path = str(tmp_path / "legacy.db")
+    create_legacy_database(path, schema, projects=20, tasks_per_project=5)
+    db = Database(path, defer_migration=True)
+    try:
+        assert db.needs_migration()
+        db.init_database()
+        assert db.schema_version() == migrations.SCHEMA_VERSION
+        assert not db.needs_migration()
+        assert len(db.get_all_projects(include_archived=True)) == 20
+        assert db.check_task_counters()['drift'] == []
+    finally:
+        db.close()
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    finally:
+        conn.close()
@@ -0,0 +1,30 @@
+"""查询计划检查（与 python -m benchmarks.query_plans 相同）：没有违反规则，且与基线一致"""
+import json
+
+import pytest
+
+from benchmarks import query_plans
+from conftest import isolate_app_data
+
+
+@pytest.fixture(scope="module")
+def plans(tmp_path_factory):
+    work_dir = str(tmp_path_factory.mktemp("plans"))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        isolate_app_data(monkeypatch, work_dir)
+        db = query_plans.seed_database(f"{work_dir}/plans.db")
+        try:
+            yield query_plans.collect_plans(db)
+        finally:
+            db.close()
+
+
+def test_no_rule_violations(plans):
+    assert query_plans.check_rules(plans) == []
+
+
+def test_plans_match_baseline(plans):
+    with open(query_plans.BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    diffs = query_plans.diff_plans(baseline, plans)
+    assert not diffs, "\n".join(diffs) + "\n有意修改查询或索引后用 python -m benchmarks.query_plans --update 更新基线"
@@ -0,0 +1,46 @@
+"""task_counters：写入时由触发器维护，日期变化时滚动；读取路径不写入"""
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from database import Database
+
+
+def _day(offset: int) -> str:
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "pt.db"))
+    db.wait_for_backup()
+    project_id = db.create_project("项目")
+    db.create_task(project_id, "进行中", _day(-1), _day(1))
+    db.create_task(project_id, "已超时", _day(-5), _day(-1))
+    db.create_task(project_id, "计划中", _day(2), _day(5))
+    yield db
+    db.close()
+
+
+def test_counters_follow_writes(db):
+    project_id = db.get_all_projects()[0].id
+    task_id = db.create_task(project_id, "新任务", _day(0), _day(0))
+    db.update_task(task_id, status="completed")
+    assert db.get_statistics().tasks_by_status == {'in_progress': 1, 'overdue': 1, 'planned': 1, 'completed': 1}
+    assert db.check_task_counters()['drift'] == []
+
+
+def test_stale_counters_are_recounted_without_writing(db):
+    expected = db.get_statistics().tasks_by_status
+    # 计数表停留在几天前（例如上次运行在之前的日期）
+    db._roll_task_counters(_day(-3))
+    db._counters_as_of = None
+    mtime = os.stat(db.db_path).st_mtime_ns
+    assert db.get_statistics().tasks_by_status == expected
+    assert os.stat(db.db_path).st_mtime_ns == mtime
+
+    db.apply_date_rollover(_day(0))
+    assert db.check_task_counters()['as_of'] == _day(0)
+    assert db.get_statistics().tasks_by_status == expected
+    assert db.check_task_counters()['drift'] == []
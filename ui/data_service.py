@@ -0,0 +1,81 @@
+"""
+异步数据服务：在专用工作线程中执行数据库查询和写入，结果通过 Qt 信号回到 GUI 线程
+"""
+import itertools
+import logging
+import queue
+import threading
+from PySide6.QtCore import QObject, Signal
+
+logger = logging.getLogger(__name__)
+
+
+class DataService(QObject):
+    """单个工作线程按提交顺序依次执行任务，因此写操作天然串行
+
+    数据库位于网络盘或同步目录时，文件锁或缓慢的 fsync 只会阻塞工作线程，
+    页面可以继续显示旧数据并提示正在加载。
+    """
+
+    # 内部信号：从工作线程发出，Qt 以队列连接方式投递到 GUI 线程
+    _job_finished = Signal(int, object, object)
+    # 是否有任务在执行或排队（用于显示加载状态）
+    busy_changed = Signal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue()
+        self._callbacks = {}
+        self._ids = itertools.count(1)
+        self._pending = 0
+        self._job_finished.connect(self._on_job_finished)
+        self._thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, on_done=None, on_error=None, **kwargs) -> int:
+        """提交一个在工作线程执行的调用，返回任务编号
+
+        on_done(result) / on_error(exception) 在 GUI 线程中调用。
+        """
+        job_id = next(self._ids)
+        self._callbacks[job_id] = (on_done, on_error)
+        self._pending += 1
+        if self._pending == 1:
+            self.busy_changed.emit(True)
+        self._queue.put((job_id, fn, args, kwargs))
+        return job_id
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending
+
+    def shutdown(self, timeout: float = 5.0):
+        """停止工作线程（等待已提交的任务执行完）"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job_id, fn, args, kwargs = job
+            try:
+                result = fn(*args, **kwargs)
+                error = None
+            except Exception as e:
+                result = None
+                error = e
+                logger.exception("数据库任务失败 job=%s fn=%s", job_id, getattr(fn, '__qualname__', fn))
+            self._job_finished.emit(job_id, result, error)
+
+    def _on_job_finished(self, job_id, result, error):
+        on_done, on_error = self._callbacks.pop(job_id, (None, None))
+        self._pending -= 1
+        if self._pending == 0:
+            self.busy_changed.emit(False)
+        if error is not None:
+            if on_error:
+                on_error(error)
+        elif on_done:
+            on_done(result)
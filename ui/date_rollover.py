@@ -0,0 +1,76 @@
+"""
+日期切换服务：在本地午夜（以及休眠唤醒、系统时钟跳变后）通知各页面刷新任务的时间状态
+"""
+import logging
+from datetime import date, datetime, timedelta
+from PySide6.QtCore import QObject, QTimer, Signal
+from database import Database
+from ui.data_service import DataService
+
+logger = logging.getLogger(__name__)
+
+
+class DateRolloverService(QObject):
+    """每次日期变化只触发一次 date_changed 信号，两次日期变化之间不执行任何状态维护 SQL"""
+
+    # 参数：新日期（YYYY-MM-DD）
+    date_changed = Signal(str)
+
+    # 兜底检查间隔：QTimer 在系统休眠期间不计时，唤醒或时钟跳变后靠它及时发现日期变化
+    WATCHDOG_INTERVAL_MS = 60 * 1000
+
+    def __init__(self, db: Database, data_service: DataService, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.data_service = data_service
+        self.current_date = date.today()
+        # 日期切换的写入正在工作线程中执行
+        self._rolling_over = False
+
+        self._midnight_timer = QTimer(self)
+        self._midnight_timer.setSingleShot(True)
+        self._midnight_timer.timeout.connect(self.check_date)
+
+        self._watchdog_timer = QTimer(self)
+        self._watchdog_timer.timeout.connect(self.check_date)
+
+    def start(self):
+        self._schedule_next_midnight()
+        self._watchdog_timer.start(self.WATCHDOG_INTERVAL_MS)
+
+    def stop(self):
+        self._midnight_timer.stop()
+        self._watchdog_timer.stop()
+
+    def _schedule_next_midnight(self):
+        """计算距离下一个本地午夜的毫秒数并启动单次定时器"""
+        now = datetime.now()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        # 多等 1 秒，避免定时器略微提前触发时日期尚未变化
+        delay_ms = int((next_midnight - now).total_seconds() * 1000) + 1000
+        self._midnight_timer.start(delay_ms)
+
+    def check_date(self):
+        """检查日期是否变化，变化时在工作线程中执行日期切换，成功后通知一次"""
+        today = date.today()
+        if today != self.current_date and not self._rolling_over:
+            # 切换会写入数据库（BEGIN IMMEDIATE），不在 GUI 线程执行
+            self._rolling_over = True
+            self.data_service.submit(
+                self.db.apply_date_rollover, today.isoformat(),
+                on_done=lambda _: self._on_rollover_done(today),
+                on_error=self._on_rollover_failed,
+            )
+        # 时钟跳变后原定时器的触发时间已不准确，每次检查都重新计算
+        self._schedule_next_midnight()
+
+    def _on_rollover_done(self, today: date):
+        # 写入成功后才更新日期，失败时下次检查会重试
+        self._rolling_over = False
+        self.current_date = today
+        self.date_changed.emit(today.isoformat())
+
+    def _on_rollover_failed(self, error):
+        # 例如工作线程或备份持有数据库锁时的 "database is locked"；保留旧日期，下次检查重试
+        self._rolling_over = False
+        logger.warning("日期切换失败，将在下次检查时重试：%s", error)
@@ -6,14 +6,41 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
 from PySide6.QtCore import Qt, QUrl
 from PySide6.QtGui import QDesktopServices
 from database import Database
+from ui.refresh_guard import RefreshGuard
+from ui.data_service import DataService
 import os
 
 class HistoryPage(QWidget):
-    def __init__(self, db: Database, main_window=None):
+    # 每次加载的行数；列表滚动到距底部不足 LOAD_MORE_ROWS 行时加载下一页
+    PROJECT_PAGE_SIZE = 50
+    TASK_PAGE_SIZE = 100
+    LOAD_MORE_ROWS = 10
+
+    def __init__(self, db: Database, main_window=None, data_service: DataService = None):
         super().__init__()
         self.db = db
         self.main_window = main_window
         self.current_project_id = None
+        self.completed_projects = []
+        self.archived_projects = []
+        # 历史项目列表在工作线程中加载
+        self.data_service = data_service or DataService(self)
+        self._loading = False
+        self._reload_pending = False
+        self._reload_force = False
+        # 键集分页状态：下一页游标、总数、正在加载下一页的列表
+        self._project_cursors = {'completed': None, 'archived': None}
+        self._project_totals = {'completed': None, 'archived': None}
+        self._loading_more = set()
+        # 列表整体重新加载后递增，丢弃重新加载之前发出的翻页结果
+        self._projects_generation = 0
+        self.current_tasks = []
+        self._task_cursor = None
+        self._task_total = 0
+        self._tasks_loading = False
+        self._tasks_generation = 0
+        # 数据库未变化时跳过历史项目列表刷新
+        self.refresh_guard = RefreshGuard(db)
         self.init_ui()
         self.refresh_projects()
     
@@ -33,6 +60,7 @@ class HistoryPage(QWidget):
         
         # 已完成项目列表
         completed_group = QGroupBox("已完成项目")
+        self.completed_group = completed_group
         completed_group.setStyleSheet("""
             QGroupBox {
                 font-size: 16px;
@@ -61,6 +89,8 @@ class HistoryPage(QWidget):
         self.completed_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.completed_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.completed_table.itemSelectionChanged.connect(self.on_completed_project_selected)
+        self.completed_table.verticalScrollBar().valueChanged.connect(
+            lambda _: self._maybe_load_more_projects('completed'))
         self.completed_table.setMinimumWidth(250)
         self.completed_table.setStyleSheet("""
             QTableWidget {
@@ -92,6 +122,7 @@ class HistoryPage(QWidget):
 
         # 归档项目列表
         archived_group = QGroupBox("归档项目")
+        self.archived_group = archived_group
         archived_group.setStyleSheet("""
             QGroupBox {
                 font-size: 16px;
@@ -120,6 +151,8 @@ class HistoryPage(QWidget):
         self.archived_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.archived_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.archived_table.itemSelectionChanged.connect(self.on_archived_project_selected)
+        self.archived_table.verticalScrollBar().valueChanged.connect(
+            lambda _: self._maybe_load_more_projects('archived'))
         self.archived_table.setMinimumWidth(250)
         self.archived_table.setStyleSheet("""
             QTableWidget {
@@ -302,6 +335,9 @@ class HistoryPage(QWidget):
             }
         """)
         project_btn_layout.addWidget(self.delete_project_btn)
+        # 只读模式下不显示修改数据的按钮
+        self.restore_project_btn.setVisible(not self.db.read_only)
+        self.delete_project_btn.setVisible(not self.db.read_only)
         
         project_btn_layout.addStretch()
         project_info_layout.addLayout(project_btn_layout)
@@ -310,6 +346,7 @@ class HistoryPage(QWidget):
         
         # 下方：任务列表（只读，不能添加任务）
         tasks_widget = QGroupBox("任务列表（只读）")
+        self.tasks_group = tasks_widget
         tasks_widget.setStyleSheet("""
             QGroupBox {
                 font-size: 16px;
@@ -340,6 +377,7 @@ class HistoryPage(QWidget):
         self.tasks_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.tasks_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.tasks_table.setEditTriggers(QAbstractItemView.NoEditTriggers)  # 只读
+        self.tasks_table.verticalScrollBar().valueChanged.connect(lambda _: self._maybe_load_more_tasks())
         self.tasks_table.setStyleSheet("""
             QTableWidget {
                 font-size: 14px;
@@ -382,22 +420,132 @@ class HistoryPage(QWidget):
         
         main_layout.addWidget(splitter)
     
-    def refresh_projects(self):
-        """刷新历史项目列表"""
-        projects = self.db.get_history_projects()
+    def refresh_projects(self, force=False):
+        """刷新历史项目列表；数据库自上次加载后没有变化时跳过（force=True 时总是刷新）"""
+        if self._loading:
+            # 正在加载时合并请求，加载完成后再刷新一次
+            self._reload_pending = True
+            self._reload_force = self._reload_force or force
+            return
+        self._set_loading(True)
+        # 重新加载时至少取回已经加载的行数，列表不会因刷新而变短
+        limits = {
+            'completed': max(self.PROJECT_PAGE_SIZE, len(self.completed_projects)),
+            'archived': max(self.PROJECT_PAGE_SIZE, len(self.archived_projects)),
+        }
+        self.data_service.submit(
+            self._load_projects, force, limits,
+            on_done=self._on_projects_loaded,
+            on_error=self._on_load_failed,
+        )
 
-        self.completed_projects = [p for p in projects if p.status == 'completed']
-        self.archived_projects = [p for p in projects if p.status == 'archived']
+    def _load_projects(self, force, limits):
+        """在工作线程中执行：数据未变化时返回 None，否则返回 (各状态总数, 各状态第一页)"""
+        if not self.refresh_guard.should_refresh(force):
+            return None
+        counts = self.db.count_history_projects()
+        pages = {status: self.db.get_history_projects_page(status, limit)
+                 for status, limit in limits.items()}
+        return counts, pages
 
-        self.completed_table.setRowCount(len(self.completed_projects))
-        for row, project in enumerate(self.completed_projects):
-            self.completed_table.setItem(row, 0, QTableWidgetItem(project.name))
+    def _set_loading(self, loading: bool):
+        self._loading = loading
+        self._update_project_titles()
 
-        self.archived_table.setRowCount(len(self.archived_projects))
-        for row, project in enumerate(self.archived_projects):
-            self.archived_table.setItem(row, 0, QTableWidgetItem(project.name))
+    def _update_project_titles(self):
+        suffix = "（加载中…）" if self._loading else ""
+        # 总数在第一次加载完成后显示
+        completed = self._project_totals['completed']
+        archived = self._project_totals['archived']
+        completed = f"（{completed}）" if completed is not None else ""
+        archived = f"（{archived}）" if archived is not None else ""
+        self.completed_group.setTitle(f"已完成项目{completed}{suffix}")
+        self.archived_group.setTitle(f"归档项目{archived}{suffix}")
+
+    def _on_load_finished(self):
+        self._set_loading(False)
+        if self._reload_pending:
+            force = self._reload_force
+            self._reload_pending = False
+            self._reload_force = False
+            self.refresh_projects(force)
+
+    def _on_load_failed(self, error):
+        # 加载失败时保留旧数据，下次刷新重新加载
+        self.refresh_guard.reset()
+        self._on_load_finished()
+
+    def _on_projects_loaded(self, result):
+        if result is not None:
+            self.populate_projects(*result)
+        self._on_load_finished()
+
+    def populate_projects(self, counts, pages):
+        """用历史项目的总数和第一页数据填充已完成/归档两个列表，其余数据滚动时再加载"""
+        # 之前发出的翻页请求基于旧数据，结果到达后丢弃
+        self._projects_generation += 1
+        self._loading_more.clear()
+        self._project_totals = counts
+        self.completed_projects = pages['completed'].items
+        self.archived_projects = pages['archived'].items
+        self._project_cursors = {status: page.next_cursor for status, page in pages.items()}
+
+        for status in ('completed', 'archived'):
+            table, projects = self._project_view(status)
+            table.setRowCount(len(projects))
+            for row, project in enumerate(projects):
+                table.setItem(row, 0, QTableWidgetItem(project.name))
 
         self._reselect_current_project()
+        # 第一页没有填满列表时继续加载
+        for status in ('completed', 'archived'):
+            self._maybe_load_more_projects(status)
+
+    def _project_view(self, status):
+        if status == 'completed':
+            return self.completed_table, self.completed_projects
+        return self.archived_table, self.archived_projects
+
+    def _near_bottom(self, table) -> bool:
+        """表格可见，且最后一个可见行距末尾不足 LOAD_MORE_ROWS 行"""
+        if not table.isVisible():
+            return False
+        last_visible = table.rowAt(table.viewport().height() - 1)
+        return last_visible == -1 or table.rowCount() - 1 - last_visible < self.LOAD_MORE_ROWS
+
+    def _maybe_load_more_projects(self, status):
+        """列表滚动到接近底部时在工作线程中加载下一页"""
+        cursor = self._project_cursors[status]
+        if cursor is None or status in self._loading_more:
+            return
+        table, _ = self._project_view(status)
+        if not self._near_bottom(table):
+            return
+        self._loading_more.add(status)
+        generation = self._projects_generation
+        self.data_service.submit(
+            self.db.get_history_projects_page, status, self.PROJECT_PAGE_SIZE, cursor,
+            on_done=lambda page: self._on_more_projects_loaded(status, generation, page),
+            on_error=lambda error: self._on_more_projects_failed(status, generation),
+        )
+
+    def _on_more_projects_loaded(self, status, generation, page):
+        if generation != self._projects_generation:
+            return
+        self._loading_more.discard(status)
+        table, projects = self._project_view(status)
+        start = len(projects)
+        projects.extend(page.items)
+        self._project_cursors[status] = page.next_cursor
+        table.setRowCount(len(projects))
+        for row in range(start, len(projects)):
+            table.setItem(row, 0, QTableWidgetItem(projects[row].name))
+        self._maybe_load_more_projects(status)
+
+    def _on_more_projects_failed(self, status, generation):
+        # 保留游标，下次滚动时重试
+        if generation == self._projects_generation:
+            self._loading_more.discard(status)
     
     def on_project_selected(self):
         """当选择项目时"""
@@ -466,12 +614,58 @@ class HistoryPage(QWidget):
         self.refresh_tasks()
     
     def refresh_tasks(self):
-        """刷新任务列表（只读）"""
+        """刷新任务列表（只读）：先加载第一页，滚动到接近底部时继续加载"""
+        self._tasks_generation += 1
+        self.current_tasks = []
+        self._task_cursor = None
+        self._tasks_loading = False
+        self.tasks_table.setRowCount(0)
         if not self.current_project_id:
-            self.tasks_table.setRowCount(0)
+            self.tasks_group.setTitle("任务列表（只读）")
             return
-        
-        tasks = self.db.get_tasks_by_project(self.current_project_id)
+        self._load_task_page(with_count=True)
+
+    def _load_task_page(self, with_count=False):
+        self._tasks_loading = True
+        generation = self._tasks_generation
+        self.data_service.submit(
+            self._fetch_tasks, self.current_project_id, self._task_cursor, with_count,
+            on_done=lambda result: self._on_tasks_loaded(generation, result),
+            on_error=lambda error: self._on_tasks_failed(generation),
+        )
+
+    def _fetch_tasks(self, project_id, cursor, with_count):
+        """在工作线程中执行：返回 (任务总数或 None, 一页任务)"""
+        total = self.db.count_tasks(project_id) if with_count else None
+        return total, self.db.get_tasks_page(project_id, self.TASK_PAGE_SIZE, cursor)
+
+    def _on_tasks_loaded(self, generation, result):
+        # 加载期间切换了项目
+        if generation != self._tasks_generation:
+            return
+        self._tasks_loading = False
+        total, page = result
+        if total is not None:
+            self.tasks_group.setTitle(f"任务列表（只读，共 {total} 个）")
+        start = len(self.current_tasks)
+        self.current_tasks.extend(page.items)
+        self._task_cursor = page.next_cursor
+        self._append_task_rows(start)
+        self._maybe_load_more_tasks()
+
+    def _on_tasks_failed(self, generation):
+        if generation == self._tasks_generation:
+            self._tasks_loading = False
+
+    def _maybe_load_more_tasks(self):
+        if self._tasks_loading or self._task_cursor is None:
+            return
+        if self._near_bottom(self.tasks_table):
+            self._load_task_page()
+
+    def _append_task_rows(self, start: int):
+        """把 current_tasks[start:] 追加到任务表格"""
+        tasks = self.current_tasks
         self.tasks_table.setRowCount(len(tasks))
         
         status_map = {
@@ -488,7 +682,8 @@ class HistoryPage(QWidget):
             'overdue': '#e74c3c'
         }
         
-        for i, task in enumerate(tasks):
+        for i in range(start, len(tasks)):
+            task = tasks[i]
             self.tasks_table.setItem(i, 0, QTableWidgetItem(task.name))
             self.tasks_table.setItem(i, 1, QTableWidgetItem(task.start_date))
             self.tasks_table.setItem(i, 2, QTableWidgetItem(task.end_date))
@@ -571,16 +766,21 @@ class HistoryPage(QWidget):
         reply = QMessageBox.question(self, "确认恢复", "确定要恢复该项目吗？\n项目将恢复到项目列表，状态设为进行中。",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.db.restore_project(self.current_project_id)
+            project_id = self.current_project_id
+            self._submit_write(self.db.restore_project, project_id,
+                               on_done=lambda _: self._on_project_removed(project_id))
+
+    def _on_project_removed(self, project_id):
+        """恢复或删除写入完成后清空详情并刷新各页面"""
+        if project_id == self.current_project_id:
             self.current_project_id = None
-            
             self._clear_details()
-            self.refresh_projects()
-            # 通知主窗口刷新项目列表页面
-            if self.main_window and hasattr(self.main_window, 'project_list_page'):
-                self.main_window.project_list_page.refresh_projects()
-            if self.main_window and hasattr(self.main_window, 'overview_page'):
-                self.main_window.overview_page.refresh_data()
+        self.refresh_projects()
+        # 通知主窗口刷新项目列表页面和总览页面
+        if self.main_window and hasattr(self.main_window, 'project_list_page'):
+            self.main_window.project_list_page.refresh_projects()
+        if self.main_window and hasattr(self.main_window, 'overview_page'):
+            self.main_window.overview_page.refresh_data()
 
     def delete_current_project(self):
         """删除历史项目"""
@@ -590,20 +790,17 @@ class HistoryPage(QWidget):
         reply = QMessageBox.question(self, "确认删除", "确定要永久删除该项目及其所有任务吗？",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.db.delete_project(self.current_project_id)
-            self.current_project_id = None
+            project_id = self.current_project_id
+            self._submit_write(self.db.delete_project, project_id,
+                               on_done=lambda _: self._on_project_removed(project_id))
 
-            self._clear_details()
-            self.refresh_projects()
+    def _submit_write(self, fn, *args, on_done=None, **kwargs):
+        """在工作线程中执行写操作；完成后在 GUI 线程调用 on_done(result)，失败时提示"""
+        self.data_service.submit(fn, *args, on_done=on_done, on_error=self._on_write_failed, **kwargs)
 
-            # 通知主窗口刷新其他页面
-            if self.main_window:
-                if hasattr(self.main_window, 'project_list_page'):
-                    self.main_window.project_list_page.refresh_projects()
-                if hasattr(self.main_window, 'overview_page'):
-                    self.main_window.overview_page.refresh_data()
-                if hasattr(self.main_window, 'history_page'):
-                    self.main_window.history_page.refresh_projects()
+    def _on_write_failed(self, error):
+        QMessageBox.warning(self, "错误", f"无法保存到数据库：\n{error}")
+        self.refresh_projects(force=True)
 
     def _clear_details(self):
         self.project_name_label.setText("选择项目以查看...")
@@ -613,7 +810,7 @@ class HistoryPage(QWidget):
         self.open_project_path_btn.setEnabled(False)
         self.restore_project_btn.setEnabled(False)
         self.delete_project_btn.setEnabled(False)
-        self.tasks_table.setRowCount(0)
+        self.refresh_tasks()
         self.completed_table.blockSignals(True)
         self.completed_table.clearSelection()
         self.completed_table.blockSignals(False)
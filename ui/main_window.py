@@ -2,8 +2,8 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
                                QListWidget, QListWidgetItem, QStackedWidget, 
                                QLabel, QFrame, QPushButton, QMessageBox, QFileDialog,
                                QDialog, QLineEdit)
-from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QIcon, QPixmap
+from PySide6.QtCore import Qt, Signal, QTimer
+from PySide6.QtGui import QIcon, QPixmap, QShortcut, QKeySequence
 from database import Database
 from utils.resource_path import resource_path
 from utils.config import get_db_path, set_db_path
@@ -11,13 +11,16 @@ from utils.platform_utils import get_platform_icon_paths
 import os
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db: Database = None):
         super().__init__()
-        self.db = Database()
+        # 调用方可以传入已完成迁移的数据库（见 main.py），否则在此打开
+        self.db = db if db is not None else Database()
+        # 构造各页面的耗时（毫秒），见 main.py 的启动汇总
+        self.startup_phases = {}
         self.init_ui()
         
     def init_ui(self):
-        self.setWindowTitle("Project Tracing")
+        self.setWindowTitle("Project Tracing（只读）" if self.db.read_only else "Project Tracing")
         self.setMinimumSize(1200, 800)
         
         # 设置窗口图标（窗口标题栏）
@@ -181,24 +184,83 @@ class MainWindow(QMainWindow):
         # 主内容区
         self.stack_widget = QStackedWidget()
         
-        # 初始化页面
+        # 初始化页面（各页面的构造耗时记入启动日志）
+        from utils.app_logging import timed_phase
         from ui.overview_page import OverviewPage
         from ui.project_list_page import ProjectListPage
         from ui.history_page import HistoryPage
         
-        self.overview_page = OverviewPage(self.db, self)
-        self.project_list_page = ProjectListPage(self.db)
+        # 所有页面共用一个数据库工作线程，保证写操作串行执行
+        from ui.data_service import DataService
+        self.data_service = DataService(self)
+        
+        with timed_phase(self.startup_phases, "page_overview"):
+            self.overview_page = OverviewPage(self.db, self, data_service=self.data_service)
+        with timed_phase(self.startup_phases, "page_project_list"):
+            self.project_list_page = ProjectListPage(self.db, data_service=self.data_service)
         self.project_list_page.main_window = self  # 设置引用以便刷新历史页面
-        self.history_page = HistoryPage(self.db, self)
+        with timed_phase(self.startup_phases, "page_history"):
+            self.history_page = HistoryPage(self.db, self, data_service=self.data_service)
         
         self.stack_widget.addWidget(self.overview_page)
         self.stack_widget.addWidget(self.project_list_page)
         self.stack_widget.addWidget(self.history_page)
-        
+
+        # 日期变化时统一刷新各页面的任务状态
+        from ui.date_rollover import DateRolloverService
+        self.rollover_service = DateRolloverService(self.db, self.data_service, self)
+        self.rollover_service.date_changed.connect(self.on_date_changed)
+        self.rollover_service.start()
+        
+        # 全局搜索栏（位于页面上方）
+        from ui.search_panel import SearchPanel
+        self.search_panel = SearchPanel(self.db, data_service=self.data_service)
+        self.search_panel.hit_activated.connect(self.open_search_hit)
+
+        content_widget = QWidget()
+        content_layout = QVBoxLayout(content_widget)
+        content_layout.setContentsMargins(0, 0, 0, 0)
+        content_layout.setSpacing(0)
+        content_layout.addWidget(self.search_panel)
+        content_layout.addWidget(self.stack_widget, 1)
+
         # 布局
         main_layout.addWidget(nav_frame)
-        main_layout.addWidget(self.stack_widget, 1)
-        
+        main_layout.addWidget(content_widget, 1)
+
+        # 导出数据库耗时指标（界面卡顿时用于查找慢查询）
+        metrics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+M"), self)
+        metrics_shortcut.activated.connect(self.export_db_metrics)
+        
+    def closeEvent(self, event):
+        """关闭窗口时释放数据库连接"""
+        if hasattr(self, 'overview_page'):
+            self.overview_page.timer.stop()
+        if hasattr(self, 'rollover_service'):
+            self.rollover_service.stop()
+        if hasattr(self, 'data_service'):
+            self.data_service.shutdown()
+        self.db.close()
+        super().closeEvent(event)
+
+    def export_db_metrics(self):
+        """把数据库方法和语句的耗时指标写入日志目录（JSON 和 Prometheus 文本格式）"""
+        try:
+            paths = self.db.export_metrics()
+        except OSError as e:
+            QMessageBox.warning(self, "错误", f"无法导出性能数据：\n{str(e)}")
+            return
+        QMessageBox.information(self, "性能数据已导出", "\n".join(paths))
+
+    def on_date_changed(self, new_date: str):
+        """日期变化后刷新所有页面（任务的计划中/进行中/已超时状态可能已变化）"""
+        # 日期变化不会改变数据库内容，需要强制刷新
+        self.overview_page.refresh_data(force=True)
+        self.project_list_page.refresh_projects(force=True)
+        self.project_list_page.refresh_tasks()
+        self.history_page.refresh_projects(force=True)
+        self.history_page.refresh_tasks()
+
     def on_nav_changed(self, index):
         self.stack_widget.setCurrentIndex(index)
 
@@ -210,6 +272,17 @@ class MainWindow(QMainWindow):
         elif index == 2 and hasattr(self, 'history_page'):
             self.history_page.refresh_projects()
     
+    def open_search_hit(self, hit):
+        """跳转到搜索结果：进行中的项目在项目列表中打开，已完成/已归档的在历史页面中打开"""
+        task_id = hit.entity_id if hit.entity_type == 'task' else None
+        if hit.project_status in ('completed', 'archived'):
+            self.nav_list.setCurrentRow(2)
+            self.history_page.load_project_detail(hit.project_id)
+        else:
+            self.nav_list.setCurrentRow(1)
+            # 等待页面切换完成后再调用选择方法
+            QTimer.singleShot(50, lambda: self.project_list_page.select_project_and_task(hit.project_id, task_id))
+
     def show_db_settings(self):
         """显示数据库设置对话框"""
         dialog = QDialog(self)
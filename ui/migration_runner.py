@@ -0,0 +1,76 @@
+"""
+数据库迁移运行器：在工作线程中升级数据库结构，GUI 线程显示进度窗口
+"""
+import logging
+import threading
+from PySide6.QtCore import QObject, Signal, QEventLoop, Qt
+from PySide6.QtWidgets import QProgressDialog
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationWorker(QObject):
+    """在后台线程执行 db.init_database()，进度和结果通过信号回到 GUI 线程"""
+
+    # (步骤说明, 已完成, 总数)
+    progress = Signal(str, int, int)
+    # 迁移结束，参数为异常对象（成功时为 None）
+    finished = Signal(object)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="db-migration", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        error = None
+        try:
+            self.db.init_database(progress=self.progress.emit)
+        except Exception as e:
+            error = e
+            logger.exception("数据库迁移失败")
+        finally:
+            # 迁移线程随后退出，释放它打开的连接
+            self.db.close_thread_connections()
+        self.finished.emit(error)
+
+
+def run_migrations_with_progress(db, parent=None):
+    """执行数据库迁移并在耗时较长时显示进度窗口，迁移失败时抛出异常
+
+    迁移在工作线程中进行，等待期间事件循环继续运行，界面不会失去响应。
+    """
+    dialog = QProgressDialog("正在升级数据库，请稍候…", None, 0, 0, parent)
+    dialog.setWindowTitle("Project Tracing")
+    dialog.setWindowModality(Qt.ApplicationModal)
+    # 迁移很快完成时不显示窗口
+    dialog.setMinimumDuration(500)
+    dialog.setAutoClose(False)
+    dialog.setAutoReset(False)
+
+    loop = QEventLoop()
+    result = {}
+
+    def on_progress(description: str, done: int, total: int):
+        dialog.setLabelText(f"正在升级数据库：{description}（{done}/{total}）")
+        dialog.setMaximum(max(total, 1))
+        dialog.setValue(min(done, max(total, 1)))
+
+    def on_finished(error):
+        result["error"] = error
+        loop.quit()
+
+    worker = MigrationWorker(db)
+    worker.progress.connect(on_progress)
+    worker.finished.connect(on_finished)
+    worker.start()
+    # finished 以队列连接投递，总是在事件循环内被处理
+    loop.exec()
+    dialog.close()
+
+    if result.get("error") is not None:
+        raise result["error"]
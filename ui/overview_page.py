@@ -2,12 +2,14 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QPushButton, QGroupBox, QTableWidget, QTableWidgetItem,
                                QSplitter, QFrame, QAbstractItemView, QHeaderView,
                                QStyledItemDelegate, QStyleOptionViewItem, QGridLayout,
-                               QListWidget, QListWidgetItem, QSizePolicy)
+                               QListWidget, QListWidgetItem, QSizePolicy, QMessageBox)
 from PySide6.QtCore import Qt, QTimer, QMimeData, QByteArray, QDataStream, QIODevice, QSize
 from PySide6.QtGui import QColor, QPainter, QDragEnterEvent, QDropEvent
 from database import Database
 from datetime import datetime
 from models import Status
+from ui.refresh_guard import RefreshGuard
+from ui.data_service import DataService
 
 class TaskItemWidget(QWidget):
     """任务项自定义 widget，包含任务信息和完成按钮"""
@@ -109,8 +111,8 @@ class TaskItemWidget(QWidget):
         
         main_layout.addLayout(info_layout, 1)
         
-        # 右侧：完成按钮（如果任务未完成）
-        if task.status.value != 'completed':
+        # 右侧：完成按钮（如果任务未完成，只读模式下不显示）
+        if task.status.value != 'completed' and not overview_page.db.read_only:
             complete_btn = QPushButton("✓ 完成")
             complete_btn.setStyleSheet("""
                 QPushButton {
@@ -145,13 +147,10 @@ class TaskItemWidget(QWidget):
     def on_complete_clicked(self):
         """完成按钮点击事件"""
         if self.task and self.overview_page:
-            # 更新任务状态为完成
-            self.overview_page.db.update_task(
-                self.task.id,
-                status=Status.COMPLETED.value
-            )
-            # 刷新数据显示
-            self.overview_page.refresh_data()
+            # 更新任务状态为完成，写入完成后刷新数据显示
+            page = self.overview_page
+            page.submit_write(page.db.update_task, self.task.id, status=Status.COMPLETED.value,
+                              on_done=lambda _: page.refresh_data())
 
 class DraggableTaskListWidget(QListWidget):
     """可拖拽的任务列表组件"""
@@ -159,10 +158,11 @@ class DraggableTaskListWidget(QListWidget):
         super().__init__(parent)
         self.quadrant_widget = quadrant_widget  # 所属象限
         self.overview_page = overview_page  # 总览页面引用
-        # 启用拖拽
-        self.setDragDropMode(QAbstractItemView.DragDrop)
+        # 启用拖拽（拖到其他象限会修改任务的重要/紧急，只读模式下不允许）
+        read_only = overview_page.db.read_only
+        self.setDragDropMode(QAbstractItemView.NoDragDrop if read_only else QAbstractItemView.DragDrop)
         self.setDefaultDropAction(Qt.MoveAction)
-        self.setAcceptDrops(True)
+        self.setAcceptDrops(not read_only)
         self.setSelectionMode(QAbstractItemView.SingleSelection)
         # 存储正在拖拽的项
         self.dragged_item = None
@@ -229,16 +229,16 @@ class DraggableTaskListWidget(QListWidget):
                     target_is_important = self.quadrant_widget.is_important
                     target_is_urgent = self.quadrant_widget.is_urgent
                     
-                    # 更新任务的标签
-                    self.overview_page.db.update_task(
+                    # 更新任务的标签，写入完成后刷新所有象限的显示
+                    page = self.overview_page
+                    page.submit_write(
+                        page.db.update_task,
                         task_id,
                         is_important=target_is_important,
-                        is_urgent=target_is_urgent
+                        is_urgent=target_is_urgent,
+                        on_done=lambda _: page.refresh_data()
                     )
                     
-                    # 刷新所有象限的显示
-                    self.overview_page.refresh_data()
-                    
                     event.acceptProposedAction()
                     return
         
@@ -279,10 +279,17 @@ class StatusItemDelegate(QStyledItemDelegate):
         painter.drawText(option.rect, Qt.AlignCenter, text)
 
 class OverviewPage(QWidget):
-    def __init__(self, db: Database, main_window=None):
+    def __init__(self, db: Database, main_window=None, data_service: DataService = None):
         super().__init__()
         self.db = db
         self.main_window = main_window  # 用于跳转到项目详情
+        # 数据库查询在工作线程执行，加载期间继续显示旧数据
+        self.data_service = data_service or DataService(self)
+        self._loading = False
+        self._reload_pending = False
+        self._reload_force = False
+        # 数据库未变化时跳过定时刷新
+        self.refresh_guard = RefreshGuard(db)
         self.init_ui()
         self.refresh_data()
         
@@ -362,6 +369,7 @@ class OverviewPage(QWidget):
         
         # ========== 右侧：任务分类（按象限） ==========
         tasks_widget = QGroupBox("今日任务")
+        self.tasks_group = tasks_widget
         tasks_widget.setStyleSheet("""
             QGroupBox {
                 font-size: 16px;
@@ -411,7 +419,9 @@ class OverviewPage(QWidget):
         
         # 刷新按钮
         refresh_btn = QPushButton("🔄 刷新数据")
-        refresh_btn.clicked.connect(self.refresh_data)
+        # 手动刷新总是重新加载
+        refresh_btn.clicked.connect(lambda: self.refresh_data(force=True))
+        self.refresh_btn = refresh_btn
         refresh_btn.setStyleSheet("""
             QPushButton {
                 padding: 10px 18px;
@@ -538,54 +548,80 @@ class OverviewPage(QWidget):
         
         return quadrant
     
-    def refresh_data(self):
-        """刷新所有数据"""
-        # 获取所有项目和任务
-        projects = self.db.get_all_projects()
-        all_tasks = []
-        for p in projects:
-            all_tasks.extend(self.db.get_tasks_by_project(p.id))
-        
-        self.all_tasks_data = all_tasks
-        
-        # 获取今日任务（用于统计）
-        today_tasks = self.db.get_today_tasks()
+    def refresh_data(self, force=False):
+        """刷新所有数据；数据库自上次加载后没有变化时跳过（force=True 时总是刷新）"""
+        if self._loading:
+            # 正在加载时合并请求，加载完成后再刷新一次
+            self._reload_pending = True
+            self._reload_force = self._reload_force or force
+            return
+        self._set_loading(True)
+        self.data_service.submit(
+            self._load_snapshot, force,
+            on_done=self._on_snapshot_loaded,
+            on_error=self._on_load_failed,
+        )
+
+    def submit_write(self, fn, *args, on_done=None, **kwargs):
+        """在工作线程中执行写操作；完成后在 GUI 线程调用 on_done(result)，失败时提示"""
+        self.data_service.submit(fn, *args, on_done=on_done, on_error=self._on_write_failed, **kwargs)
+
+    def _on_write_failed(self, error):
+        QMessageBox.warning(self, "错误", f"无法保存到数据库：\n{error}")
+        self.refresh_data(force=True)
+
+    def _load_snapshot(self, force):
+        """在工作线程中执行：数据未变化时返回 None"""
+        if not self.refresh_guard.should_refresh(force):
+            return None
+        # 项目、任务、今日任务和统计来自同一个读事务
+        return self.db.get_overview_snapshot()
+
+    def _set_loading(self, loading: bool):
+        self._loading = loading
+        self.tasks_group.setTitle("今日任务（加载中…）" if loading else "今日任务")
+
+    def _on_load_finished(self):
+        self._set_loading(False)
+        stats = self.refresh_guard.stats()
+        self.refresh_btn.setToolTip(f"已刷新 {stats['refreshed']} 次，数据未变化跳过 {stats['skipped']} 次")
+        if self._reload_pending:
+            force = self._reload_force
+            self._reload_pending = False
+            self._reload_force = False
+            self.refresh_data(force)
+
+    def _on_load_failed(self, error):
+        # 加载失败时保留旧数据，下次刷新重新加载
+        self.refresh_guard.reset()
+        self._on_load_finished()
+
+    def _on_snapshot_loaded(self, snapshot):
+        if snapshot is not None:
+            self.apply_snapshot(snapshot)
+        self._on_load_finished()
+
+    def apply_snapshot(self, snapshot):
+        """用快照数据更新统计信息和象限任务列表"""
+        stats = snapshot.stats
+
+        self.all_tasks_data = [t for tasks in snapshot.quadrant_tasks.values() for t in tasks]
         
         # 更新统计信息
-        self.total_projects_widget.text_label.setText(f"总项目数: {len(projects)}")
-        
-        active_projects = sum(1 for p in projects if p.status == 'in_progress')
-        self.active_projects_widget.text_label.setText(f"进行中项目: {active_projects}")
-        
-        self.total_tasks_widget.text_label.setText(f"总任务数: {len(all_tasks)}")
-        
-        active_tasks = sum(1 for t in all_tasks if t.status.value == 'in_progress')
-        self.active_tasks_widget.text_label.setText(f"进行中任务: {active_tasks}")
-        
-        overdue_tasks = sum(1 for t in all_tasks if t.status.value == 'overdue')
-        self.overdue_tasks_widget.text_label.setText(f"已超时任务: {overdue_tasks}")
-        
-        self.today_tasks_widget.text_label.setText(f"今日任务: {len(today_tasks)}")
+        self.total_projects_widget.text_label.setText(f"总项目数: {stats['total_projects']}")
+        self.active_projects_widget.text_label.setText(f"进行中项目: {stats['active_projects']}")
+        self.total_tasks_widget.text_label.setText(f"总任务数: {stats['total_tasks']}")
+        self.active_tasks_widget.text_label.setText(f"进行中任务: {stats['active_tasks']}")
+        self.overdue_tasks_widget.text_label.setText(f"已超时任务: {stats['overdue_tasks']}")
+        self.today_tasks_widget.text_label.setText(f"今日任务: {stats['today_tasks']}")
         
         # 更新象限任务列表
-        self.update_quadrants_tasks(all_tasks)
+        self.update_quadrants_tasks(snapshot.quadrant_tasks, snapshot.projects)
     
-    def update_quadrants_tasks(self, tasks):
-        """更新象限任务列表"""
+    def update_quadrants_tasks(self, quadrant_tasks, projects):
+        """更新象限任务列表（quadrant_tasks 已按象限分组，只含进行中和已超时的任务）"""
         # 获取项目映射
-        projects = {p.id: p for p in self.db.get_all_projects()}
-        
-        # 按象限分类任务
-        quadrant_tasks = {
-            (True, True): [],   # 重要紧急
-            (False, True): [],  # 不重要紧急
-            (True, False): [],  # 重要不紧急
-            (False, False): []  # 不重要不紧急
-        }
-        
-        for task in tasks:
-            key = (task.is_important, task.is_urgent)
-            quadrant_tasks[key].append(task)
+        projects = {p.id: p for p in projects}
         
         # 更新每个象限的显示
         for (is_important, is_urgent), quadrant in self.quadrant_widgets.items():
@@ -593,9 +629,6 @@ class OverviewPage(QWidget):
             task_list.clear()
             
             for task in quadrant_tasks[(is_important, is_urgent)]:
-                # 已完成或计划中的任务不在总览显示
-                if task.status.value in ('completed', 'planned'):
-                    continue
                 project = projects.get(task.project_id)
                 project_name = project.name if project else "未知项目"
                 
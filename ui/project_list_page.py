@@ -5,13 +5,18 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QGroupBox, QGridLayout, QDateEdit, QScrollArea,
                                QFileDialog, QStyledItemDelegate, QStyleOptionViewItem,
                                QSizePolicy, QCheckBox, QStyle)
-from PySide6.QtCore import Qt, QDate, QUrl, QTimer
+from PySide6.QtCore import Qt, QDate, QUrl, QTimer, QRect
 from PySide6.QtGui import QDesktopServices, QColor, QPainter
 from database import Database
 from models import Status
+from ui.refresh_guard import RefreshGuard
+from ui.data_service import DataService
 import os
 from datetime import datetime
 
+# 项目列表中保存项目进度（ProjectProgress）的数据角色
+PROJECT_PROGRESS_ROLE = Qt.UserRole + 1
+
 class StatusItemDelegate(QStyledItemDelegate):
     """自定义委托，用于绘制状态列，确保选中时也保持原背景色"""
     def paint(self, painter, option, index):
@@ -47,7 +52,7 @@ class StatusItemDelegate(QStyledItemDelegate):
         painter.drawText(option.rect, Qt.AlignCenter, text)
 
 class ProjectItemDelegate(QStyledItemDelegate):
-    """自定义委托，用于绘制项目列表，处理置顶项目的背景色"""
+    """自定义委托，用于绘制项目列表，处理置顶项目的背景色，并在右侧显示任务进度"""
     def paint(self, painter, option, index):
         # 获取背景色
         bg_color = index.data(Qt.BackgroundRole)
@@ -79,16 +84,57 @@ class ProjectItemDelegate(QStyledItemDelegate):
         font.setPointSize(15)
         painter.setFont(font)
         
+        # 右侧绘制进度（已完成/总数），有超时任务时用红色标出数量
+        text_rect = QRect(option.rect)
+        progress = index.data(PROJECT_PROGRESS_ROLE)
+        if progress is not None and progress.total:
+            pen = painter.pen()
+            small_font = painter.font()
+            small_font.setPointSize(12)
+            painter.setFont(small_font)
+            progress_text = f"{progress.completed}/{progress.total}"
+            metrics = painter.fontMetrics()
+            progress_width = metrics.horizontalAdvance(progress_text)
+            right = option.rect.right() - 8
+            painter.setPen(QColor("#8a8a8a"))
+            painter.drawText(right - progress_width, option.rect.top(), progress_width, option.rect.height(),
+                             Qt.AlignRight | Qt.AlignVCenter, progress_text)
+            right -= progress_width + 8
+            if progress.overdue:
+                overdue_text = f"超时 {progress.overdue}"
+                overdue_width = metrics.horizontalAdvance(overdue_text)
+                painter.setPen(QColor("#d32f2f"))
+                painter.drawText(right - overdue_width, option.rect.top(), overdue_width, option.rect.height(),
+                                 Qt.AlignRight | Qt.AlignVCenter, overdue_text)
+                right -= overdue_width + 8
+            painter.setFont(font)
+            painter.setPen(pen)
+            text_rect.setRight(right)
+
         # 绘制文字
         text = index.data(Qt.DisplayRole) or ""
-        painter.drawText(option.rect, Qt.AlignLeft | Qt.AlignVCenter, text)
+        text = painter.fontMetrics().elidedText(text, Qt.ElideRight, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, text)
 
 class ProjectListPage(QWidget):
-    def __init__(self, db):
+    def __init__(self, db, data_service: DataService = None):
         super().__init__()
         self.db = db
         self.current_project_id = None
         self.current_projects = []
+        # 任务列表在工作线程中加载
+        self.data_service = data_service or DataService(self)
+        self._tasks_loading_jobs = 0
+        self._pending_scroll_task_id = None
+        # 项目列表同样在工作线程中加载；加载期间的刷新请求合并为一次
+        self._projects_loading = False
+        self._projects_reload_pending = False
+        self._projects_reload_force = False
+        self._after_projects_loaded = []
+        # 描述被截断的任务 {task_id: 描述标签}，完整描述在工作线程中加载后替换
+        self._truncated_descriptions = {}
+        # 数据库未变化时跳过项目列表刷新
+        self.refresh_guard = RefreshGuard(db)
         self.init_ui()
         self.refresh_projects()
     
@@ -108,6 +154,7 @@ class ProjectListPage(QWidget):
         
         # 新建项目按钮（在列表最上方）
         add_project_btn = QPushButton("➕ 新建项目")
+        self.add_project_btn = add_project_btn
         add_project_btn.clicked.connect(self.create_project)
         add_project_btn.setStyleSheet("""
             QPushButton {
@@ -279,6 +326,7 @@ class ProjectListPage(QWidget):
         path_layout.addWidget(self.project_path_edit)
         
         select_path_btn = QPushButton("选择")
+        self.select_project_path_btn = select_path_btn
         select_path_btn.clicked.connect(self.select_project_path)
         select_path_btn.setMinimumWidth(80)
         select_path_btn.setStyleSheet("""
@@ -381,6 +429,7 @@ class ProjectListPage(QWidget):
         
         # 下方：任务列表（占比大）
         tasks_widget = QGroupBox("任务列表")
+        self.tasks_group = tasks_widget
         tasks_widget.setStyleSheet("""
             QGroupBox {
                 font-size: 16px;
@@ -428,6 +477,8 @@ class ProjectListPage(QWidget):
         """)
         self.add_task_btn = add_task_btn
         task_toolbar.addWidget(add_task_btn)
+        if self.db.read_only:
+            self._apply_read_only()
         task_toolbar.addStretch()
         tasks_layout.addLayout(task_toolbar)
         
@@ -708,34 +759,76 @@ class ProjectListPage(QWidget):
         # 初始化任务编辑相关变量
         self.editing_task_id = None
     
-    def refresh_projects(self):
-        """刷新项目列表"""
-        projects = self.db.get_all_projects()  # 不包括已完成和已归档的
-
-        def parse_updated_at(value: str):
-            try:
-                return datetime.fromisoformat(value)
-            except Exception:
-                return datetime(1970, 1, 1)
+    def refresh_projects(self, force=False, on_loaded=None):
+        """刷新项目列表（在工作线程中加载）；数据库自上次加载后没有变化时跳过（force=True 时总是刷新）
 
-        sorted_projects = sorted(
-            projects,
-            key=lambda p: (
-                0 if getattr(p, 'is_pinned', False) else 1,
-                -parse_updated_at(p.updated_at).timestamp()
-            )
+        on_loaded() 在本次及之前合并的加载完成后调用。
+        """
+        if on_loaded is not None:
+            self._after_projects_loaded.append(on_loaded)
+        if self._projects_loading:
+            # 正在加载时合并请求，加载完成后再刷新一次
+            self._projects_reload_pending = True
+            self._projects_reload_force = self._projects_reload_force or force
+            return
+        self._projects_loading = True
+        self.data_service.submit(
+            self._load_projects, force,
+            on_done=self._on_projects_loaded,
+            on_error=self._on_projects_load_failed,
         )
 
-        self.current_projects = sorted_projects
+    def _load_projects(self, force):
+        """在工作线程中执行：数据未变化时返回 None，否则返回 (项目列表, 各项目进度)"""
+        if not self.refresh_guard.should_refresh(force):
+            return None
+        # 不包括已完成和已归档的；数据库已按置顶、更新时间倒序排好（使用索引 idx_projects_active）。
+        # 各项目的任务进度在 SQL 中计数，不加载任务
+        return self.db.get_all_projects(), self.db.get_project_progress()
+
+    def _on_projects_loaded(self, result):
+        if result is not None:
+            self.populate_projects(*result)
+        self._on_projects_load_finished()
+
+    def _on_projects_load_failed(self, error):
+        # 加载失败时保留旧数据，下次刷新重新加载
+        self.refresh_guard.reset()
+        self._on_projects_load_finished()
+
+    def _on_projects_load_finished(self):
+        self._projects_loading = False
+        if self._projects_reload_pending:
+            force = self._projects_reload_force
+            self._projects_reload_pending = False
+            self._projects_reload_force = False
+            self.refresh_projects(force)
+            return
+        callbacks, self._after_projects_loaded = self._after_projects_loaded, []
+        for callback in callbacks:
+            callback()
+
+    def populate_projects(self, projects, progress_by_project):
+        """用项目列表和各项目进度填充项目表格，并重新选中当前项目"""
+        self.current_projects = projects
         self.projects_table.setRowCount(len(self.current_projects))
         
         for row, project in enumerate(self.current_projects):
             item = QTableWidgetItem(project.name)
             item.setData(Qt.UserRole, project.id)
+            progress = progress_by_project.get(project.id)
+            if progress is not None:
+                item.setData(PROJECT_PROGRESS_ROLE, progress)
+                if progress.total:
+                    tooltip = f"{project.name}\n已完成 {progress.completed}/{progress.total} 个任务"
+                    if progress.overdue:
+                        tooltip += f"，{progress.overdue} 个已超时"
+                    item.setToolTip(tooltip)
             if getattr(project, 'is_pinned', False):
                 # 使用 setData 设置背景色，这样委托可以正确处理
                 item.setData(Qt.BackgroundRole, QColor("#e8f2ff"))
             self.projects_table.setItem(row, 0, item)
+        self._reselect_current_project()
     
     def on_project_selected(self):
         """当选择项目时"""
@@ -775,13 +868,39 @@ class ProjectListPage(QWidget):
         self.refresh_tasks()
     
     def refresh_tasks(self):
-        """刷新任务列表"""
+        """刷新任务列表（在工作线程中加载，加载期间保留当前显示）"""
         if not self.current_project_id:
             self.tasks_table.setRowCount(0)
+            self._truncated_descriptions = {}
             return
         
-        tasks = self.db.get_tasks_by_project(self.current_project_id)
+        project_id = self.current_project_id
+        self._set_tasks_loading(+1)
+        self.data_service.submit(
+            self.db.get_tasks_by_project, project_id,
+            on_done=lambda tasks: self._on_tasks_loaded(project_id, tasks),
+            on_error=lambda error: self._set_tasks_loading(-1),
+        )
 
+    def _set_tasks_loading(self, delta: int):
+        self._tasks_loading_jobs += delta
+        self.tasks_group.setTitle("任务列表（加载中…）" if self._tasks_loading_jobs > 0 else "任务列表")
+
+    def _on_tasks_loaded(self, project_id, tasks):
+        self._set_tasks_loading(-1)
+        # 加载期间已切换到其他项目，丢弃过期结果
+        if project_id != self.current_project_id:
+            return
+        self.populate_tasks(tasks)
+        # 同一项目可能有多次加载在排队，最后一次完成后再定位
+        if self._pending_scroll_task_id and self._tasks_loading_jobs == 0:
+            task_id = self._pending_scroll_task_id
+            self._pending_scroll_task_id = None
+            # 等待行高调整完成后再定位
+            QTimer.singleShot(50, lambda: self._scroll_to_task(task_id))
+
+    def populate_tasks(self, tasks):
+        """用任务数据填充任务表格"""
         def parse_date(date_str: str):
             try:
                 return datetime.strptime(date_str, "%Y-%m-%d")
@@ -807,6 +926,7 @@ class ProjectListPage(QWidget):
         )
 
         self.tasks_table.setRowCount(len(sorted_tasks))
+        self._truncated_descriptions = {}
         
         status_map = {
             'planned': '计划中',
@@ -850,9 +970,12 @@ class ProjectListPage(QWidget):
             status_item.setFlags(status_item.flags() & ~Qt.ItemIsEditable)
             self.tasks_table.setItem(i, 3, status_item)
             
-            # 描述列使用 QLabel 显示完整文本
+            # 描述列使用 QLabel 显示完整文本；列表查询只返回预览，被截断的先显示预览（以 … 结尾）
             desc_text = self.format_task_description(task)
             desc_label = QLabel(desc_text)
+            if task.is_preview and len(task.description) > Database.PREVIEW_CHARS:
+                desc_label.setToolTip("正在加载完整描述…")
+                self._truncated_descriptions[task.id] = desc_label
             desc_label.setWordWrap(True)
             desc_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)  # 垂直居中
             desc_label.setContentsMargins(8, 6, 8, 6)
@@ -942,12 +1065,43 @@ class ProjectListPage(QWidget):
             btn_layout.addWidget(delete_btn)
             
             btn_layout.addStretch()
-            self.tasks_table.setCellWidget(i, 6, btn_widget)
+            # 只读模式下不显示编辑/删除按钮
+            if not self.db.read_only:
+                self.tasks_table.setCellWidget(i, 6, btn_widget)
         
         # 所有行设置完成后，统一调整行高
         # 使用 QTimer 延迟调用，确保所有 widget 已完成布局计算
         QTimer.singleShot(10, self._adjust_all_row_heights)
+
+        if self._truncated_descriptions and self.current_project_id:
+            labels = self._truncated_descriptions
+            # 被截断的描述一次查询取回
+            self.data_service.submit(
+                self.db.get_task_descriptions, self.current_project_id,
+                on_done=lambda descriptions: self._on_full_descriptions_loaded(labels, descriptions),
+            )
+
+    def _on_full_descriptions_loaded(self, labels, descriptions):
+        # 加载期间任务表格已重新填充，标签已失效
+        if labels is not self._truncated_descriptions:
+            return
+        for task_id, description in descriptions.items():
+            label = labels.get(task_id)
+            if label is None:
+                continue
+            label.setText(description.strip() or "-")
+            label.setToolTip("")
+        self._adjust_all_row_heights()
     
+    def _apply_read_only(self):
+        """只读模式：隐藏所有修改数据的按钮，项目信息只能查看"""
+        for button in (self.add_project_btn, self.select_project_path_btn, self.pin_project_btn,
+                       self.save_project_btn, self.complete_project_btn, self.archive_project_btn,
+                       self.delete_project_btn, self.add_task_btn):
+            button.setVisible(False)
+        for editor in (self.project_name_edit, self.project_desc_edit, self.project_path_edit):
+            editor.setReadOnly(True)
+
     def _adjust_all_row_heights(self):
         """调整所有行的行高以适应内容"""
         for row in range(self.tasks_table.rowCount()):
@@ -964,16 +1118,12 @@ class ProjectListPage(QWidget):
         from PySide6.QtWidgets import QInputDialog
         name, ok = QInputDialog.getText(self, "新建项目", "项目名称:")
         if ok and name:
-            project_id = self.db.create_project(name)
-            self.refresh_projects()
-            # 自动选中新创建的项目
-            self.load_project_detail(project_id)
-            # 选中新项目
-            projects = self.db.get_all_projects()
-            for i, p in enumerate(projects):
-                if p.id == project_id:
-                    self.projects_table.selectRow(i)
-                    break
+            self._submit_write(self.db.create_project, name, on_done=self._on_project_created)
+
+    def _on_project_created(self, project_id):
+        # 自动选中新创建的项目（项目列表加载完成后重新选中当前项目）
+        self.load_project_detail(project_id)
+        self.refresh_projects()
     
     def select_project_path(self):
         """选择项目工作路径"""
@@ -1005,16 +1155,15 @@ class ProjectListPage(QWidget):
         if not self.current_project_id:
             return
         
-        self.db.update_project(
+        self._submit_write(
+            self.db.update_project,
             self.current_project_id,
             name=self.project_name_edit.text(),
             description=self.project_desc_edit.toPlainText(),
-            local_path=self.project_path_edit.text().strip()
+            local_path=self.project_path_edit.text().strip(),
+            # 写入完成后刷新项目列表和任务列表
+            on_done=lambda _: (self.refresh_projects(), self.refresh_tasks())
         )
-        
-        # 刷新项目列表和任务列表
-        self.refresh_projects()
-        self.refresh_tasks()
     
     def complete_current_project(self):
         """完成当前项目"""
@@ -1024,28 +1173,9 @@ class ProjectListPage(QWidget):
         reply = QMessageBox.question(self, "确认完成", "确定要完成该项目吗？\n所有任务将自动标记为已完成，项目将移到历史栏。",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.db.complete_project(self.current_project_id)
-            self.current_project_id = None
-            
-            # 清空详情区域
-            self.project_name_edit.clear()
-            self.project_desc_edit.clear()
-            self.project_path_edit.clear()
-            self.save_project_btn.setEnabled(False)
-            self.complete_project_btn.setEnabled(False)
-            self.archive_project_btn.setEnabled(False)
-            self.delete_project_btn.setEnabled(False)
-            self.add_task_btn.setEnabled(False)
-            self.pin_project_btn.setEnabled(False)
-            self.pin_project_btn.setText("置顶")
-            self.tasks_table.setRowCount(0)
-            self.hide_task_form()
-            
-            self.refresh_projects()
-            # 通知主窗口刷新历史页面
-            if hasattr(self, 'main_window') and self.main_window:
-                if hasattr(self.main_window, 'history_page'):
-                    self.main_window.history_page.refresh_projects()
+            project_id = self.current_project_id
+            self._submit_write(self.db.complete_project, project_id,
+                               on_done=lambda _: self._on_project_removed(project_id, to_history=True))
     
     def archive_current_project(self):
         """归档当前项目"""
@@ -1055,28 +1185,9 @@ class ProjectListPage(QWidget):
         reply = QMessageBox.question(self, "确认归档", "确定要归档该项目吗？\n项目将移到历史栏，可以稍后恢复。",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.db.archive_project(self.current_project_id)
-            self.current_project_id = None
-            
-            # 清空详情区域
-            self.project_name_edit.clear()
-            self.project_desc_edit.clear()
-            self.project_path_edit.clear()
-            self.save_project_btn.setEnabled(False)
-            self.complete_project_btn.setEnabled(False)
-            self.archive_project_btn.setEnabled(False)
-            self.delete_project_btn.setEnabled(False)
-            self.add_task_btn.setEnabled(False)
-            self.pin_project_btn.setEnabled(False)
-            self.pin_project_btn.setText("置顶")
-            self.tasks_table.setRowCount(0)
-            self.hide_task_form()
-            
-            self.refresh_projects()
-            # 通知主窗口刷新历史页面
-            if hasattr(self, 'main_window') and self.main_window:
-                if hasattr(self.main_window, 'history_page'):
-                    self.main_window.history_page.refresh_projects()
+            project_id = self.current_project_id
+            self._submit_write(self.db.archive_project, project_id,
+                               on_done=lambda _: self._on_project_removed(project_id, to_history=True))
     
     def delete_current_project(self):
         """删除当前项目"""
@@ -1086,10 +1197,14 @@ class ProjectListPage(QWidget):
         reply = QMessageBox.question(self, "确认删除", "确定要删除该项目及其所有任务吗？",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.db.delete_project(self.current_project_id)
+            project_id = self.current_project_id
+            self._submit_write(self.db.delete_project, project_id,
+                               on_done=lambda _: self._on_project_removed(project_id))
+
+    def _on_project_removed(self, project_id, to_history=False):
+        """完成、归档或删除写入完成后清空详情区域并刷新项目列表"""
+        if project_id == self.current_project_id:
             self.current_project_id = None
-            
-            # 清空详情区域
             self.project_name_edit.clear()
             self.project_desc_edit.clear()
             self.project_path_edit.clear()
@@ -1101,9 +1216,22 @@ class ProjectListPage(QWidget):
             self.pin_project_btn.setEnabled(False)
             self.pin_project_btn.setText("置顶")
             self.tasks_table.setRowCount(0)
+            self._truncated_descriptions = {}
             self.hide_task_form()
-            
-            self.refresh_projects()
+
+        self.refresh_projects()
+        # 通知主窗口刷新历史页面
+        if to_history and hasattr(self, 'main_window') and self.main_window:
+            if hasattr(self.main_window, 'history_page'):
+                self.main_window.history_page.refresh_projects()
+
+    def _submit_write(self, fn, *args, on_done=None, **kwargs):
+        """在工作线程中执行写操作；完成后在 GUI 线程调用 on_done(result)，失败时提示"""
+        self.data_service.submit(fn, *args, on_done=on_done, on_error=self._on_write_failed, **kwargs)
+
+    def _on_write_failed(self, error):
+        QMessageBox.warning(self, "错误", f"无法保存到数据库：\n{error}")
+        self.refresh_projects(force=True)
     
     def select_task_path(self):
         """选择任务工作路径"""
@@ -1175,8 +1303,7 @@ class ProjectListPage(QWidget):
         if not self.current_project_id:
             return
         
-        tasks = self.db.get_tasks_by_project(self.current_project_id)
-        task = next((t for t in tasks if t.id == task_id), None)
+        task = self.db.get_task(task_id)
         
         if not task:
             return
@@ -1237,7 +1364,8 @@ class ProjectListPage(QWidget):
         # 保存到数据库（状态会根据时间自动更新）
         if self.editing_task_id:
             # 更新任务（不更新状态，状态会自动更新）
-            self.db.update_task(
+            self._submit_write(
+                self.db.update_task,
                 self.editing_task_id,
                 name=self.task_name_edit.text().strip(),
                 start_date=start_date,
@@ -1246,13 +1374,13 @@ class ProjectListPage(QWidget):
                 notes="",
                 local_path=self.task_path_edit.text().strip(),
                 is_important=is_important,
-                is_urgent=is_urgent
+                is_urgent=is_urgent,
+                on_done=self._on_task_saved
             )
-            # 更新后自动刷新状态
-            self.db.update_task_status_auto()
         else:
             # 创建新任务（状态会根据时间自动设置）
-            self.db.create_task(
+            self._submit_write(
+                self.db.create_task,
                 self.current_project_id,
                 self.task_name_edit.text().strip(),
                 start_date,
@@ -1261,16 +1389,15 @@ class ProjectListPage(QWidget):
                 "",
                 self.task_path_edit.text().strip(),
                 is_important=is_important,
-                is_urgent=is_urgent
+                is_urgent=is_urgent,
+                on_done=self._on_task_saved
             )
-            # 创建后自动更新状态
-            self.db.update_task_status_auto()
-        
+
+    def _on_task_saved(self, _):
         # 刷新任务列表并隐藏表单
         self.refresh_tasks()
         # 刷新项目列表以反映任务状态变化
         self.refresh_projects()
-        self._reselect_current_project()
         # 通知总览页面刷新数据
         if hasattr(self, 'main_window') and self.main_window:
             if hasattr(self.main_window, 'overview_page'):
@@ -1282,8 +1409,7 @@ class ProjectListPage(QWidget):
         reply = QMessageBox.question(self, "确认删除", "确定要删除该任务吗？",
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.db.delete_task(task_id)
-            self.refresh_tasks()
+            self._submit_write(self.db.delete_task, task_id, on_done=lambda _: self.refresh_tasks())
 
     def _reselect_current_project(self):
         """刷新项目列表后重新选中当前项目"""
@@ -1291,14 +1417,18 @@ class ProjectListPage(QWidget):
             return
         for row, project in enumerate(self.current_projects):
             if project.id == self.current_project_id:
+                # 只恢复选中状态，不重新加载详情
+                self.projects_table.blockSignals(True)
                 self.projects_table.selectRow(row)
+                self.projects_table.blockSignals(False)
                 break
     
     def select_project_and_task(self, project_id: str, task_id: str = None):
         """选择项目并定位到指定任务（用于从总览页面跳转）"""
         # 先刷新项目列表，确保项目在列表中
-        self.refresh_projects()
-        
+        self.refresh_projects(on_loaded=lambda: self._select_project_and_task(project_id, task_id))
+
+    def _select_project_and_task(self, project_id: str, task_id: str = None):
         # 在项目列表中找到并选中指定的项目
         project_row = -1
         for i, project in enumerate(self.current_projects):
@@ -1316,10 +1446,9 @@ class ProjectListPage(QWidget):
         # 加载项目详情（这会刷新任务列表）
         self.load_project_detail(project_id)
         
-        # 如果指定了任务ID，定位到该任务
+        # 如果指定了任务ID，任务列表加载完成后定位到该任务
         if task_id:
-            # 等待任务列表刷新完成后再定位
-            QTimer.singleShot(100, lambda: self._scroll_to_task(task_id))
+            self._pending_scroll_task_id = task_id
     
     def _scroll_to_task(self, task_id: str):
         """滚动到指定的任务行"""
@@ -1349,12 +1478,15 @@ class ProjectListPage(QWidget):
             return
 
         new_state = not getattr(project, 'is_pinned', False)
-        self.db.update_project(self.current_project_id, is_pinned=new_state)
+        self._submit_write(self.db.update_project, self.current_project_id, is_pinned=new_state,
+                           on_done=self._on_pin_toggled)
 
+    def _on_pin_toggled(self, _):
+        if not self.current_project_id:
+            return
         # 刷新列表和详情
-        self.refresh_projects()
-        self._reselect_current_project()
         self.load_project_detail(self.current_project_id)
+        self.refresh_projects()
         
         # 通知其他页面刷新数据
         if hasattr(self, 'main_window') and self.main_window:
@@ -0,0 +1,32 @@
+"""
+刷新守卫：记录页面上次加载数据时的数据库变化标识，数据未变化时跳过刷新
+"""
+from database import Database
+
+
+class RefreshGuard:
+    def __init__(self, db: Database):
+        self.db = db
+        self.last_token = None
+        self.refreshed_count = 0
+        self.skipped_count = 0
+
+    def should_refresh(self, force: bool = False) -> bool:
+        """判断是否需要重新加载；返回 True 时同时记录当前标识"""
+        token = self.db.get_change_token()
+        if not force and token == self.last_token:
+            self.skipped_count += 1
+            return False
+        self.last_token = token
+        self.refreshed_count += 1
+        return True
+
+    def reset(self):
+        """强制下一次刷新重新加载"""
+        self.last_token = None
+
+    def stats(self) -> dict:
+        return {
+            'refreshed': self.refreshed_count,
+            'skipped': self.skipped_count,
+        }
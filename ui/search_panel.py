@@ -0,0 +1,161 @@
+"""
+全局搜索栏：输入时增量搜索项目和任务（全文索引），选中结果后跳转到对应页面
+"""
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
+                               QComboBox, QListWidget, QListWidgetItem)
+from PySide6.QtCore import Qt, Signal, QTimer
+from database import Database
+from ui.data_service import DataService
+
+
+class SearchPanel(QWidget):
+    # 用户选中了一条搜索结果（SearchHit）
+    hit_activated = Signal(object)
+
+    # 停止输入多久后开始搜索（毫秒）
+    DEBOUNCE_MS = 120
+    RESULT_LIMIT = 50
+
+    def __init__(self, db: Database, data_service: DataService = None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.data_service = data_service or DataService(self)
+        # 同一时间只有一个搜索在工作线程中执行，期间的输入只保留最新的一次
+        self._searching = False
+        self._pending_query = None
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._start_search)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(12, 12, 12, 0)
+        layout.setSpacing(6)
+
+        bar_layout = QHBoxLayout()
+        bar_layout.setSpacing(8)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("🔍 搜索项目和任务（名称、描述、备注）")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(lambda _: self._debounce.start())
+        self.search_edit.returnPressed.connect(self._activate_first)
+        bar_layout.addWidget(self.search_edit, 1)
+
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItem("全部", "all")
+        self.scope_combo.addItem("项目", "projects")
+        self.scope_combo.addItem("任务", "tasks")
+        self.scope_combo.currentIndexChanged.connect(lambda _: self._start_search())
+        bar_layout.addWidget(self.scope_combo)
+        layout.addLayout(bar_layout)
+
+        self.results_list = QListWidget()
+        self.results_list.setMaximumHeight(320)
+        self.results_list.setWordWrap(True)
+        self.results_list.itemActivated.connect(self._on_item_activated)
+        self.results_list.itemClicked.connect(self._on_item_activated)
+        self.results_list.hide()
+        layout.addWidget(self.results_list)
+
+        self.setStyleSheet("""
+            QLineEdit {
+                font-size: 14px;
+                padding: 8px 10px;
+                border: 2px solid #e0e0e0;
+                background-color: #ffffff;
+                min-height: 20px;
+            }
+            QLineEdit:focus {
+                border: 2px solid #0078d4;
+            }
+            QComboBox {
+                font-size: 14px;
+                padding: 8px 10px;
+                border: 2px solid #e0e0e0;
+                background-color: #ffffff;
+                min-height: 20px;
+            }
+            QListWidget {
+                font-size: 14px;
+                border: 1px solid #e0e0e0;
+                background-color: #ffffff;
+            }
+            QListWidget::item {
+                padding: 6px 8px;
+                border-bottom: 1px solid #f0f0f0;
+            }
+            QListWidget::item:selected {
+                background-color: #e3f2fd;
+                color: #1e1e1e;
+            }
+        """)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.search_edit.clear()
+            return
+        super().keyPressEvent(event)
+
+    def _start_search(self):
+        self._debounce.stop()
+        query = self.search_edit.text().strip()
+        if not query:
+            self._pending_query = None
+            self.results_list.clear()
+            self.results_list.hide()
+            return
+        request = (query, self.scope_combo.currentData())
+        if self._searching:
+            self._pending_query = request
+            return
+        self._searching = True
+        self.data_service.submit(
+            self.db.search, query, self.RESULT_LIMIT, request[1],
+            on_done=lambda hits: self._on_search_finished(request, hits),
+            on_error=lambda error: self._on_search_finished(request, None),
+        )
+
+    def _on_search_finished(self, request, hits):
+        self._searching = False
+        if self._pending_query is not None:
+            # 搜索期间输入已变化，直接搜索最新的内容
+            self._pending_query = None
+            self._start_search()
+            return
+        current = (self.search_edit.text().strip(), self.scope_combo.currentData())
+        if hits is None or request != current:
+            return
+        self.populate_results(hits)
+
+    def populate_results(self, hits):
+        self.results_list.clear()
+        if not hits:
+            empty_item = QListWidgetItem("没有找到匹配的项目或任务")
+            empty_item.setFlags(Qt.NoItemFlags)  # 不可选择
+            self.results_list.addItem(empty_item)
+        for hit in hits:
+            if hit.entity_type == 'project':
+                text = f"📁 {hit.name}"
+            else:
+                text = f"📝 {hit.name}    —    {hit.project_name}"
+            if hit.snippet:
+                text += "\n" + hit.snippet.replace("\n", " ")
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, hit)
+            self.results_list.addItem(item)
+        self.results_list.show()
+
+    def _activate_first(self):
+        item = self.results_list.item(0)
+        if item is not None and item.data(Qt.UserRole) is not None:
+            self._on_item_activated(item)
+
+    def _on_item_activated(self, item: QListWidgetItem):
+        hit = item.data(Qt.UserRole)
+        # 单击激活的平台上 itemClicked 和 itemActivated 都会触发
+        if hit is None or not self.results_list.isVisible():
+            return
+        self.results_list.hide()
+        self.hit_activated.emit(hit)
@@ -16,8 +16,7 @@ class TaskDialog(QDialog):
         
         if task_id:
             # 编辑模式：获取任务信息
-            tasks = self.db.get_tasks_by_project(project_id)
-            self.task = next((t for t in tasks if t.id == task_id), None)
+            self.task = self.db.get_task(task_id)
             if not self.task:
                 QMessageBox.warning(self, "错误", "找不到该任务！")
                 self.reject()
@@ -0,0 +1,143 @@
+"""
+应用日志：分级别的结构化日志（消息为 key=value 形式），写入日志目录下的滚动日志文件；
+启动各阶段的耗时用单调时钟记录，每次启动输出一行汇总
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+from utils.config import get_log_dir
+
+APP_LOG_NAME = "project_tracing.log"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(threadName)s %(message)s"
+
+
+def rotating_file_handler(path: str, fmt: str = LOG_FORMAT, max_bytes: int = LOG_MAX_BYTES,
+                          backup_count: int = LOG_BACKUP_COUNT) -> RotatingFileHandler:
+    """写入 path 的滚动日志 handler（目录不存在时创建）"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(fmt))
+    return handler
+
+
+def has_file_handler(logger: logging.Logger, path: str) -> bool:
+    target = os.path.abspath(path)
+    return any(getattr(handler, "baseFilename", None) == target for handler in logger.handlers)
+
+
+def format_fields(**fields) -> str:
+    """把字段格式化为 key=value（浮点数保留一位小数，布尔值为 true/false，含空白的值加引号），便于检索和解析"""
+    parts = []
+    for key, value in fields.items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, float):
+            value = f"{value:.1f}"
+        else:
+            value = str(value)
+            if not value or any(ch.isspace() for ch in value) or '"' in value:
+                value = '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        parts.append(f"{key}={value}")
+    return " ".join(parts)
+
+
+class StreamToLogger:
+    """把写入的文本按行转发给 logger 的文件对象，用于替换没有终端时的 sys.stderr"""
+
+    def __init__(self, logger: logging.Logger, level: int = logging.ERROR):
+        self.logger = logger
+        self.level = level
+        self._buffer = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self._buffer += text
+            *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                self.logger.log(self.level, line.rstrip())
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            line, self._buffer = self._buffer, ""
+        if line.strip():
+            self.logger.log(self.level, line.rstrip())
+
+    def isatty(self) -> bool:
+        return False
+
+
+def setup_logging(level: int = logging.INFO, console: bool = True, log_dir: Optional[str] = None) -> str:
+    """配置根日志：写入日志目录下的 project_tracing.log（滚动），console 为 True 时同时输出到 stderr；
+    未捕获的异常（包括其他线程中的）也写入日志。返回日志文件路径
+    """
+    path = os.path.join(log_dir or get_log_dir(), APP_LOG_NAME)
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not has_file_handler(root, path):
+        root.addHandler(rotating_file_handler(path))
+    if console and sys.stderr is not None and not any(
+            type(handler) is logging.StreamHandler for handler in root.handlers):
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(stream_handler)
+
+    def log_uncaught(exc_type, exc_value, exc_traceback):
+        logging.getLogger("project_tracing").critical(
+            "未捕获的异常", exc_info=(exc_type, exc_value, exc_traceback))
+
+    def log_thread_exception(args):
+        logging.getLogger("project_tracing").error(
+            "线程中未捕获的异常 %s", format_fields(thread=args.thread.name if args.thread else "-"),
+            exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+
+    sys.excepthook = log_uncaught
+    threading.excepthook = log_thread_exception
+    return path
+
+
+@contextmanager
+def timed_phase(phases: dict, name: str):
+    """把 with 块的耗时（毫秒，单调时钟）记入 phases[name]，块内抛出异常时同样记录"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = (time.perf_counter() - start) * 1000
+
+
+class StartupTimer:
+    """启动阶段计时：各阶段按记录顺序输出，start 为进程开始的 perf_counter 值"""
+
+    def __init__(self, start: float = None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases = {}
+
+    def span(self, name: str):
+        return timed_phase(self.phases, name)
+
+    def add(self, name: str, ms: float):
+        self.phases[name] = ms
+
+    def add_all(self, prefix: str, phases: dict):
+        """合并子组件记录的阶段（如 Database.startup_phases），名称加上前缀"""
+        for name, ms in list(phases.items()):
+            self.phases[f"{prefix}{name}"] = ms
+
+    def since_start_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def summary(self, total_ms: float, **fields) -> str:
+        """一行汇总：total 与各阶段耗时（毫秒），以及额外字段"""
+        timings = {"total_ms": total_ms}
+        timings.update((f"{name}_ms", ms) for name, ms in self.phases.items())
+        return format_fields(**timings, **fields)
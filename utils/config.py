@@ -8,6 +8,13 @@ from utils.platform_utils import is_macos, is_windows
 
 APP_DIR_NAME = "ProjectTracing"
 CONFIG_FILE_NAME = "project_tracing_config.json"
+LOG_DIR_NAME = "logs"
+# 单条 SQL 语句超过该耗时（毫秒）时写入慢查询日志
+DEFAULT_SLOW_QUERY_MS = 100.0
+# 历史项目的归档方式：off 保留在主库，single 移入一个归档库，yearly 按完成年份每年一个归档库。
+# 默认关闭：开启后已有的历史项目会被移出主库，同步目录中仍在运行旧版本的电脑将看不到它们
+ARCHIVE_MODES = ("off", "single", "yearly")
+DEFAULT_ARCHIVE_MODE = "off"
 
 
 def _get_app_data_directory() -> str:
@@ -36,6 +43,16 @@ def get_default_db_path() -> str:
     return os.path.join(_get_app_data_directory(), "project_tracing.db")
 
 
+def get_log_dir() -> str:
+    """获取日志目录（应用数据目录下的 logs），并确保其存在"""
+    log_dir = os.path.join(_get_app_data_directory(), LOG_DIR_NAME)
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+    except Exception:
+        pass
+    return log_dir
+
+
 def get_config_path() -> str:
     """获取配置文件路径"""
     return os.path.join(_get_app_data_directory(), CONFIG_FILE_NAME)
@@ -75,3 +92,23 @@ def set_db_path(db_path: str):
     config["db_path"] = db_path
     save_config(config)
 
+
+def get_slow_query_ms() -> Optional[float]:
+    """慢查询阈值（毫秒），配置文件中的 slow_query_ms 为 0 或负数时关闭慢查询日志"""
+    value = load_config().get("slow_query_ms", DEFAULT_SLOW_QUERY_MS)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_SLOW_QUERY_MS
+    return value if value > 0 else None
+
+
+def is_sql_trace_enabled() -> bool:
+    """配置文件中 trace_sql 为 true 时，把执行的每条 SQL 写入日志目录下的跟踪日志（排查问题用）"""
+    return load_config().get("trace_sql") is True
+
+
+def get_archive_mode() -> str:
+    """配置文件中的 archive_mode（off / single / yearly），无效值按默认的 off 处理"""
+    mode = load_config().get("archive_mode", DEFAULT_ARCHIVE_MODE)
+    return mode if mode in ARCHIVE_MODES else DEFAULT_ARCHIVE_MODE